@@ -0,0 +1,60 @@
+"""
+Retained memory per superstep.
+
+Runs a chain of distinct nodes (no fusion, so every node is a superstep)
+where each node writes a fresh payload to state, and records the traced
+memory after every barrier. With messages released at the barrier and a
+bounded history, the retained memory stays flat; keeping results makes it
+grow by about one payload per superstep.
+
+    python benchmarks/bench_memory.py
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import asyncio
+import contextlib
+import tracemalloc
+from typing import Dict
+from react_agent.graph import Graph, State, START, END
+
+STEPS = 90
+PAYLOAD_SIZE = 64 * 1024
+
+def build_graph(keep_results: bool) -> Graph:
+    def make_node(i):
+        def node(state: Dict):
+            return {"payload": "x" * PAYLOAD_SIZE, "step": i}
+        return node
+
+    graph = Graph(State({"payload": "", "step": 0}), keep_results=keep_results, history_limit=1)
+    for i in range(STEPS):
+        graph.add_node(f"node{i}", make_node(i))
+    graph.add_edge(START, "node0")
+    for i in range(STEPS - 1):
+        graph.add_edge(f"node{i}", f"node{i + 1}")
+    graph.add_edge(f"node{STEPS - 1}", END)
+    graph.compile(fuse=False)
+    return graph
+
+async def measure(keep_results: bool) -> list[int]:
+    graph = build_graph(keep_results)
+    retained = []
+    tracemalloc.start()
+    # The engine prints the state every superstep, discard it instead of buffering it
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        async for _ in graph.stream():
+            retained.append(tracemalloc.get_traced_memory()[0])
+    tracemalloc.stop()
+    return retained
+
+def report(label: str, retained: list[int]):
+    # Skip warm-up supersteps (thread pool, first allocations)
+    window = retained[10:]
+    per_step = (window[-1] - window[0]) / (len(window) - 1)
+    print(f"{label:<22} retained after step 10: {window[0] / 1024:8.1f} KiB  "
+          f"after step {len(retained) - 1}: {window[-1] / 1024:8.1f} KiB  "
+          f"growth per superstep: {per_step / 1024:6.1f} KiB")
+
+if __name__ == "__main__":
+    report("release at barrier", asyncio.run(measure(keep_results=False)))
+    report("keep_results=True", asyncio.run(measure(keep_results=True)))
@@ -1,10 +1,25 @@
 # init for react_agent
 from .react_agent import ReActAgent
-from .tool import Tool, ToolResult, tool
+from .context import RunContext, get_run_context
+from .tool import Resource, Tool, ToolResult, tool
+from .history import HistoryManager
+from .rate_limit import RateLimiter, set_default_rate_limiter
+from .resources import ResourcePool
+from .tool_index import ToolIndex
+from .tool_registry import ToolRegistry
 
 __all__ = [
+    "HistoryManager",
+    "RateLimiter",
     "ReActAgent",
+    "Resource",
+    "ResourcePool",
+    "RunContext",
     "Tool",
+    "ToolIndex",
+    "ToolRegistry",
     "ToolResult",
+    "get_run_context",
+    "set_default_rate_limiter",
     "tool",
 ]
\ No newline at end of file
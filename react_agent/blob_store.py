@@ -0,0 +1,129 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from typing import Any, Dict
+import hashlib
+import mmap
+import shutil
+import tempfile
+import weakref
+
+class BlobRef:
+    """
+    Cheap, immutable stand-in for a large value kept in a BlobStore. Copying
+    state or history copies the reference, not the payload.
+    """
+    __slots__ = ("digest", "size", "is_text", "store")
+
+    def __init__(self, digest: str, size: int, is_text: bool, store: 'BlobStore'):
+        self.digest = digest
+        self.size = size
+        self.is_text = is_text
+        self.store = store
+
+    def view(self) -> memoryview:
+        """Zero-copy view of the bytes (backed by an mmap when the store spills to disk)"""
+        return self.store.get(self.digest)
+
+    def text(self, encoding: str = "utf-8") -> str:
+        """Decodes the bytes, this copies the payload"""
+        return str(self.view(), encoding)
+
+    def value(self) -> str | bytes:
+        """The original value: a str for text blobs, bytes otherwise (copies the payload)"""
+        return self.text() if self.is_text else self.view().tobytes()
+
+    def model_dump(self) -> Dict:
+        # Serialized as the reference, so to_serializable never walks the payload
+        return {"blob": self.digest, "size": self.size}
+
+    def __reduce__(self):
+        # Pickled (e.g. for a worker process) as the value itself, the store stays behind
+        return (str, (self.text(),)) if self.is_text else (bytes, (self.view().tobytes(),))
+
+    def __len__(self):
+        return self.size
+
+    def __eq__(self, other):
+        return isinstance(other, BlobRef) and other.digest == self.digest
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __repr__(self):
+        return f"BlobRef({self.digest[:12]}, size={self.size})"
+
+class BlobStore:
+    """
+    Run-scoped, content-addressed store for large state values.
+
+    str and bytes values of at least `threshold` bytes are stored once under
+    their sha256 and replaced by a BlobRef; identical values share one blob.
+    Blobs are kept in memory, or written to `directory` and mmapped when one is
+    given (a temporary directory is created for directory="" and removed with
+    the store).
+    """
+    def __init__(self, threshold: int = 64 * 1024, directory: str | None = None):
+        self.threshold = threshold
+        self.directory = directory
+        if directory == "":
+            self.directory = tempfile.mkdtemp(prefix="blobs-")
+            weakref.finalize(self, shutil.rmtree, self.directory, True)
+        self._blobs: Dict[str, bytes | mmap.mmap] = {}
+
+    def put(self, value: str | bytes) -> BlobRef:
+        is_text = isinstance(value, str)
+        data = value.encode("utf-8") if is_text else value
+        digest = hashlib.sha256(data).hexdigest()
+        if digest not in self._blobs:
+            self._blobs[digest] = self.write(digest, data)
+        return BlobRef(digest, len(data), is_text, self)
+
+    def write(self, digest: str, data: bytes) -> bytes | mmap.mmap:
+        if self.directory is None or not data:
+            return data
+        path = os.path.join(self.directory, digest)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get(self, digest: str) -> memoryview:
+        blob = self._blobs.get(digest)
+        if blob is None:
+            raise KeyError(f"Error: blob {digest} not found in store")
+        return memoryview(blob)
+
+    def externalize(self, value: Any) -> Any:
+        """Large str/bytes values (and list items) become BlobRefs, everything else is returned as is"""
+        if isinstance(value, (str, bytes)):
+            # len(str) is a lower bound of its encoded size, good enough for the cut-off
+            return self.put(value) if len(value) >= self.threshold else value
+        if isinstance(value, list):
+            if any(isinstance(item, (str, bytes)) and len(item) >= self.threshold for item in value):
+                return [self.externalize(item) for item in value]
+            return value
+        return value
+
+    def externalize_update(self, update: Dict) -> Dict:
+        """Externalizes the top-level values of a state update, returns `update` itself if nothing is large"""
+        externalized = None
+        for key, value in update.items():
+            new_value = self.externalize(value)
+            if new_value is not value:
+                if externalized is None:
+                    externalized = dict(update)
+                externalized[key] = new_value
+        return update if externalized is None else externalized
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._blobs
+
+    def __len__(self):
+        return len(self._blobs)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(blob) for blob in self._blobs.values())
@@ -0,0 +1,57 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from contextvars import ContextVar
+from typing import Callable
+import time
+
+class RunContext:
+    """
+    Per-invocation context visible to nodes, tools and model calls through
+    get_run_context(). Holds the run's deadline (an absolute time on `clock`).
+    """
+    __slots__ = ("deadline", "clock")
+
+    def __init__(self, deadline: float | None = None, clock: Callable[[], float] = time.monotonic):
+        self.deadline = deadline
+        self.clock = clock
+
+    @classmethod
+    def with_budget(cls, seconds: float, clock: Callable[[], float] = time.monotonic) -> 'RunContext':
+        if seconds < 0:
+            raise ValueError(f"Error: deadline must be at least 0 seconds, but received: {seconds}")
+        return cls(deadline=clock() + seconds, clock=clock)
+
+    def remaining(self) -> float | None:
+        """Seconds left before the deadline (never negative), None without a deadline"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - self.clock())
+
+    def expired(self) -> bool:
+        return self.deadline is not None and self.clock() >= self.deadline
+
+    def timeout(self, default: float | None = None) -> float | None:
+        """The smaller of `default` and the remaining time, for calls that take a timeout"""
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        if default is None:
+            return remaining
+        return min(default, remaining)
+
+    def __repr__(self):
+        return f"RunContext(remaining={self.remaining()})"
+
+# No deadline unless a run sets one
+_current_context: ContextVar[RunContext] = ContextVar("run_context", default=RunContext())
+
+def get_run_context() -> RunContext:
+    """The context of the run the caller belongs to (a context without a deadline outside runs)"""
+    return _current_context.get()
+
+def set_run_context(context: RunContext):
+    """Returns a token for reset_run_context"""
+    return _current_context.set(context)
+
+def reset_run_context(token):
+    _current_context.reset(token)
@@ -0,0 +1,280 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from collections import deque
+from typing import Callable, Dict, Hashable
+import asyncio
+import contextvars
+import math
+import threading
+import time
+
+DEFAULT_TENANT = "default"
+
+class TenantStats:
+    """Queue-time metrics of one tenant, percentiles cover the last `history` tasks"""
+    __slots__ = ("submitted", "started", "completed", "total_queue_seconds", "max_queue_seconds", "recent")
+
+    def __init__(self, history: int):
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.total_queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+        self.recent: deque = deque(maxlen=history)
+
+    def record_queue_time(self, seconds: float):
+        self.started += 1
+        self.total_queue_seconds += seconds
+        self.max_queue_seconds = max(self.max_queue_seconds, seconds)
+        self.recent.append(seconds)
+
+    @property
+    def mean_queue_seconds(self) -> float:
+        return self.total_queue_seconds / self.started if self.started else 0.0
+
+    def queue_seconds_percentile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+    def __repr__(self):
+        return (
+            f"TenantStats(submitted={self.submitted}, completed={self.completed}, "
+            f"p99_queue_seconds={self.queue_seconds_percentile(0.99):.4f}, max_queue_seconds={self.max_queue_seconds:.4f})"
+        )
+
+class QueuedTask:
+    __slots__ = ("call", "future", "loop", "enqueued")
+
+    def __init__(self, call: Callable, future: asyncio.Future, loop, enqueued: float):
+        self.call = call
+        self.future = future
+        self.loop = loop
+        self.enqueued = enqueued
+
+class RunQueue:
+    __slots__ = ("run_id", "weight", "priority", "cap", "tasks", "running", "pass_")
+
+    def __init__(self, run_id: Hashable, weight: float, priority: int, cap: int | None, pass_: float):
+        self.run_id = run_id
+        self.weight = weight
+        self.priority = priority
+        self.cap = cap
+        self.tasks: deque[QueuedTask] = deque()
+        self.running = 0
+        self.pass_ = pass_
+
+    def eligible(self) -> bool:
+        return bool(self.tasks) and (self.cap is None or self.running < self.cap)
+
+class TenantQueue:
+    __slots__ = ("weight", "priority", "cap", "runs", "running", "pass_", "stats")
+
+    def __init__(self, weight: float, priority: int, cap: int | None, history: int):
+        self.weight = weight
+        self.priority = priority
+        self.cap = cap
+        self.runs: Dict[Hashable, RunQueue] = {}
+        self.running = 0
+        self.pass_ = 0.0
+        self.stats = TenantStats(history)
+
+    def is_idle(self) -> bool:
+        return self.running == 0 and not any(run.tasks for run in self.runs.values())
+
+class FairScheduler:
+    """
+    Shared pool of worker threads for the sync node tasks of many concurrent
+    runs (see Graph.compile(fair_scheduler=...) and Graph.new_run(tenant=...)).
+
+    Free workers pick the next task by:
+    - priority: tenants with a higher priority first, then runs with a higher priority
+    - weighted fair share (stride scheduling): among equal priorities, the
+      tenant, then the run, that has received the least tasks per unit of weight
+    - caps: a tenant or run at its cap of running tasks is skipped
+    A tenant or run that was idle starts at the current share instead of
+    cashing in the time it was idle, so a burst can't starve the others.
+    Shares count tasks, not their run time.
+    """
+    def __init__(
+        self,
+        workers: int = 4,
+        tenant_weights: Dict[str, float] | None = None,
+        tenant_priorities: Dict[str, int] | None = None,
+        tenant_caps: Dict[str, int] | None = None,
+        history: int = 1024,
+    ):
+        if workers < 1:
+            raise ValueError(f"Error: workers must be at least 1, but received: {workers}")
+        for name, weight in (tenant_weights or {}).items():
+            if weight <= 0:
+                raise ValueError(f"Error: tenant weights must be positive, but received: {weight} for {name}")
+        self.num_workers = workers
+        self.tenant_weights = tenant_weights or {}
+        self.tenant_priorities = tenant_priorities or {}
+        self.tenant_caps = tenant_caps or {}
+        self.history = history
+
+        self.tenants: Dict[str, TenantQueue] = {}
+        self.condition = threading.Condition()
+        self.threads: list[threading.Thread] = []
+        self.stopping = False
+
+    def start(self):
+        with self.condition:
+            if self.threads:
+                return
+            self.stopping = False
+            for i in range(self.num_workers):
+                thread = threading.Thread(target=self.work, name=f"fair-scheduler-{i}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def shutdown(self):
+        """Stops the workers once they finish their current task, queued tasks are cancelled"""
+        with self.condition:
+            self.stopping = True
+            for tenant in self.tenants.values():
+                for run in tenant.runs.values():
+                    for task in run.tasks:
+                        self.resolve(task, None, RuntimeError("Error: the scheduler was shut down"))
+                    run.tasks.clear()
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def tenant(self, name: str) -> TenantQueue:
+        tenant = self.tenants.get(name)
+        if tenant is None:
+            tenant = TenantQueue(
+                self.tenant_weights.get(name, 1.0),
+                self.tenant_priorities.get(name, 0),
+                self.tenant_caps.get(name),
+                self.history,
+            )
+            self.tenants[name] = tenant
+        return tenant
+
+    def stats(self, tenant: str = DEFAULT_TENANT) -> TenantStats:
+        with self.condition:
+            return self.tenant(tenant).stats
+
+    async def run(
+        self,
+        func: Callable,
+        *args,
+        tenant: str = DEFAULT_TENANT,
+        run_id: Hashable = None,
+        weight: float = 1.0,
+        priority: int = 0,
+        cap: int | None = None,
+    ):
+        """
+        Runs func(*args) on a worker thread once the scheduler picks it and
+        returns its result. weight, priority and cap apply to the run_id,
+        they are taken from its first task. The caller's contextvars are
+        passed on, like asyncio.to_thread.
+        """
+        if weight <= 0:
+            raise ValueError(f"Error: weight must be positive, but received: {weight}")
+        self.start()
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        task = QueuedTask(lambda: context.run(func, *args), loop.create_future(), loop, time.monotonic())
+
+        with self.condition:
+            if self.stopping:
+                raise RuntimeError("Error: the scheduler was shut down")
+            queue = self.tenant(tenant)
+            if queue.is_idle():
+                # Back from idle: join at the current share, don't bank credit
+                queue.pass_ = max(queue.pass_, self.min_pass(t.pass_ for t in self.tenants.values() if not t.is_idle()))
+            run = queue.runs.get(run_id)
+            if run is None:
+                run = RunQueue(run_id, weight, priority, cap, self.min_pass(r.pass_ for r in queue.runs.values()))
+                queue.runs[run_id] = run
+            run.tasks.append(task)
+            queue.stats.submitted += 1
+            self.condition.notify()
+        return await task.future
+
+    @staticmethod
+    def min_pass(passes) -> float:
+        return min(passes, default=0.0)
+
+    def pick(self) -> tuple | None:
+        """The next (tenant, run, task) to run, the condition's lock must be held"""
+        best = None
+        for tenant in self.tenants.values():
+            if tenant.cap is not None and tenant.running >= tenant.cap:
+                continue
+            runs = [run for run in tenant.runs.values() if run.eligible()]
+            if not runs:
+                continue
+            key = (-tenant.priority, tenant.pass_)
+            if best is None or key < best[0]:
+                best = (key, tenant, runs)
+        if best is None:
+            return None
+
+        _, tenant, runs = best
+        run = min(runs, key=lambda run: (-run.priority, run.pass_))
+        task = run.tasks.popleft()
+        tenant.pass_ += 1.0 / tenant.weight
+        run.pass_ += 1.0 / run.weight
+        tenant.running += 1
+        run.running += 1
+        tenant.stats.record_queue_time(time.monotonic() - task.enqueued)
+        return tenant, run, task
+
+    def work(self):
+        while True:
+            with self.condition:
+                picked = self.pick()
+                while picked is None and not self.stopping:
+                    self.condition.wait()
+                    picked = self.pick()
+                if picked is None:
+                    return
+            tenant, run, task = picked
+            if not task.future.cancelled():
+                try:
+                    outcome = (task.call(), None)
+                except BaseException as e:
+                    outcome = (None, e)
+                self.resolve(task, *outcome)
+
+            with self.condition:
+                tenant.running -= 1
+                run.running -= 1
+                tenant.stats.completed += 1
+                # Finished runs are dropped, a run id seen again starts fresh
+                if not run.tasks and run.running == 0 and tenant.runs.get(run.run_id) is run:
+                    del tenant.runs[run.run_id]
+                self.condition.notify_all()
+
+    def resolve(self, task: QueuedTask, result, error: BaseException | None):
+        def set_result():
+            if task.future.done():
+                return
+            if error is not None:
+                task.future.set_exception(error)
+            else:
+                task.future.set_result(result)
+        try:
+            task.loop.call_soon_threadsafe(set_result)
+        except RuntimeError:
+            # The caller's loop is already closed, nobody is waiting
+            pass
+
+    def __repr__(self):
+        return f"FairScheduler(workers={self.num_workers}, tenants={list(self.tenants)})"
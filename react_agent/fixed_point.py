@@ -0,0 +1,61 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from typing import Dict, Iterable
+from utils.serializable import to_serializable
+import hashlib
+import json
+
+# What a run does when a step repeats, picked at compile()
+STOP = "stop"       # end the run like a normal finish
+RAISE = "raise"     # raise a RuntimeError
+
+_MASK = (1 << 128) - 1
+
+def value_digest(value) -> bytes:
+    # Values without a stable serialization fall back to repr, which at worst misses a repeat
+    data = json.dumps(to_serializable(value), sort_keys=True, default=repr)
+    return hashlib.blake2b(data.encode(), digest_size=16).digest()
+
+def entry_digest(key: str, value) -> int:
+    digest = hashlib.blake2b(key.encode(), digest_size=16, key=value_digest(value))
+    return int.from_bytes(digest.digest(), "big")
+
+class FixedPointDetector:
+    """
+    Fingerprints the state and the nodes about to run at every barrier and
+    reports when a fingerprint repeats. The state fingerprint is the sum of
+    per-key digests, so a step only hashes the keys it wrote.
+    """
+    __slots__ = ("entries", "state_fingerprint", "seen")
+
+    def __init__(self, state: Dict):
+        self.entries: Dict[str, int] = {}
+        self.state_fingerprint = 0
+        self.update(state, state.keys())
+        # fingerprint -> the step it was first seen at
+        self.seen: Dict[tuple, int] = {}
+
+    def update(self, state: Dict, keys: Iterable[str]):
+        for key in keys:
+            digest = entry_digest(key, state[key])
+            self.state_fingerprint = (self.state_fingerprint - self.entries.get(key, 0) + digest) & _MASK
+            self.entries[key] = digest
+
+    def repeated(
+        self,
+        step: int,
+        active: Iterable[str],
+        join_arrivals: Dict[str, set],
+        join_fired: Dict[str, set] | None = None,
+    ) -> int | None:
+        """Records this step's fingerprint, returns the earlier step it repeats if any"""
+        fingerprint = (
+            self.state_fingerprint,
+            frozenset(active),
+            frozenset((join_id, frozenset(parents)) for join_id, parents in join_arrivals.items()),
+            frozenset((join_id, frozenset(parents)) for join_id, parents in (join_fired or {}).items()),
+        )
+        earlier = self.seen.get(fingerprint)
+        if earlier is None:
+            self.seen[fingerprint] = step
+        return earlier
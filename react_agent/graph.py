@@ -6,18 +6,45 @@ from react_agent.node import (
     NodeActiveStatus,
     BaseNode,
     ConditionalNode,
-    Node
+    MapNode,
+    Node,
+    SubgraphNode,
+    ToolNode
 )
+from react_agent.scheduler import LatencyStats, SchedulingPolicy, CriticalPathPolicy
+from react_agent.speculation import LIKELY, ALL, SpeculationStats, TrackedState
+from react_agent.context import RunContext, get_run_context, set_run_context, reset_run_context
+from react_agent.blob_store import BlobRef, BlobStore
+from react_agent.workers import ExecutorBackend
+from react_agent.fixed_point import STOP, RAISE, FixedPointDetector
+from react_agent.tracing import RunTrace, TraceRecorder, set_current_trace, reset_current_trace
+from react_agent.fair_scheduler import DEFAULT_TENANT, FairScheduler
 import asyncio
 from typing import Any
-from typing import Dict, List
+from typing import Dict, Iterable, List
+import contextvars
+import functools
 import inspect
 import json
+import copy
+import pickle
+import time
 
 START = "START"
 END = "END"
+
+# Execution modes, picked at compile()
+BSP = "bsp"             # supersteps separated by barriers
+DATAFLOW = "dataflow"   # each node fires as soon as it is activated, no barriers
+
+# Sync nodes proven to run faster than this (seconds) skip the thread pool handoff
+INLINE_THRESHOLD = 50e-6
+# Runs measured before a node can be proven cheap
+INLINE_MIN_SAMPLES = 3
     
 class Message:
+    __slots__ = ("node", "content")
+
     def __init__(self, node: BaseNode, content: dict | str):
         """
         Initializes content: dict[str, Any]
@@ -35,6 +62,8 @@ class Message:
     
 # Used internally in the engine 
 class NodeResult:
+    __slots__ = ("status", "msg", "error")
+
     def __init__(self, status: NodeStatus, msg: Message, error: Exception = None):
         self.status = status
         self.msg = msg
@@ -50,6 +79,8 @@ class State:
     - only the graph has access to the methods to update state
     - transform each message to a dict and map to the state dict
     """
+    __slots__ = ("__state",)
+
     def __init__(self, state: Dict):
         if not isinstance(state, Dict):
             raise TypeError(f"Expected 'state' to be a dictionary, but received: {type(state)}")
@@ -69,9 +100,11 @@ class State:
     def _update_state(self, new_state: Dict) -> 'State':
         """
         Returns a new state instance to avoid mutating curr state
-        - be able to append / overwrite / merge to global state
+        - keys that were not updated keep their previous value
         """
-        return State(new_state)
+        merged_state = self.__state.copy()
+        merged_state.update(new_state)
+        return State(merged_state)
     
     def __repr__(self):
         return f"State(state='{self.state}')"
@@ -79,7 +112,30 @@ class State:
 class RunState:
     """
     Internal facing class for coordinating state between nodes
+
+    Ownership of a superstep's messages: node results are held by the nodes
+    and the barrier until the state is merged. After the merge the messages
+    are released (see Graph.commit_state) unless the graph keeps results.
     """
+    __slots__ = (
+        "step_count",
+        "max_retries",
+        "inbox_msgs",
+        "nodes_status_map",
+        "join_arrivals",
+        "join_fired",
+        "join_unsettled",
+        "speculative",
+        "deadline_exceeded",
+        "replaying",
+        "recompute",
+        "recomputed",
+        "reused",
+        "fixed_point",
+        "fixed_point_step",
+        "task_slots",
+    )
+
     def __init__(self):
         self.step_count = 0
         self.max_retries = 100
@@ -88,6 +144,35 @@ class RunState:
         self.inbox_msgs: List[Message] = []
         self.nodes_status_map: Dict[str, NodeStatus] = {}
 
+        # join node id -> parents that have finished since it last ran
+        self.join_arrivals: Dict[str, set] = {}
+        # join node id -> parents of the wave it already ran for that are still
+        # on their way, they are absorbed instead of starting a new wave
+        self.join_fired: Dict[str, set] = {}
+        # Joins that ran in the current barrier, their wave is settled once
+        # the next nodes are known (see Graph.settle_fired_joins)
+        self.join_unsettled: set = set()
+
+        # speculative node id -> (upstream node id, task, tracked state, start time)
+        self.speculative: Dict[str, tuple] = {}
+
+        # Set when the run stopped early because its deadline passed
+        self.deadline_exceeded = False
+
+        # Replays (see Graph.stream): nodes forced to run again, and the
+        # (step, node id) pairs that ran or reused a recorded output
+        self.replaying = False
+        self.recompute: set = set()
+        self.recomputed: List[tuple] = []
+        self.reused: List[tuple] = []
+
+        # Repeated step detection (see Graph.compile), and the step a run stopped at
+        self.fixed_point: FixedPointDetector | None = None
+        self.fixed_point_step: int | None = None
+
+        # Slots shared by the nodes and map tasks of a capped run with map nodes (see Graph.stream)
+        self.task_slots: asyncio.Semaphore | None = None
+
     def set_max_retries(self, n: int):
         self.max_retries = n
 
@@ -105,15 +190,23 @@ class RunState:
                 return list()
             case dict():
                 return dict()
+            case BlobRef():
+                return x
             case _:
                 return "unknown type"
             
+    def merge_type(self, x):
+        # A BlobRef stands for its str/bytes value, so it merges with small values of that type
+        if isinstance(x, BlobRef):
+            return str if x.is_text else bytes
+        return type(x)
+
     def is_valid_list_type(self, content, new_item):
-        return len(content) > 0 and type(content[-1]) == type(new_item)
+        return len(content) > 0 and self.merge_type(content[-1]) == self.merge_type(new_item)
             
     def merge_content(self, type_to_merge, new_content, key, value):
         match type_to_merge:
-            case int() | str() | bool() | float() | dict():
+            case int() | str() | bool() | float() | dict() | BlobRef():
                 if type(new_content.get(key)) != list:
                     new_content[key] = [value] 
                 else:
@@ -165,22 +258,117 @@ class RunState:
         return new_content
     
 class Graph:
-    def __init__(self, state: State):
+    def __init__(
+        self,
+        state: State,
+        keep_results: bool = False,
+        history_limit: int | None = None,
+        blob_threshold: int | None = None,
+        blob_dir: str | None = None,
+        record_outputs: bool = False,
+    ):
+        """
+        keep_results: keep every node's last message on node.result.msg and the
+            last superstep's messages in run_state.inbox_msgs (for debugging)
+        history_limit: only keep the last n states in history (None keeps all)
+        blob_threshold: str/bytes state values of at least this many bytes are
+            kept once in the run's BlobStore and the state holds a BlobRef
+            (resolve it with .view() or .text()). None keeps values inline
+        blob_dir: write blobs to files in this directory and mmap them instead
+            of keeping them in memory ("" for a temporary directory)
+        record_outputs: record the state keys every node read and the update it
+            returned, so a replay (stream(replay_from=...)) can reuse outputs
+            whose inputs didn't change
+        """
+        self.keep_results = keep_results
+        self.history_limit = history_limit
+        self.blob_threshold = blob_threshold
+        self.blob_dir = blob_dir
+        self.blob_store = self.new_blob_store()
+        self.record_outputs = record_outputs
+        # node id -> [(TrackedState the node ran on, its update)]
+        self.records: Dict[str, List[tuple]] = {}
+        # Node ids of every step, step i produced history[i + 1] (kept while history is unlimited)
+        self.step_nodes: List[List[str]] = []
         self.adjacency_list = {}
         self.node_registry = {}
         self.run_state = RunState()
         self.state = State(state.state)
         self.history: List[State] = [state]
+        # Initial state of every run, new_run() overlays the run's own state on it
+        self.default_state = State(state.state)
 
         # Freeze the graph during compile
         self.frozen = False
         self.has_start = False
 
-    def add_node(self, custom_name: str, func: Callable):
+        # node id -> the only child it runs back to back with (see fuse_linear_chains)
+        self.fused_next: Dict[str, str] = {}
+        self.mode = BSP
+
+        # join node id -> number of parents it waits for, and its number of parents, computed at compile
+        self.join_required: Dict[str, int] = {}
+        self.join_in_degree: Dict[str, int] = {}
+
+        # Scheduling when at most max_concurrency nodes may run at once (see compile)
+        self.max_concurrency: int | None = None
+        self.scheduling_policy: SchedulingPolicy = CriticalPathPolicy()
+        self.latency_stats = LatencyStats()
+        # Sync nodes measured below this many seconds run on the loop (see compile)
+        self.inline_threshold: float | None = INLINE_THRESHOLD
+
+        # Speculative router branches (see compile), None when off
+        self.speculation: str | None = None
+        self.speculation_stats = SpeculationStats()
+
+        # Deadline of the current run, set by stream()
+        self.context = RunContext()
+
+        # Timeline tracing (see compile), and the trace of the current run when it is sampled
+        self.tracer: TraceRecorder | None = None
+        self.trace: RunTrace | None = None
+
+        # What to do when a step repeats an earlier one (see compile), None doesn't check
+        self.fixed_point: str | None = None
+
+        # Out-of-process backend for plain sync nodes (see compile), None runs everything here
+        self.executor: ExecutorBackend | None = None
+        self.remote_nodes: set = set()
+
+        # Thread pool shared fairly with other runs (see compile), None uses the loop's default executor.
+        # Tenant, weight, priority and cap of this run's tasks in it (see new_run)
+        self.fair_scheduler: FairScheduler | None = None
+        self.tenant = DEFAULT_TENANT
+        self.run_weight = 1.0
+        self.run_priority = 0
+        self.run_cap: int | None = None
+
+    def add_node(
+        self,
+        custom_name: str,
+        func: 'Callable | Graph',
+        input_map: Dict[str, str] | None = None,
+        output_map: Dict[str, str] | None = None,
+        join: str | int | None = None,
+        speculative: bool = False,
+        inline: bool | None = None,
+    ):
+        """
+        join: make this a join node that runs once after "all" of its parents
+        finished, or after a quorum of `join` parents, instead of once per parent
+        speculative: the node is cheap and free of side effects, so it may start
+            before its router picks it (only used with compile(speculation=...))
+        inline: for sync nodes, True always runs the node on the event loop,
+            False always in the thread pool. None (default) runs it inline once
+            it has proven cheaper than the graph's inline_threshold
+        """
         # Don't modify the graph after compilation
         if self.frozen == True:
             raise RuntimeError(f"Error: cannt add node after compilation")
 
+        if join is not None and join != "all" and not (isinstance(join, int) and join > 0):
+            raise ValueError(f"Error: join must be 'all' or a positive quorum, but received: {join}")
+
         # Validate the custom_name isn't a reserved keyword
         if (custom_name == START) or (custom_name == END):
             raise ValueError(f"Node with {custom_name} can't be used because it's a reserved keyword")
@@ -188,10 +376,161 @@ class Graph:
         # Validate the node doesn't already exist
         if self.node_registry.get(custom_name) is not None:
             raise ValueError(f"Node with id {custom_name} already exists in the node list.")
-        node = Node(id=custom_name,func=func)
+
+        if isinstance(func, Graph):
+            node = self.build_subgraph_node(custom_name, func, input_map or {}, output_map or {})
+        else:
+            node = Node(id=custom_name,func=func)
+        node.join = join
+        node.speculative = speculative
+        node.inline = inline
         self.node_registry[custom_name] = node
         self.adjacency_list[custom_name] = []
 
+    def build_subgraph_node(self, custom_name: str, subgraph: 'Graph', input_map: Dict, output_map: Dict) -> SubgraphNode:
+        if subgraph.frozen is False:
+            raise RuntimeError(f"Error: subgraph {custom_name} must be compiled before it is added")
+
+        sub_keys = subgraph.default_state.state
+        for sub_key, parent_key in list(input_map.items()) + list(output_map.items()):
+            if sub_key not in sub_keys:
+                raise KeyError(f"ERROR: Key {sub_key} not found in subgraph state")
+            if parent_key not in self.state.state:
+                raise KeyError(f"ERROR: Key {parent_key} not found in state")
+
+        # Subgraph keys live in the parent state under '<name>.<key>' once inlined
+        private_state = {
+            f"{custom_name}.{key}": value for key, value in sub_keys.items()
+        }
+        self.state = self.state._update_state(private_state)
+        self.default_state = self.default_state._update_state(private_state)
+        self.history[0] = self.state
+
+        # Used when the subgraph can't be inlined: run it as one async node on the parent's loop
+        async def run_subgraph(state: dict):
+            sub_state = {sub_key: state[parent_key] for sub_key, parent_key in input_map.items()}
+            run = subgraph.new_run(State(sub_state))
+            await run.invoke()
+            return {parent_key: run.state.state[sub_key] for sub_key, parent_key in output_map.items()}
+
+        return SubgraphNode(
+            id=custom_name,
+            func=run_subgraph,
+            graph=subgraph,
+            input_map=input_map,
+            output_map=output_map,
+        )
+
+    def map_subgraph_callable(self, subgraph_node: SubgraphNode, sub_node: BaseNode, is_entry: bool) -> Callable:
+        """
+        Wraps an inlined subgraph node so it sees the subgraph's keys and
+        writes back to '<name>.<key>' (plus the parent key from output_map)
+        """
+        name = subgraph_node.id
+        input_map = subgraph_node.input_map
+        output_map = subgraph_node.output_map
+        sub_keys = list(subgraph_node.graph.default_state.state.keys())
+        func = sub_node.callable
+        is_router = isinstance(sub_node, ConditionalNode)
+
+        def view(state: dict) -> dict:
+            sub_state = {key: state[f"{name}.{key}"] for key in sub_keys}
+            if is_entry:
+                for sub_key, parent_key in input_map.items():
+                    sub_state[sub_key] = state[parent_key]
+            return sub_state
+
+        def to_parent(sub_state: dict, res):
+            if is_router or not isinstance(res, dict):
+                return res
+            update = {}
+            # The entry node persists the mapped inputs for the rest of the subgraph
+            if is_entry:
+                for sub_key in input_map:
+                    update[f"{name}.{sub_key}"] = sub_state[sub_key]
+            for key, value in res.items():
+                update[f"{name}.{key}"] = value
+                if key in output_map:
+                    update[output_map[key]] = value
+            return update
+
+        if sub_node.is_async:
+            async def mapped(state: dict):
+                sub_state = view(state)
+                return to_parent(sub_state, await func(sub_state))
+        else:
+            def mapped(state: dict):
+                sub_state = view(state)
+                return to_parent(sub_state, func(sub_state))
+        return mapped
+
+    def can_inline_subgraph(self, subgraph_node: SubgraphNode) -> bool:
+        subgraph = subgraph_node.graph
+        entry_id = subgraph.adjacency_list.get(START)
+        if not isinstance(subgraph.node_registry.get(entry_id), Node):
+            return False
+        # Map nodes read their list and reducers see keys by the subgraph's names
+        if any(isinstance(node, MapNode) for node in subgraph.node_registry.values()):
+            return False
+        for parent_id, children in subgraph.adjacency_list.items():
+            # A router that ends the subgraph can't be pointed at several parent children
+            if isinstance(children, dict) and END in children.values():
+                return False
+            # The inlined entry node maps the inputs in from the parent state every
+            # time it runs, so a loop back to it would start over on every pass
+            if parent_id != START:
+                targets = children.values() if isinstance(children, dict) else children
+                if entry_id in targets:
+                    return False
+        return True
+
+    def inline_subgraph(self, subgraph_node: SubgraphNode):
+        """
+        Replaces the subgraph node with the subgraph's own nodes, so they run
+        on this graph's scheduler without a nested invoke()
+        """
+        name = subgraph_node.id
+        subgraph = subgraph_node.graph
+        entry_id = subgraph.adjacency_list.get(START)
+        parent_children = list(self.adjacency_list.get(name, []))
+
+        def prefixed(sub_id: str) -> str:
+            return sub_id if sub_id == END else f"{name}/{sub_id}"
+
+        del self.node_registry[name]
+        del self.adjacency_list[name]
+
+        for sub_id, sub_node in subgraph.node_registry.items():
+            inlined = copy.copy(sub_node)
+            inlined.id = prefixed(sub_id)
+            inlined.callable = self.map_subgraph_callable(subgraph_node, sub_node, is_entry=(sub_id == entry_id))
+            self.node_registry[inlined.id] = inlined
+
+            children = subgraph.adjacency_list.get(sub_id)
+            if isinstance(children, dict):
+                self.adjacency_list[inlined.id] = {result: prefixed(child) for result, child in children.items()}
+            elif children is not None:
+                # Leaving the subgraph continues with the subgraph node's children
+                new_children = []
+                for child in children:
+                    for new_child in (parent_children if child == END else [prefixed(child)]):
+                        if new_child not in new_children:
+                            new_children.append(new_child)
+                self.adjacency_list[inlined.id] = new_children
+
+        # Point every edge into the subgraph node at the subgraph's entry node
+        entry = prefixed(entry_id)
+        for parent_id, children in self.adjacency_list.items():
+            if parent_id == START:
+                if children == name:
+                    self.adjacency_list[START] = entry
+            elif isinstance(children, dict):
+                self.adjacency_list[parent_id] = {
+                    result: entry if child == name else child for result, child in children.items()
+                }
+            else:
+                self.adjacency_list[parent_id] = [entry if child == name else child for child in children]
+
     def add_conditional_node(self, custom_name: str, func: Callable):
         # Don't modify the graph after compilation
         if self.frozen == True:
@@ -203,6 +542,70 @@ class Graph:
         node = ConditionalNode(id=custom_name,func=func)
         self.node_registry[custom_name] = node
 
+    def add_tool_node(
+        self,
+        custom_name: str,
+        tools,
+        input_key: str = "tool_calls",
+        output_key: str = "messages",
+        timeout: float | None = None,
+    ):
+        """
+        Adds a ToolNode that runs the tool calls in state[input_key] and
+        appends their outputs to state[output_key]. Both keys must exist in state.
+        """
+        if self.frozen == True:
+            raise RuntimeError(f"Error: cannt add tool node after compilation")
+
+        if (custom_name == START) or (custom_name == END):
+            raise ValueError(f"Node with {custom_name} can't be used because it's a reserved keyword")
+
+        if self.node_registry.get(custom_name) is not None:
+            raise ValueError(f"Node with id {custom_name} already exists in the node list.")
+
+        for key in (input_key, output_key):
+            if key not in self.state.state:
+                raise KeyError(f"ERROR: Key {key} not found in state")
+
+        node = ToolNode(
+            id=custom_name,
+            tools=tools,
+            input_key=input_key,
+            output_key=output_key,
+            timeout=timeout,
+        )
+        self.node_registry[custom_name] = node
+        self.adjacency_list[custom_name] = []
+
+    def add_map_node(
+        self,
+        custom_name: str,
+        func: Callable,
+        over: str,
+        chunk_size: int = 1,
+        reducer: Callable[[List[Dict]], Dict] | None = None,
+    ):
+        """
+        Adds a MapNode that runs func on every chunk of chunk_size elements of
+        the list in state[over], and merges the task updates with reducer
+        (concatenates them per key by default). `over` must exist in state.
+        """
+        if self.frozen == True:
+            raise RuntimeError(f"Error: cannt add map node after compilation")
+
+        if (custom_name == START) or (custom_name == END):
+            raise ValueError(f"Node with {custom_name} can't be used because it's a reserved keyword")
+
+        if self.node_registry.get(custom_name) is not None:
+            raise ValueError(f"Node with id {custom_name} already exists in the node list.")
+
+        if over not in self.state.state:
+            raise KeyError(f"ERROR: Key {over} not found in state")
+
+        node = MapNode(id=custom_name, func=func, over=over, chunk_size=chunk_size, reducer=reducer)
+        self.node_registry[custom_name] = node
+        self.adjacency_list[custom_name] = []
+
     def has_state_dict(self, node_id: str):
         # Validate the to_node callable has a state dictionary parameter
         node = self.node_registry.get(node_id)
@@ -277,6 +680,8 @@ class Graph:
         # Check if each value in the results map is in the node registry
         for result in result_map:
             result_node_id = result_map[result]
+            if result_node_id == END:
+                continue
             if not self.node_registry.get(result_node_id):
                 raise ValueError(f"Node {custom_name} hasn't been added to the graph yet")
             
@@ -310,16 +715,16 @@ class Graph:
     
     def activate_local_children_nodes(self, active_node_id: str):
         active_children = []
-        children = self.adjacency_list.get(active_node_id)
+        # Copy the children so the compiled adjacency list stays reusable across runs
+        children = list(self.adjacency_list.get(active_node_id))
         print("children of", active_node_id, ": ", children)
         if len(children) > 1:
+            # If the node terminates, remove END from the children
+            children = [child_id for child_id in children if child_id != END]
+
             # If there's more than one router node, throw an error
             router_node_count = 0
             for child_id in children:
-
-                # If the node terminates, remove END from the children
-                if child_id == END:
-                    children.remove(child_id)
                 child_node = self.node_registry.get(child_id)
                 if isinstance(child_node, ConditionalNode):
                     router_node_count += 1
@@ -344,8 +749,11 @@ class Graph:
                 result_map = self.adjacency_list[child_node.id]
                 if result_map.get(router_node_res.msg.content) is not None:
                     result_node_id = result_map.get(router_node_res.msg.content)
-                    active_children.append(result_node_id)
                     print("routing to node:", result_node_id)
+                    self.speculation_stats.record_route(child_node.id, result_node_id)
+                    # The router ended this branch
+                    if result_node_id != END:
+                        active_children.append(result_node_id)
             elif isinstance(child_node, Node):
                 active_children.append(child_id)
         elif len(children) == 0:
@@ -373,51 +781,177 @@ class Graph:
         if not isinstance(res, Dict) and isinstance(node, Node):
             raise ValueError(f"ERROR: Expected dict as output type")
         elif isinstance(node, Node):
+            # One copy of the state for every key, this runs on the hot path of inline nodes
+            state = self.state.state
             for key in res.keys():
-                if key not in self.state.state:
+                if key not in state:
                     raise KeyError(f"ERROR: Key {key} not found in state")
     
+    def build_node_result(self, node: BaseNode, res) -> NodeResult:
+        node.status = NodeStatus.SUCCESS
+        node.is_visited = True
+
+        self.validate_node_callable_res(node, res)
+
+        return NodeResult(
+            status = node.status,
+            msg = Message(
+                node,
+                content = res
+            )
+        )
+
+    def build_failed_node_result(self, node: BaseNode, e: Exception) -> NodeResult:
+        node.status = NodeStatus.FAILED
+        node.is_visited = True
+        return NodeResult(
+            status = node.status,
+            msg= Message(
+                node,
+                content = {
+                    "INTERNAL_NODE_ERROR": f"{str(e)}"
+                }
+            ),
+            error=e
+        )
+
+    def find_recorded_output(self, node: BaseNode, state: Dict) -> Dict | None:
+        """During a replay, a recorded update of the node whose reads all match `state`"""
+        if not self.run_state.replaying or node.id in self.run_state.recompute:
+            return None
+        for tracked, update in self.records.get(node.id, ()):
+            if tracked.is_still_valid(state):
+                return update
+        return None
+
+    def node_input(self, node: BaseNode) -> tuple[Dict, Dict | None]:
+        """The state a node runs on, and a recorded update to reuse instead of running it"""
+        state = self.state.state
+        if isinstance(node, ConditionalNode):
+            return state, None
+        recorded = self.find_recorded_output(node, state)
+        if recorded is None and self.record_outputs:
+            state = TrackedState(state)
+        return state, recorded
+
+    def record_output(self, node: BaseNode, state: Dict, res, reused: bool):
+        step = (self.run_state.step_count, node.id)
+        if reused:
+            self.run_state.reused.append(step)
+            return
+        if self.run_state.replaying and not isinstance(node, ConditionalNode):
+            self.run_state.recomputed.append(step)
+        if isinstance(state, TrackedState) and node.status == NodeStatus.SUCCESS:
+            self.records.setdefault(node.id, []).append((state, res))
+
     def run_node_callable(self, node: BaseNode) -> NodeResult:
         node.status = NodeStatus.RUNNING
+        start = time.perf_counter()
+        # Worker threads don't inherit the loop's context, pass the run's context explicitly
+        token = set_run_context(self.context)
+        trace_token = set_current_trace(self.trace)
         try:
             func = self.get_node_callable(node.id)
-            if node.is_async:
-                res = asyncio.run(func(self.state.state))
-            else:
-                res = func(self.state.state)
-
-            node.status = NodeStatus.SUCCESS
-            node.is_visited = True
-
-            self.validate_node_callable_res(node, res)
+            state, res = self.node_input(node)
+            reused = res is not None
+            if not reused:
+                res = asyncio.run(func(state)) if node.is_async else func(state)
+            node_result = self.build_node_result(node, res)
+            self.record_output(node, state, res, reused)
+        except ValueError as e:
+            raise
+        except KeyError as e:
+            raise 
+        except Exception as e:
+            node_result = self.build_failed_node_result(node, e)
+        finally:
+            reset_run_context(token)
+            reset_current_trace(trace_token)
+        self.latency_stats.update(node.id, time.perf_counter() - start)
+        self.trace_node(node, start, node_result)
+        node.result = node_result
+        return node_result
 
-            node_result = NodeResult(
-                status = node.status,
-                msg = Message(
-                    node,
-                    content = res
-                )
-            )
+    async def arun_node_callable(self, node: BaseNode) -> NodeResult:
+        """
+        Runs an async node on the caller's event loop instead of spinning up
+        a new loop in a worker thread, so loop-bound clients can be shared
+        """
+        node.status = NodeStatus.RUNNING
+        start = time.perf_counter()
+        token = set_run_context(self.context)
+        trace_token = set_current_trace(self.trace)
+        try:
+            func = self.get_node_callable(node.id)
+            state, res = self.node_input(node)
+            reused = res is not None
+            if not reused:
+                res = await (self.run_map(node, state) if isinstance(node, MapNode) else func(state))
+            node_result = self.build_node_result(node, res)
+            self.record_output(node, state, res, reused)
         except ValueError as e:
             raise
         except KeyError as e:
             raise 
         except Exception as e:
-            node.status = NodeStatus.FAILED
-            node.is_visited = True
-            node_result = NodeResult(
-                status = node.status,
-                msg= Message(
-                    node,
-                    content = {
-                        "INTERNAL_NODE_ERROR": f"{str(e)}"
-                    }
-                ),
-                error=e
-            )
+            node_result = self.build_failed_node_result(node, e)
+        finally:
+            reset_run_context(token)
+            reset_current_trace(trace_token)
+        self.latency_stats.update(node.id, time.perf_counter() - start)
+        self.trace_node(node, start, node_result)
         node.result = node_result
         return node_result
+
+    def trace_node(self, node: BaseNode, start: float, node_result: NodeResult, **args):
+        """Records a node's span in the run's trace, routers report the route they picked"""
+        if self.trace is None:
+            return
+        cat = "node"
+        if isinstance(node, ConditionalNode):
+            cat = "router"
+            args["route"] = node_result.msg.content
+        self.trace.complete(
+            node.id, cat, start, time.perf_counter(),
+            step=self.run_state.step_count, status=node.status.name, **args,
+        )
         
+    async def run_map(self, node: MapNode, state: Dict) -> Dict:
+        """
+        Runs a map node's tasks and reduces their updates. With max_concurrency
+        the tasks take the run's shared slots (see stream), so the cap holds
+        across every node and map task of the run.
+        """
+        items = state[node.over]
+        if not isinstance(items, list):
+            raise TypeError(f"Error: map node {node.id} expected a list in {node.over}, but received: {type(items).__name__}")
+        chunks = node.chunks(items)
+        limit = self.run_state.task_slots or asyncio.Semaphore(self.max_concurrency or max(len(chunks), 1))
+        remote = node.id in self.remote_nodes
+
+        async def run_chunk(chunk: list) -> Dict:
+            chunk_state = dict(state)
+            chunk_state[node.over] = chunk
+            async with limit:
+                if node.func_is_async:
+                    update = await node.callable(chunk_state)
+                elif remote:
+                    update, _ = await self.executor.submit(node.id, node.callable, chunk_state)
+                else:
+                    update = await self.run_in_pool(node.callable, chunk_state)
+            if not isinstance(update, Dict):
+                raise ValueError(f"ERROR: Expected dict as output type")
+            return update
+
+        tasks = [asyncio.ensure_future(run_chunk(chunk)) for chunk in chunks]
+        try:
+            updates = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return node.reducer(updates)
+
     def update_active_status(self, node: BaseNode) -> NodeActiveStatus:
         # Check if the node loops to itself
         if node.id in self.adjacency_list.get(node.id):
@@ -437,26 +971,313 @@ class Graph:
         self.run_state.nodes_status_map[node_id] = NodeActiveStatus.ACTIVE
         return self.run_node_callable(node).msg
 
+    async def arun_bsp(self, node_id):
+        node = self.get_node_by_id(node_id)
+        self.run_state.nodes_status_map[node_id] = NodeActiveStatus.ACTIVE
+        return (await self.arun_node_callable(node)).msg
+
+    async def arun_remote(self, node_id: str) -> Message:
+        """Runs a plain sync node on the graph's executor backend"""
+        node = self.get_node_by_id(node_id)
+        self.run_state.nodes_status_map[node_id] = NodeActiveStatus.ACTIVE
+        node.status = NodeStatus.RUNNING
+        start = time.perf_counter()
+        elapsed = None
+        try:
+            state, res = self.node_input(node)
+            reused = res is not None
+            if not reused:
+                res, elapsed = await self.executor.submit(node_id, node.callable, dict.copy(state))
+                if isinstance(state, TrackedState):
+                    # Reads in the worker aren't seen, count every shipped key as read
+                    keys = self.executor.reads(node_id)
+                    if keys is None:
+                        state.read_all = True
+                    else:
+                        state.reads.update(keys)
+            node_result = self.build_node_result(node, res)
+            self.record_output(node, state, res, reused)
+        except ValueError as e:
+            raise
+        except KeyError as e:
+            raise
+        except Exception as e:
+            node_result = self.build_failed_node_result(node, e)
+        # The worker's run time when there is one, so transport doesn't count towards inlining
+        self.latency_stats.update(node_id, elapsed if elapsed is not None else time.perf_counter() - start)
+        self.trace_node(node, start, node_result, remote=True)
+        node.result = node_result
+        return node_result.msg
+
     def apply_partial_update(self, msg: Message):
         node = msg.node
         node.internal_inbox_msg = msg
         self.node_registry[node.id] = node
 
     async def run_bsp_async(self, active_node_ids: list[str]):
-        loop = asyncio.get_running_loop()
-
-        msgs = await asyncio.gather(*[
-            loop.run_in_executor(None, self.run_bsp, node_id)
-            for node_id in active_node_ids
-        ])
+        active_node_ids = list(active_node_ids)
+        if self.max_concurrency is None or len(active_node_ids) <= self.max_concurrency:
+            msgs = await asyncio.gather(*[
+                self.dispatch_node(node_id)
+                for node_id in active_node_ids
+            ])
+        else:
+            msgs = await self.run_capped(active_node_ids)
 
         for msg in msgs:
             self.apply_partial_update(msg)
 
-    def compile(self):
+    async def run_capped(self, node_ids: list[str]) -> list[Message]:
+        """
+        Runs at most max_concurrency nodes at a time. The scheduling policy
+        orders the queue, and a free slot goes to the next node in that order.
+        """
+        queue = self.scheduling_policy.order(self, node_ids)
+        queue.reverse()
+        running = set()
+        msgs = []
+        try:
+            while queue or running:
+                while queue and len(running) < self.max_concurrency:
+                    running.add(self.dispatch_node(queue.pop()))
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    msgs.append(task.result())
+        finally:
+            for task in running:
+                task.cancel()
+        return msgs
+
+    def get_parent_counts(self) -> Dict[str, int]:
+        """
+        Number of distinct parents per node in one pass over the edges.
+        START and router results count as parents.
+        """
+        parent_counts = {node_id: 0 for node_id in self.node_registry}
+        start_node_id = self.adjacency_list.get(START)
+        if start_node_id in parent_counts:
+            parent_counts[start_node_id] += 1
+
+        for parent_id, children in self.adjacency_list.items():
+            if parent_id == START:
+                continue
+            if isinstance(children, dict):
+                children = children.values()
+            for child_id in set(children):
+                if child_id in parent_counts:
+                    parent_counts[child_id] += 1
+        return parent_counts
+
+    def compute_join_counters(self):
+        # In-degree per join node, START doesn't count since it never finishes
+        parent_counts = self.get_parent_counts()
+        start_node_id = self.adjacency_list.get(START)
+        self.join_required = {}
+        self.join_in_degree = {}
+        for node_id, node in self.node_registry.items():
+            join = node.join
+            if join is None:
+                continue
+            in_degree = parent_counts[node_id] - (1 if node_id == start_node_id else 0)
+            self.join_in_degree[node_id] = in_degree
+            if join == "all":
+                self.join_required[node_id] = in_degree
+            elif join > in_degree:
+                raise ValueError(f"Error: join node {node_id} waits for {join} parents but only has {in_degree}")
+            else:
+                self.join_required[node_id] = join
+
+    def join_children(self, parent_id: str, children: list[str]) -> list[str]:
+        """
+        Counts the parent's arrival at each join child and only returns the
+        children that are ready to run. Non-join children are always ready.
+        A quorum join runs once per wave: parents of the wave that were still
+        on their way when it ran are absorbed (see settle_fired_joins), any
+        other arrival starts a new wave.
+        """
+        ready = []
+        for child_id in children:
+            required = self.join_required.get(child_id)
+            if required is None:
+                ready.append(child_id)
+                continue
+            fired = self.run_state.join_fired.get(child_id)
+            if fired is not None:
+                if child_id in self.run_state.join_unsettled:
+                    # Ran in this barrier, a sibling finishing alongside belongs to the wave
+                    fired.add(parent_id)
+                    continue
+                if parent_id in fired:
+                    fired.discard(parent_id)
+                    if not fired:
+                        del self.run_state.join_fired[child_id]
+                    continue
+                del self.run_state.join_fired[child_id]
+            arrivals = self.run_state.join_arrivals.setdefault(child_id, set())
+            arrivals.add(parent_id)
+            if len(arrivals) >= required:
+                del self.run_state.join_arrivals[child_id]
+                if len(arrivals) < self.join_in_degree[child_id]:
+                    self.run_state.join_fired[child_id] = arrivals
+                    self.run_state.join_unsettled.add(child_id)
+                ready.append(child_id)
+        return ready
+
+    def settle_fired_joins(self, pending: Iterable[str]):
+        """
+        For the joins that ran in this barrier, keeps the parents still on
+        their way: those the pending nodes (running or about to run) reach
+        without passing through the join. Only they are absorbed later, a
+        parent activated afterwards (e.g. by the next pass of a loop) counts
+        towards a new wave.
+        """
+        if not self.run_state.join_unsettled:
+            return
+        pending = list(pending)
+        for join_id in self.run_state.join_unsettled:
+            arrived = self.run_state.join_fired[join_id]
+            reachable = set()
+            stack = [node_id for node_id in pending if node_id != join_id]
+            while stack:
+                node_id = stack.pop()
+                if node_id in reachable or node_id == join_id or node_id == END:
+                    continue
+                reachable.add(node_id)
+                stack.extend(self.node_children(node_id))
+            on_their_way = {
+                parent_id for parent_id in reachable - arrived
+                if join_id in self.node_children(parent_id)
+            }
+            if on_their_way:
+                self.run_state.join_fired[join_id] = on_their_way
+            else:
+                del self.run_state.join_fired[join_id]
+        self.run_state.join_unsettled = set()
+
+    def node_children(self, node_id: str) -> Iterable[str]:
+        children = self.adjacency_list.get(node_id) or []
+        return children.values() if isinstance(children, dict) else children
+
+    def release_pending_joins(self) -> list[str]:
+        # Nothing else can run, so parents that haven't arrived were never activated
+        ready = list(self.run_state.join_arrivals.keys())
+        self.run_state.join_arrivals = {}
+        self.run_state.join_fired = {}
+        self.run_state.join_unsettled = set()
+        return ready
+
+    def is_fusable(self, node_id: str) -> bool:
+        # Only plain sync nodes: routers, tool nodes and async nodes keep their own dispatch
+        node = self.node_registry.get(node_id)
+        return (
+            type(node) is Node and not node.is_async and not node.is_io_bound
+            and node_id not in self.remote_nodes
+        )
+
+    def find_remote_nodes(self) -> set:
+        """Plain sync nodes whose callable can be pickled, the ones the executor may run"""
+        remote_nodes = set()
+        for node_id, node in self.node_registry.items():
+            if isinstance(node, MapNode):
+                # The map node stays here, its tasks are shipped
+                if node.func_is_async:
+                    continue
+            elif type(node) is not Node or node.is_async or node.is_io_bound:
+                continue
+            try:
+                pickle.dumps(node.callable)
+            except Exception:
+                # Lambdas, closures and bound methods of unpicklable objects stay local
+                continue
+            remote_nodes.add(node_id)
+        return remote_nodes
+
+    def fuse_linear_chains(self):
+        """
+        Finds edges X -> Y where X only routes to Y and Y is only reached from X.
+        When X is the only active node, the engine runs X, Y, ... back to back
+        in one task instead of one superstep dispatch + barrier per node.
+        """
+        parent_counts = self.get_parent_counts()
+        self.fused_next = {}
+        for node_id in self.node_registry:
+            children = self.adjacency_list.get(node_id)
+            if not isinstance(children, list) or len(children) != 1:
+                continue
+            child_id = children[0]
+            if child_id == node_id or child_id == END:
+                continue
+            if self.is_fusable(node_id) and self.is_fusable(child_id) and parent_counts[child_id] == 1:
+                self.fused_next[node_id] = child_id
+
+    def compile(
+        self,
+        fuse: bool = True,
+        mode: str = BSP,
+        max_concurrency: int | None = None,
+        scheduling_policy: SchedulingPolicy | None = None,
+        speculation: str | None = None,
+        inline_threshold: float | None = INLINE_THRESHOLD,
+        executor: ExecutorBackend | None = None,
+        fixed_point: str | None = None,
+        tracer: TraceRecorder | None = None,
+        fair_scheduler: FairScheduler | None = None,
+    ):
+        """
+        fuse: run linear chains of plain nodes back to back (BSP only)
+        mode: BSP (supersteps with barriers) or DATAFLOW (no barriers)
+        max_concurrency: cap on nodes running at once, None for no cap
+        scheduling_policy: which ready nodes get the free slots first when
+            capped, defaults to the longest estimated path to END
+        speculation: while a node that feeds a router runs, start the router's
+            speculative targets on the current state: LIKELY (the target the
+            router picked most often) or ALL. None turns speculation off.
+            Under max_concurrency, speculative runs only take spare slots
+        inline_threshold: sync nodes whose measured run time is below this many
+            seconds run directly on the event loop instead of the thread pool.
+            None always uses the thread pool (unless a node sets inline=True)
+        executor: runs plain sync nodes with picklable callables out of process
+            (e.g. a ProcessBackend), instead of the thread pool. Nodes forced or
+            proven inline, routers, tool, async and subgraph nodes stay local
+        fixed_point: fingerprint the state and the nodes about to run at every
+            barrier. When a fingerprint repeats, a loop is going round without
+            changing anything: STOP ends the run there, RAISE raises a
+            RuntimeError. Assumes nodes are deterministic. None doesn't check
+        tracer: record a timeline of the sampled runs (supersteps, nodes,
+            routers, merges, tool and model calls) into this TraceRecorder.
+            None (default) records nothing
+        fair_scheduler: run sync nodes in this FairScheduler's threads instead
+            of the loop's default executor. Share one between graphs to split
+            its workers across tenants and runs by weight and priority (see
+            new_run). None (default) uses the default executor
+        """
+        if mode not in (BSP, DATAFLOW):
+            raise ValueError(f"Error: unknown execution mode {mode}, expected '{BSP}' or '{DATAFLOW}'")
+        if speculation not in (None, LIKELY, ALL):
+            raise ValueError(f"Error: unknown speculation {speculation}, expected '{LIKELY}' or '{ALL}'")
+        if fixed_point not in (None, STOP, RAISE):
+            raise ValueError(f"Error: unknown fixed_point {fixed_point}, expected '{STOP}' or '{RAISE}'")
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError(f"Error: max_concurrency must be at least 1, but received: {max_concurrency}")
+        self.mode = mode
+        self.max_concurrency = max_concurrency
+        self.speculation = speculation
+        self.inline_threshold = inline_threshold
+        self.executor = executor
+        self.fixed_point = fixed_point
+        self.tracer = tracer
+        self.fair_scheduler = fair_scheduler
+        if scheduling_policy is not None:
+            self.scheduling_policy = scheduling_policy
+
         # Freeze the graph and ensure no nodes / edges can be added after compilation
         self.frozen = True
 
+        # Flatten subgraphs into this plan where possible
+        for node in list(self.node_registry.values()):
+            if isinstance(node, SubgraphNode) and self.can_inline_subgraph(node):
+                self.inline_subgraph(node)
+
         # Validate that there are no orphaned nodes (no child nodes, no parent nodes)
         for node_id in self.node_registry.keys():
             # Check if it is the last node (no children)
@@ -489,74 +1310,699 @@ class Graph:
         if self.adjacency_list.get(START) == None:
             raise RuntimeError(f"Error: no START node found")
 
-    async def invoke(self):
+        self.compute_join_counters()
+        self.remote_nodes = self.find_remote_nodes() if executor is not None else set()
+
+        # Dataflow mode has no barriers to save, fusion only applies to BSP
+        if fuse and mode == BSP:
+            self.fuse_linear_chains()
+
+    def new_blob_store(self) -> BlobStore | None:
+        if self.blob_threshold is None:
+            return None
+        return BlobStore(self.blob_threshold, self.blob_dir)
+
+    def new_run(
+        self,
+        state: State,
+        tenant: str | None = None,
+        weight: float = 1.0,
+        priority: int = 0,
+        max_tasks: int | None = None,
+    ) -> 'Graph':
+        """
+        Returns a copy of the compiled graph with its own state, run state and
+        node instances. The adjacency list and callables are shared, so a graph
+        can be compiled once and invoked concurrently with isolated state.
+
+        tenant, weight, priority, max_tasks: how the run's sync node tasks share
+        the compile(fair_scheduler=...) workers with other runs of the same
+        tenant: a weight times bigger share, ahead of lower priorities, at most
+        max_tasks running at once. The tenant's own weight, priority and cap are
+        set on the FairScheduler. Ignored without a fair scheduler
+        """
+        if self.frozen is False:
+            raise RuntimeError(f"Error: graph must be compiled before creating a run")
+        if weight <= 0:
+            raise ValueError(f"Error: weight must be positive, but received: {weight}")
+        if max_tasks is not None and max_tasks < 1:
+            raise ValueError(f"Error: max_tasks must be at least 1, but received: {max_tasks}")
+
+        run = copy.copy(self)
+        run.node_registry = {}
+        for node_id, node in self.node_registry.items():
+            run_node = copy.copy(node)
+            run_node.status = NodeStatus.INITIALIZED
+            run_node.is_visited = False
+            run_node.internal_inbox_msg = None
+            run_node.result = None
+            run.node_registry[node_id] = run_node
+
+        run.run_state = RunState()
+        run.run_state.set_max_retries(self.run_state.max_retries)
+        run.blob_store = self.new_blob_store()
+        run_state = state.state
+        if run.blob_store is not None:
+            run_state = run.blob_store.externalize_update(run_state)
+        run.state = self.default_state._update_state(run_state)
+        run.history = [run.state]
+        run.records = {}
+        run.step_nodes = []
+        run.tenant = tenant if tenant is not None else self.tenant
+        run.run_weight = weight
+        run.run_priority = priority
+        run.run_cap = max_tasks
+        return run
+
+    def run_in_pool(self, func: Callable, *args) -> asyncio.Future:
+        """Runs a sync func in a worker thread, through the fair scheduler when there is one.
+        Both copy the caller's contextvars, like asyncio.to_thread"""
+        if self.fair_scheduler is None:
+            context = contextvars.copy_context()
+            return asyncio.get_running_loop().run_in_executor(None, functools.partial(context.run, func, *args))
+        return asyncio.ensure_future(self.fair_scheduler.run(
+            func, *args,
+            tenant=self.tenant,
+            run_id=id(self),
+            weight=self.run_weight,
+            priority=self.run_priority,
+            cap=self.run_cap,
+        ))
+
+    def run_fused_chain(self, node_id: str) -> tuple[str, list[dict]]:
+        """
+        Runs a fused chain starting at the only active node. Every node is its
+        own step (state merge, history entry, step count), only the dispatch
+        and barrier are skipped. Stops before the last node of the chain, on a
+        failed node or when the step budget is used, and returns the node that
+        is still active so the regular superstep handles it.
+        """
+        updates = []
+        while self.fused_next.get(node_id) is not None:
+            if self.run_state.step_count >= self.run_state.max_retries - 1:
+                break
+            if self.deadline_reached():
+                break
+
+            node = self.get_node_by_id(node_id)
+            self.run_node_callable(node)
+            if node.status != NodeStatus.SUCCESS:
+                break
+            # A chain abandoned at the deadline must not commit a late update
+            if self.deadline_reached():
+                break
+
+            # Fused barrier: a single message, so merging is an overlay
+            next_node_id = self.fused_next[node_id]
+            self.run_state.nodes_status_map[node_id] = NodeActiveStatus.INACTIVE
+            self.commit_state([node.result.msg])
+            self.run_state.nodes_status_map[next_node_id] = NodeActiveStatus.ACTIVE
+
+            updates.append({
+                "step": self.run_state.step_count,
+                "nodes": [node_id],
+                "state": self.state.state,
+            })
+            self.run_state.step_count += 1
+            node_id = next_node_id
+        return node_id, updates
+
+    def record_history(self, state: State):
+        self.history.append(state)
+        if self.history_limit is not None and len(self.history) > self.history_limit:
+            del self.history[:-self.history_limit]
+
+    def commit_state(self, msgs: List[Message]):
+        """
+        Barrier step shared by every mode: merge the messages into a new state,
+        record it, then release the messages. After this the payloads are only
+        referenced by the state (and history), not by nodes or inbox buffers.
+        """
+        start = time.perf_counter()
+        if self.blob_store is not None:
+            # Large values are stored once, merges, state and history only move references
+            for msg in msgs:
+                msg.content = self.blob_store.externalize_update(msg.content)
+        update = self.run_state.merge_state(msgs)
+        new_state = self.state._update_state(update)
+        if self.run_state.fixed_point is not None:
+            self.run_state.fixed_point.update(update, update.keys())
+        self.record_history(new_state)
+        if self.history_limit is None:
+            self.step_nodes.append([msg.node.id for msg in msgs])
+        self.state = new_state
+        if self.trace is not None:
+            self.trace.complete("merge", "merge", start, time.perf_counter(), step=self.run_state.step_count, messages=len(msgs))
+
+        if self.keep_results:
+            self.run_state.inbox_msgs = list(msgs)
+            return
+
+        self.run_state.inbox_msgs = []
+        for msg in msgs:
+            node = msg.node
+            node.internal_inbox_msg = None
+            if node.result is not None and node.result.msg is msg:
+                node.result.msg = None
+
+    async def invoke(
+        self,
+        deadline: 'float | RunContext | None' = None,
+        replay_from: int | None = None,
+        overrides: Dict | None = None,
+        recompute: List[str] | None = None,
+    ):
+        async for _ in self.stream(deadline, replay_from, overrides, recompute):
+            pass
+
+    def prepare_replay(self, step: int, overrides: Dict | None, recompute: List[str] | None):
+        """
+        Rewinds the run to the start of `step`: the state before it (plus the
+        overrides) and the nodes that ran in it become active again. History
+        and step records after it are dropped.
+        """
+        if self.mode != BSP:
+            raise ValueError(f"Error: replay_from is only supported in '{BSP}' mode")
+        if self.history_limit is not None:
+            raise ValueError(f"Error: replay_from needs the full history, the graph has history_limit={self.history_limit}")
+        if not 0 <= step < len(self.step_nodes):
+            raise ValueError(f"Error: no recorded step {step}, the run has {len(self.step_nodes)} steps")
+
+        overrides = overrides or {}
+        state = self.history[step].state
+        for key in overrides:
+            if key not in state:
+                raise KeyError(f"ERROR: Key {key} not found in state")
+        for node_id in recompute or []:
+            if node_id not in self.node_registry:
+                raise KeyError(f"ERROR: Node {node_id} not found in graph")
+
+        del self.history[step + 1:]
+        self.state = self.history[step]._update_state(overrides)
+        if overrides:
+            self.history[step] = self.state
+        active_nodes = self.step_nodes[step]
+        del self.step_nodes[step:]
+
+        self.run_state.step_count = step
+        self.run_state.nodes_status_map = {node_id: NodeActiveStatus.ACTIVE for node_id in active_nodes}
+        self.run_state.join_arrivals = {}
+        self.run_state.join_fired = {}
+        self.run_state.join_unsettled = set()
+        self.run_state.deadline_exceeded = False
+        self.run_state.replaying = True
+        self.run_state.recompute = set(recompute or [])
+        self.run_state.recomputed = []
+        self.run_state.reused = []
+
+    def reached_fixed_point(self, active: List[str]) -> bool:
+        """
+        True if the run should stop because this barrier repeats an earlier
+        one: same state, same nodes about to run, same pending joins
+        """
+        detector = self.run_state.fixed_point
+        if detector is None or not active:
+            return False
+        earlier = detector.repeated(self.run_state.step_count, active, self.run_state.join_arrivals, self.run_state.join_fired)
+        if earlier is None:
+            return False
+        self.run_state.fixed_point_step = self.run_state.step_count
+        if self.fixed_point == RAISE:
+            raise RuntimeError(
+                f"Error: the run reached a fixed point, step {self.run_state.step_count} "
+                f"left the same state and active nodes {sorted(active)} as step {earlier}"
+            )
+        return True
+
+    def deadline_reached(self) -> bool:
+        if self.context.expired():
+            self.run_state.deadline_exceeded = True
+            return True
+        return False
+
+    def dispatch_node(self, node_id: str) -> asyncio.Future:
+        # A node started speculatively only has to be checked
+        if node_id in self.run_state.speculative:
+            return asyncio.ensure_future(self.consume_speculation(node_id))
+        slots = self.run_state.task_slots
+        if slots is not None:
+            return asyncio.ensure_future(self.start_node_in_slot(slots, node_id))
+        self.launch_speculation(node_id)
+        return self.start_node(node_id)
+
+    async def start_node_in_slot(self, slots: asyncio.Semaphore, node_id: str) -> Message:
+        # Speculation starts once the node holds its slot, so it only gets spare ones
+        if isinstance(self.get_node_by_id(node_id), MapNode):
+            # Map nodes only wait for their tasks, which take the slots themselves
+            await self.launch_speculation_in_slots(slots, node_id)
+            return await self.start_node(node_id)
+        async with slots:
+            await self.launch_speculation_in_slots(slots, node_id)
+            return await self.start_node(node_id)
+
+    def start_node(self, node_id: str) -> asyncio.Future:
+        # Async and IO-bound nodes are awaited on the loop, sync nodes go to the thread pool
+        node = self.get_node_by_id(node_id)
+        if node.is_async or node.is_io_bound:
+            return asyncio.ensure_future(self.arun_bsp(node_id))
+        if self.should_inline(node):
+            return self.run_inline(node_id)
+        if node_id in self.remote_nodes:
+            return asyncio.ensure_future(self.arun_remote(node_id))
+        return self.run_in_pool(self.run_bsp, node_id)
+
+    def should_inline(self, node: BaseNode) -> bool:
+        if node.inline is not None:
+            return node.inline
+        if self.inline_threshold is None:
+            return False
+        return self.latency_stats.is_proven_below(node.id, self.inline_threshold, INLINE_MIN_SAMPLES)
+
+    def chain_is_inline(self, node_id: str) -> bool:
+        """True if every node a fused chain starting at node_id runs before handing back would run inline"""
+        while self.fused_next.get(node_id) is not None:
+            if not self.should_inline(self.get_node_by_id(node_id)):
+                return False
+            node_id = self.fused_next[node_id]
+        return True
+
+    def run_inline(self, node_id: str) -> asyncio.Future:
+        """
+        Runs a cheap sync node right away on the loop thread. A run that turns
+        out slow raises the node's estimate, so it goes back to the thread pool.
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            future.set_result(self.run_bsp(node_id))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def speculation_targets(self, node_id: str) -> list[str]:
+        """Speculative targets of the router that node_id feeds, if it feeds one"""
+        children = self.adjacency_list.get(node_id)
+        if not isinstance(children, list) or len(children) != 1:
+            return []
+        router = self.node_registry.get(children[0])
+        if not isinstance(router, ConditionalNode):
+            return []
+
+        targets = list(dict.fromkeys(self.adjacency_list.get(router.id, {}).values()))
+        candidates = [
+            target for target in targets
+            if target != END
+            and target != node_id
+            and self.node_registry[target].speculative
+            and target not in self.run_state.speculative
+            and self.run_state.nodes_status_map.get(target) != NodeActiveStatus.ACTIVE
+        ]
+        if self.speculation == LIKELY:
+            return self.speculation_stats.likely_targets(router.id, targets, candidates)
+        return candidates
+
+    def launch_speculation(self, node_id: str):
+        if self.speculation is None:
+            return
+        for target in self.speculation_targets(node_id):
+            self.launch_speculative_run(node_id, target)
+
+    async def launch_speculation_in_slots(self, slots: asyncio.Semaphore, node_id: str):
+        """Like launch_speculation under max_concurrency: a target runs only if a slot is free, else it is skipped"""
+        if self.speculation is None:
+            return
+        for target in self.speculation_targets(node_id):
+            if slots.locked():
+                return
+            # A free slot is taken without waiting
+            await slots.acquire()
+            task = self.launch_speculative_run(node_id, target)
+            # Released even if the run is cancelled before it starts
+            task.add_done_callback(lambda _: slots.release())
+
+    def launch_speculative_run(self, node_id: str, target: str) -> asyncio.Future:
+        tracked = TrackedState(self.state.state)
+        task = asyncio.ensure_future(self.run_speculative(target, tracked))
+        self.run_state.speculative[target] = (node_id, task, tracked, time.perf_counter())
+        self.speculation_stats.launched += 1
+        return task
+
+    async def run_speculative(self, node_id: str, tracked: TrackedState) -> tuple:
+        """Runs a node's callable on a tracked copy of the state, without touching the node"""
+        node = self.get_node_by_id(node_id)
+        func = self.get_node_callable(node_id)
+        start = time.perf_counter()
+        token = set_run_context(self.context)
+        trace_token = set_current_trace(self.trace)
+        try:
+            if node.is_async:
+                res = await func(tracked)
+            else:
+                res = await self.run_in_pool(func, tracked)
+            return res, None, time.perf_counter() - start
+        except Exception as e:
+            return None, e, time.perf_counter() - start
+        finally:
+            reset_run_context(token)
+            reset_current_trace(trace_token)
+            if self.trace is not None:
+                self.trace.complete(node_id, "speculative", start, time.perf_counter(), step=self.run_state.step_count)
+
+    async def consume_speculation(self, node_id: str) -> Message:
+        """
+        Uses the speculative result if the node read nothing that changed
+        since it started, otherwise runs the node again on the current state
+        """
+        _, task, tracked, started = self.run_state.speculative.pop(node_id)
+        node = self.get_node_by_id(node_id)
+        self.run_state.nodes_status_map[node_id] = NodeActiveStatus.ACTIVE
+        res, error, elapsed = await task
+
+        if error is None and tracked.is_still_valid(self.state.state):
+            self.speculation_stats.hits += 1
+            node.status = NodeStatus.RUNNING
+            node.result = self.build_node_result(node, res)
+            # Recorded and traced like a regular run, the tracked reads are still valid
+            self.record_output(node, tracked if self.record_outputs else self.state.state, res, reused=False)
+            self.latency_stats.update(node_id, elapsed)
+            self.trace_node(node, started, node.result, speculative=True)
+            return node.result.msg
+
+        self.speculation_stats.stale += 1
+        self.speculation_stats.wasted_seconds += elapsed
+        # No longer speculative, so this picks the inline, remote or thread pool path
+        return await self.dispatch_node(node_id)
+
+    def resolve_speculation(self, parent_id: str, chosen: list[str]):
+        """Drops the speculative runs started for parent_id that its router didn't pick"""
+        for target, (spec_parent_id, task, _, started) in list(self.run_state.speculative.items()):
+            if spec_parent_id != parent_id or target in chosen:
+                continue
+            del self.run_state.speculative[target]
+            self.speculation_stats.misses += 1
+            if task.done():
+                self.speculation_stats.wasted_seconds += task.result()[2]
+            else:
+                task.cancel()
+                self.speculation_stats.wasted_seconds += time.perf_counter() - started
+
+    def cancel_speculation(self):
+        for _, task, _, _ in self.run_state.speculative.values():
+            task.cancel()
+        self.run_state.speculative.clear()
+
+    def merge_sibling_writes(self, msg: Message, writes: Dict[str, list]):
+        """
+        Records msg's writes among its siblings' and turns every key an
+        earlier sibling also wrote into the list of their values, in order
+        """
+        if not isinstance(msg.content, dict):
+            return
+        if self.blob_store is not None:
+            msg.content = self.blob_store.externalize_update(msg.content)
+        for key, value in list(msg.content.items()):
+            values = writes.setdefault(key, [])
+            values.append(value)
+            if len(values) == 1:
+                continue
+            merged = {}
+            for earlier in values:
+                if self.run_state.get_type(earlier) == "unknown type":
+                    raise TypeError(f"Type {type(earlier)} is unknown")
+                self.run_state.merge_content(self.run_state.get_type(earlier), merged, key, earlier)
+            msg.content[key] = merged[key]
+
+    async def stream_dataflow(self):
+        """
+        Barrier-free execution: a node's update is merged as soon as it
+        finishes and the children it activates start right away, so a fast
+        branch never waits for a slow sibling.
+
+        Same routing and termination rules as BSP (routers pick children,
+        failed nodes and self loops run again, the run ends when nothing is
+        running or activated). Differences:
+        - a step is one node completion, max_retries bounds node runs
+        - updates are merged one at a time: a key is only turned into a list
+          when siblings started by the same activation both write it (their
+          values are then accumulated like a BSP merge, in finish order)
+        - a node activated while it is running runs again once it finishes
+        """
+        running: Dict[asyncio.Future, str] = {}
+        # Activated nodes waiting for a slot when max_concurrency is set
+        ready: List[str] = []
+        rerun = set()
+        launched = 0
+        # Keys written so far by the siblings of each launched node's activation
+        sibling_writes: Dict[str, Dict[str, list]] = {}
+
+        def launch(node_id: str, writes: Dict[str, list] | None = None):
+            nonlocal launched
+            if node_id in running.values():
+                rerun.add(node_id)
+                return
+            if node_id in ready:
+                return
+            if launched >= self.run_state.max_retries:
+                return
+            launched += 1
+            self.run_state.nodes_status_map[node_id] = NodeActiveStatus.ACTIVE
+            ready.append(node_id)
+            if writes is not None:
+                sibling_writes[node_id] = writes
+
+        def start_ready():
+            free_slots = len(ready) if self.max_concurrency is None else self.max_concurrency - len(running)
+            if free_slots <= 0 or not ready:
+                return
+            if self.max_concurrency is not None and len(ready) > free_slots:
+                ready[:] = self.scheduling_policy.order(self, ready)
+            for node_id in ready[:free_slots]:
+                running[self.dispatch_node(node_id)] = node_id
+            del ready[:free_slots]
+
+        launch(self.adjacency_list.get(START))
+        start_ready()
+        try:
+            while running:
+                if self.deadline_reached():
+                    break
+                done, _ = await asyncio.wait(
+                    list(running.keys()),
+                    timeout=self.context.remaining(),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    node_id = running.pop(task)
+                    msg = task.result()
+                    node = self.get_node_by_id(node_id)
+                    new_active_status = self.update_active_status(node)
+                    self.run_state.nodes_status_map[node_id] = NodeActiveStatus.INACTIVE
+
+                    # Incremental merge of this node's update only
+                    writes = sibling_writes.pop(node_id, None)
+                    if writes is not None:
+                        self.merge_sibling_writes(msg, writes)
+                    self.commit_state([msg])
+                    msg = None
+
+                    to_launch = [node_id] if new_active_status == NodeActiveStatus.ACTIVE else []
+                    if node_id in rerun:
+                        rerun.discard(node_id)
+                        to_launch.append(node_id)
+                    active_children = self.activate_local_children_nodes(node_id)
+                    self.resolve_speculation(node_id, active_children)
+                    to_launch += self.join_children(node_id, active_children)
+
+                    yield {
+                        "step": self.run_state.step_count,
+                        "nodes": [node_id],
+                        "state": self.state.state,
+                    }
+                    # Only a lone pending step is a barrier: nothing else can still change the state
+                    if not running and not ready and self.reached_fixed_point(list(dict.fromkeys(to_launch))):
+                        return
+                    self.run_state.step_count += 1
+
+                    to_launch = list(dict.fromkeys(to_launch))
+                    writes = {} if len(to_launch) > 1 else None
+                    for child_id in to_launch:
+                        launch(child_id, writes)
+                    self.settle_fired_joins(list(running.values()) + ready)
+
+                if not running and not ready and self.run_state.join_arrivals:
+                    for child_id in self.release_pending_joins():
+                        launch(child_id)
+                start_ready()
+        finally:
+            for task in running:
+                task.cancel()
+            self.cancel_speculation()
+
+    async def stream(
+        self,
+        deadline: 'float | RunContext | None' = None,
+        replay_from: int | None = None,
+        overrides: Dict | None = None,
+        recompute: List[str] | None = None,
+    ):
+        """
+        Runs the graph and yields an update after every superstep barrier:
+        {"step": int, "nodes": [node ids that ran], "state": dict}
+
+        deadline: time budget in seconds (or a RunContext to share one deadline).
+            Without one, a run started from inside another run's node inherits
+            that run's deadline. When it passes, nodes still running are
+            cancelled (sync nodes are abandoned), the run stops with the state
+            of the last completed step and run_state.deadline_exceeded is set.
+        replay_from: re-run this finished run from the start of a past step,
+            with `overrides` applied to the state of that step (BSP only). With
+            record_outputs, a node whose recorded reads match the current state
+            reuses its recorded update instead of running, unless it is listed
+            in `recompute` (e.g. its code changed). The (step, node id) pairs
+            are reported in run_state.recomputed and run_state.reused.
+            Join nodes waiting for parents at that step start counting again.
+        """
         if self.frozen is False:
             raise RuntimeError(f"Error: graph must be compiled before invocation")
 
+        if isinstance(deadline, RunContext):
+            self.context = deadline
+        elif deadline is not None:
+            self.context = RunContext.with_budget(deadline)
+        else:
+            self.context = get_run_context()
+
+        if replay_from is not None:
+            self.prepare_replay(replay_from, overrides, recompute)
+        self.run_state.fixed_point_step = None
+        self.run_state.fixed_point = FixedPointDetector(self.state.state) if self.fixed_point is not None else None
+        self.trace = self.tracer.start_run(self.mode) if self.tracer is not None else None
+        # Map tasks and speculative runs go beside the nodes the scheduler caps,
+        # so with either every node, map task and speculative run takes one of
+        # max_concurrency shared slots
+        has_map_nodes = any(isinstance(node, MapNode) for node in self.node_registry.values())
+        self.run_state.task_slots = (
+            asyncio.Semaphore(self.max_concurrency)
+            if self.max_concurrency is not None and (has_map_nodes or self.speculation is not None) else None
+        )
+
+        if self.mode == DATAFLOW:
+            async for update in self.stream_dataflow():
+                yield update
+            return
+
         print("adjacency list: ", json.dumps(self.adjacency_list, indent = 2))
         print("\n")
-        init_node_id = self.adjacency_list.get(START)
-        self.run_state.nodes_status_map[init_node_id] = NodeActiveStatus.ACTIVE
-        while True:
-            print("================================ SUPERSTEP ITERATION ", self.run_state.step_count, "===============================")
-            active_nodes = self.get_active_nodes()
-
-            # Process each active node in parallel
-            await self.run_bsp_async(active_nodes)
-
-            # ------ BARRIER --------------------
-
-            # superstep-local bucket for messages
-            local_inbox_msgs = []
-
-            # update the global active / inactive nodes lists based on the node result
-            # NOTE: check from the node_registry for the updated nodes!
-            print("active nodes: ", active_nodes)
-            for active_node_id in active_nodes:
-                node = self.get_node_by_id(active_node_id)
-                new_active_status = self.update_active_status(node)
-                self.run_state.nodes_status_map[node.id] = new_active_status
+        if replay_from is None:
+            init_node_id = self.adjacency_list.get(START)
+            self.run_state.nodes_status_map[init_node_id] = NodeActiveStatus.ACTIVE
+        try:
+            while True:
+                print("================================ SUPERSTEP ITERATION ", self.run_state.step_count, "===============================")
+                step_start = time.perf_counter()
+                if self.deadline_reached():
+                    break
+                active_nodes = self.get_active_nodes()
+
+                # A lone active node at the head of a fused chain runs the chain in one task
+                if len(active_nodes) == 1 and self.fused_next.get(next(iter(active_nodes))) is not None:
+                    head_id = next(iter(active_nodes))
+                    if self.chain_is_inline(head_id):
+                        _, updates = self.run_fused_chain(head_id)
+                    else:
+                        # Bounded like a superstep, an abandoned chain stops before its next commit
+                        try:
+                            _, updates = await asyncio.wait_for(
+                                self.run_in_pool(self.run_fused_chain, head_id), self.context.remaining()
+                            )
+                        except asyncio.TimeoutError:
+                            self.run_state.deadline_exceeded = True
+                            break
+                    for update in updates:
+                        yield update
+                    active_nodes = self.get_active_nodes()
+                    if self.deadline_reached():
+                        break
+
+                # Process each active node in parallel, the superstep is abandoned if the deadline passes
+                try:
+                    await asyncio.wait_for(self.run_bsp_async(active_nodes), self.context.remaining())
+                except asyncio.TimeoutError:
+                    self.run_state.deadline_exceeded = True
+                    break
+
+                # ------ BARRIER --------------------
+
+                # superstep-local bucket for messages
+                local_inbox_msgs = []
+
+                # update the global active / inactive nodes lists based on the node result
+                # NOTE: check from the node_registry for the updated nodes!
+                print("active nodes: ", active_nodes)
+                for active_node_id in active_nodes:
+                    node = self.get_node_by_id(active_node_id)
+                    new_active_status = self.update_active_status(node)
+                    self.run_state.nodes_status_map[node.id] = new_active_status
             
-                # Pass node results to local inbox_msgs buffer
-                local_inbox_msgs.append(node.result.msg)
+                    # Pass node results to local inbox_msgs buffer
+                    local_inbox_msgs.append(node.result.msg)
             
-            print("global inbox msgs: ", self.run_state.inbox_msgs)
-            print("local inbox msgs: ", local_inbox_msgs)
-
-            # Use a merging strategy to append to global inbox
-            # TODO: in the future, allow users to pick a merging strategy (append, overwrite, keep first)
-            print("old state from graph: ", self.state.state)
-            new_content = self.run_state.merge_state(local_inbox_msgs)
-            new_state = self.state._update_state(new_content)
-            self.history.append(new_state)
-            self.state = new_state
-            print("new state from graph: ", self.state.state)
-
-            # Pass local inbox msgs to global buffer
-            self.run_state.inbox_msgs = []
-            for msg in local_inbox_msgs:
-                self.run_state.inbox_msgs.append(msg)
-
-            # Get the children of the active nodes and determine which to activate
-            all_active_children = []
-
-            for active_node_id in active_nodes:
-                active_children = self.activate_local_children_nodes(active_node_id)
-                # Deduplicate children if multiple nodes activate the same ones
-                for child in active_children:
-                    if child not in all_active_children: 
-                        all_active_children.append(child)
-
-            # Activate the child nodes globally for the next superstep
-            self.activate_shared_children_nodes(all_active_children)
-
-            # End if all nodes have finished running
-            if len(self.get_active_nodes()) == 0:
-                break
+                print("global inbox msgs: ", self.run_state.inbox_msgs)
+                print("local inbox msgs: ", local_inbox_msgs)
 
-            # End the loop after n iterations
-            if self.run_state.step_count >= self.run_state.max_retries - 1:
-                break
+                # Use a merging strategy to append to global inbox
+                # TODO: in the future, allow users to pick a merging strategy (append, overwrite, keep first)
+                print("old state from graph: ", self.state.state)
+                # Merges, then releases the superstep's messages (kept in run_state.inbox_msgs with keep_results)
+                self.commit_state(local_inbox_msgs)
+                local_inbox_msgs = None
+                print("new state from graph: ", self.state.state)
+
+                # Get the children of the active nodes and determine which to activate
+                all_active_children = []
+
+                for active_node_id in active_nodes:
+                    active_children = self.activate_local_children_nodes(active_node_id)
+                    self.resolve_speculation(active_node_id, active_children)
+                    active_children = self.join_children(active_node_id, active_children)
+                    # Deduplicate children if multiple nodes activate the same ones
+                    for child in active_children:
+                        if child not in all_active_children: 
+                            all_active_children.append(child)
+
+                # Activate the child nodes globally for the next superstep
+                self.activate_shared_children_nodes(all_active_children)
+                self.settle_fired_joins(self.get_active_nodes())
+
+                # Joins still waiting when nothing else is active run with the parents that arrived
+                if len(self.get_active_nodes()) == 0 and self.run_state.join_arrivals:
+                    self.activate_shared_children_nodes(self.release_pending_joins())
+
+                if self.trace is not None:
+                    self.trace.complete(
+                        f"superstep {self.run_state.step_count}", "superstep", step_start, time.perf_counter(),
+                        nodes=list(active_nodes),
+                    )
+
+                yield {
+                    "step": self.run_state.step_count,
+                    "nodes": list(active_nodes),
+                    "state": self.state.state,
+                }
+
+                # End if all nodes have finished running
+                if len(self.get_active_nodes()) == 0:
+                    break
+
+                # End if the step changed nothing a later step could see
+                if self.reached_fixed_point(list(self.get_active_nodes())):
+                    break
+
+                # End the loop after n iterations
+                if self.run_state.step_count >= self.run_state.max_retries - 1:
+                    break
             
-            self.run_state.step_count += 1
-            print("\n")
+                self.run_state.step_count += 1
+                print("\n")
+        finally:
+            # Speculative runs whose upstream never finished
+            self.cancel_speculation()
@@ -0,0 +1,206 @@
+"""
+Declarative graph spec (JSON or YAML):
+
+{
+    "state": {"query": "", "answer": ""},
+    "nodes": [
+        {"id": "plan", "callable": "my_pkg.nodes:plan"},
+        {"id": "route", "callable": "my_pkg.nodes:route", "kind": "conditional"},
+        {"id": "tools", "kind": "tool", "tools": ["my_pkg.tools:search"],
+         "input_key": "tool_calls", "output_key": "messages", "timeout": 10},
+        {"id": "embed", "callable": "my_pkg.nodes:embed", "kind": "map", "over": "docs",
+         "chunk_size": 16, "reducer": "my_pkg.nodes:merge_embeddings"},
+        {"id": "merge", "callable": "my_pkg.nodes:merge", "join": "all", "speculative": false}
+    ],
+    "edges": [["START", "plan"], ["plan", "route"], ["tools", "merge"], ["merge", "END"]],
+    "conditional_edges": {"route": {"search": "tools", "done": "END"}},
+    "compile": {"mode": "bsp", "fuse": true},
+    "max_retries": 100
+}
+"""
+
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from typing import Callable, Dict
+import hashlib
+import importlib
+import json
+from react_agent.graph import Graph, State, START
+from react_agent.node import ConditionalNode, MapNode, Node, ToolNode
+
+# Bump when the cached plan layout changes so old cache files are ignored
+PLAN_VERSION = 2
+
+# compile() options that take Python objects, pass them to compile() in code instead
+OBJECT_COMPILE_OPTIONS = ("scheduling_policy", "executor", "tracer", "fair_scheduler")
+
+def import_callable(path: str) -> Callable:
+    """Imports 'package.module:attr' (or 'package.module.attr')"""
+    if ":" in path:
+        module_name, _, attr_path = path.partition(":")
+    else:
+        module_name, _, attr_path = path.rpartition(".")
+    obj = importlib.import_module(module_name)
+    for attr in attr_path.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+def load_spec(path: str) -> Dict:
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError as e:
+                raise ImportError("PyYAML is required to load YAML graph specs: pip install pyyaml") from e
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def spec_hash(spec: Dict) -> str:
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{PLAN_VERSION}:{canonical}".encode()).hexdigest()
+
+def build_node(node_spec: Dict):
+    kind = node_spec.get("kind", "node")
+    node_id = node_spec["id"]
+    if kind == "tool":
+        return ToolNode(
+            id=node_id,
+            tools=[import_callable(path) for path in node_spec["tools"]],
+            input_key=node_spec.get("input_key", "tool_calls"),
+            output_key=node_spec.get("output_key", "messages"),
+            timeout=node_spec.get("timeout"),
+        )
+    func = import_callable(node_spec["callable"])
+    if kind == "conditional":
+        return ConditionalNode(id=node_id, func=func)
+    if kind == "map":
+        return MapNode(id=node_id, func=func, **map_options(node_spec))
+    if kind == "node":
+        node = Node(id=node_id, func=func)
+        node.join = node_spec.get("join")
+        node.speculative = node_spec.get("speculative", False)
+        node.inline = node_spec.get("inline")
+        return node
+    raise ValueError(f"Error: unknown node kind {kind} for node {node_id}")
+
+def map_options(node_spec: Dict) -> Dict:
+    reducer = node_spec.get("reducer")
+    return {
+        "over": node_spec["over"],
+        "chunk_size": node_spec.get("chunk_size", 1),
+        "reducer": import_callable(reducer) if reducer is not None else None,
+    }
+
+def build_graph(spec: Dict) -> Graph:
+    """Builds and compiles a graph from a spec, running every validation"""
+    graph = Graph(State(spec.get("state", {})))
+    if spec.get("max_retries") is not None:
+        graph.run_state.set_max_retries(spec["max_retries"])
+
+    for node_spec in spec.get("nodes", []):
+        kind = node_spec.get("kind", "node")
+        if kind == "conditional":
+            graph.add_conditional_node(node_spec["id"], import_callable(node_spec["callable"]))
+        elif kind == "tool":
+            graph.add_tool_node(
+                node_spec["id"],
+                [import_callable(path) for path in node_spec["tools"]],
+                input_key=node_spec.get("input_key", "tool_calls"),
+                output_key=node_spec.get("output_key", "messages"),
+                timeout=node_spec.get("timeout"),
+            )
+        elif kind == "map":
+            graph.add_map_node(node_spec["id"], import_callable(node_spec["callable"]), **map_options(node_spec))
+        else:
+            graph.add_node(
+                node_spec["id"],
+                import_callable(node_spec["callable"]),
+                join=node_spec.get("join"),
+                speculative=node_spec.get("speculative", False),
+                inline=node_spec.get("inline"),
+            )
+
+    for from_node, to_node in spec.get("edges", []):
+        graph.add_edge(from_node, to_node)
+    for router_id, result_map in spec.get("conditional_edges", {}).items():
+        graph.add_conditional_edges(router_id, result_map)
+
+    compile_options = spec.get("compile", {})
+    for option in OBJECT_COMPILE_OPTIONS:
+        if option in compile_options:
+            raise ValueError(f"Error: compile option {option} takes an object and can't be set in a spec")
+    graph.compile(**compile_options)
+    return graph
+
+def plan_from_graph(graph: Graph) -> Dict:
+    """The compiled, validated plan: everything needed to rebuild the graph without validation"""
+    return {
+        "version": PLAN_VERSION,
+        "adjacency_list": graph.adjacency_list,
+        "fused_next": graph.fused_next,
+        "join_required": graph.join_required,
+        "join_in_degree": graph.join_in_degree,
+        "mode": graph.mode,
+        "max_concurrency": graph.max_concurrency,
+        "speculation": graph.speculation,
+        "inline_threshold": graph.inline_threshold,
+        "fixed_point": graph.fixed_point,
+        "max_retries": graph.run_state.max_retries,
+    }
+
+def graph_from_plan(spec: Dict, plan: Dict) -> Graph:
+    """Rebuilds a compiled graph from a cached plan, skipping add_edge checks and compile()"""
+    graph = Graph(State(spec.get("state", {})))
+    graph.run_state.set_max_retries(plan["max_retries"])
+    for node_spec in spec.get("nodes", []):
+        node = build_node(node_spec)
+        graph.node_registry[node.id] = node
+
+    graph.adjacency_list = plan["adjacency_list"]
+    graph.fused_next = plan["fused_next"]
+    graph.join_required = plan["join_required"]
+    graph.join_in_degree = plan["join_in_degree"]
+    graph.mode = plan["mode"]
+    graph.max_concurrency = plan.get("max_concurrency")
+    graph.speculation = plan.get("speculation")
+    graph.inline_threshold = plan.get("inline_threshold", graph.inline_threshold)
+    graph.fixed_point = plan.get("fixed_point")
+    graph.has_start = START in graph.adjacency_list
+    graph.frozen = True
+    return graph
+
+def load_graph(spec: Dict | str, cache_dir: str | None = None) -> Graph:
+    """
+    Returns a compiled graph for a spec dict or a .json/.yaml spec file.
+
+    With a cache_dir, the compiled plan is stored as <cache_dir>/<spec hash>.json.
+    A warm start imports the callables and restores the plan, skipping
+    signature inspection and graph validation. The cache is keyed by the spec
+    only: changing a callable's signature doesn't invalidate it.
+    """
+    if isinstance(spec, str):
+        spec = load_spec(spec)
+
+    if cache_dir is None:
+        return build_graph(spec)
+
+    cache_path = os.path.join(cache_dir, f"{spec_hash(spec)}.json")
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path) as f:
+                plan = json.load(f)
+            if plan.get("version") == PLAN_VERSION:
+                return graph_from_plan(spec, plan)
+        except (OSError, ValueError, KeyError):
+            # Unreadable or stale cache entry, rebuild it below
+            pass
+
+    graph = build_graph(spec)
+
+    # Write atomically so concurrent starts never read a partial plan
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(plan_from_graph(graph), f)
+    os.replace(tmp_path, cache_path)
+    return graph
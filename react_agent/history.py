@@ -0,0 +1,158 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List
+import json
+from utils.is_async_callable import _is_async_callable
+from utils.serializable import to_serializable
+
+TRUNCATION_MARKER = "...[truncated {count} chars]"
+
+def estimate_tokens(item: Any) -> int:
+    """
+    Cheap token estimate (~4 chars per token) plus a small per-message overhead
+    """
+    if isinstance(item, str):
+        text = item
+    else:
+        text = json.dumps(to_serializable(item), default=str)
+    return len(text) // 4 + 4
+
+def _item_type(item: Any) -> str | None:
+    if isinstance(item, dict):
+        return item.get("type")
+    return getattr(item, "type", None)
+
+def _item_call_id(item: Any) -> str | None:
+    if isinstance(item, dict):
+        return item.get("call_id")
+    return getattr(item, "call_id", None)
+
+class HistoryManager:
+    """
+    Keeps the input list sent to the model under a token budget.
+
+    - large function_call_output items are truncated
+    - when over budget, the oldest turns are dropped (the first `keep_first`
+      turns, usually the user query, are always kept)
+    - dropped turns can be replaced by a message from a `summarizer` hook,
+      which is called with the dropped items and can be sync or async
+    - a function_call and its function_call_output are always kept or dropped
+      together, the API rejects outputs whose call is missing
+
+    Token estimates are cached per message object. Messages are assumed to be
+    append-only, an item mutated after it was counted keeps its old estimate.
+    """
+    def __init__(
+        self,
+        max_tokens: int = 8000,
+        max_tool_output_chars: int = 4000,
+        keep_first: int = 1,
+        summarizer: Callable | None = None,
+        token_counter: Callable[[Any], int] = estimate_tokens,
+        cache_size: int = 4096,
+    ):
+        self.max_tokens = max_tokens
+        self.max_tool_output_chars = max_tool_output_chars
+        self.keep_first = keep_first
+        self.summarizer = summarizer
+        self.token_counter = token_counter
+        self.cache_size = cache_size
+
+        # id(item) -> (item, prepared item, tokens). The original item is kept
+        # so its id can't be reused while the entry is cached
+        self._cache: OrderedDict[int, tuple] = OrderedDict()
+
+    def _truncate(self, item: Any) -> Any:
+        if _item_type(item) != "function_call_output" or not isinstance(item, dict):
+            return item
+        output = item.get("output")
+        if not isinstance(output, str) or len(output) <= self.max_tool_output_chars:
+            return item
+        dropped = len(output) - self.max_tool_output_chars
+        truncated = dict(item)
+        truncated["output"] = output[:self.max_tool_output_chars] + TRUNCATION_MARKER.format(count=dropped)
+        return truncated
+
+    def prepare(self, item: Any) -> tuple[Any, int]:
+        """Returns the (possibly truncated) item and its token estimate"""
+        key = id(item)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] is item:
+            self._cache.move_to_end(key)
+            return cached[1], cached[2]
+
+        prepared = self._truncate(item)
+        tokens = self.token_counter(prepared)
+        self._cache[key] = (item, prepared, tokens)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return prepared, tokens
+
+    def group_turns(self, items: List[Any]) -> List[List[int]]:
+        """
+        Groups item indices into turns that must be kept or dropped together
+        """
+        turns: List[List[int]] = []
+        call_turn: Dict[str, int] = {}
+        prev_type = None
+
+        for i, item in enumerate(items):
+            item_type = _item_type(item)
+            if item_type == "function_call_output" and _item_call_id(item) in call_turn:
+                turns[call_turn[_item_call_id(item)]].append(i)
+            elif item_type == "function_call" and prev_type in ("function_call", "reasoning"):
+                # Parallel calls from the same model response stay in one turn
+                turns[-1].append(i)
+            else:
+                turns.append([i])
+
+            if item_type == "function_call":
+                call_turn[_item_call_id(item)] = len(turns) - 1
+            prev_type = item_type
+
+        return turns
+
+    async def compact(self, messages: List[Any]) -> List[Any]:
+        """
+        Returns a new input list that fits the token budget where possible.
+        The last turn is always kept, even when it alone exceeds the budget.
+        """
+        prepared = []
+        tokens = []
+        for item in messages:
+            prepared_item, item_tokens = self.prepare(item)
+            prepared.append(prepared_item)
+            tokens.append(item_tokens)
+
+        total = sum(tokens)
+        if total <= self.max_tokens:
+            return prepared
+
+        turns = self.group_turns(prepared)
+        pinned = turns[:self.keep_first]
+        droppable = turns[self.keep_first:-1]
+
+        dropped_indices = []
+        for turn in droppable:
+            if total <= self.max_tokens:
+                break
+            dropped_indices.extend(turn)
+            total -= sum(tokens[i] for i in turn)
+
+        if not dropped_indices:
+            return prepared
+
+        dropped = set(dropped_indices)
+        kept = [item for i, item in enumerate(prepared) if i not in dropped]
+
+        if self.summarizer is not None:
+            dropped_items = [prepared[i] for i in sorted(dropped)]
+            summary = self.summarizer(dropped_items)
+            if _is_async_callable(self.summarizer):
+                summary = await summary
+            if summary is not None:
+                insert_at = sum(len(turn) for turn in pinned)
+                kept.insert(insert_at, summary)
+
+        return kept
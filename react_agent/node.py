@@ -2,6 +2,8 @@ import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from typing import Callable
 from utils.is_async_callable import _is_async_callable
+from react_agent.tool import execute_tool_calls
+from react_agent.tool_registry import ToolRegistry
 from enum import Enum
 from typing import Dict, List
 import time
@@ -26,6 +28,20 @@ class NodeStatus(Enum):
         return f"NodeStatus.{self.name}"
 
 class BaseNode(abc.ABC):
+    __slots__ = (
+        "id",
+        "callable",
+        "is_visited",
+        "status",
+        "internal_inbox_msg",
+        "result",
+        "is_async",
+        "is_io_bound",
+        "join",
+        "speculative",
+        "inline",
+    )
+
     def __init__(self, id: str, func: Callable, status: NodeStatus = NodeStatus.INITIALIZED):
         self.id = id
         self.callable = func
@@ -33,6 +49,15 @@ class BaseNode(abc.ABC):
         self.status = status
         self.internal_inbox_msg = None # internal message for isolating updates
         self.result = None
+        # IO-bound nodes are always awaited on the event loop
+        self.is_io_bound = False
+        # "all" or a quorum of parents a join node waits for, None for regular nodes
+        self.join = None
+        # Side-effect free nodes may start before their router picks them (see compile)
+        self.speculative = False
+        # Sync nodes only: True always runs on the event loop, False always in
+        # the thread pool, None lets the scheduler decide from measured run times
+        self.inline = None
 
         if _is_async_callable(func):
             self.is_async = True
@@ -45,123 +70,143 @@ class Node(BaseNode):
     A concrete implementation of BaseNode with no additional logic needed.
     It inherits everything from BaseNode.
     """
-    pass
+    __slots__ = ()
     
 class ConditionalNode(BaseNode):
     """
     Conditional Nodes are able to route to different nodes
     """
+    __slots__ = ()
+
     def __repr__(self):
         return f"ConditionalNode(id: {self.id}, callable={self.callable.__name__}, status={self.status})"
     
-class ToolNode(BaseNode):
+class SubgraphNode(Node):
     """
-1. Start from what you already have
-
-In your implementation right now, a node is basically:
-
-“something that takes state and returns an update to state.”
-
-So first question for you:
-
-🧠 If you squint, is a tool actually different from any other node, or is it just a node that happens to call an external system?
-
-If your runtime only cares about:
-	•	“here’s a function that takes state, returns state-delta”
-
-…then maybe the tool is just a particular kind of node with a convention.
-
-⸻
-
-2. What makes a “tool node” special?
-
-Conceptually, a tool node usually has three extra responsibilities beyond a normal node:
-	1.	Structured input
-It needs to pull specific fields from the state (or messages) and map them into tool arguments.
-Where in your state would you expect the tool input to live?
-A messages list? A tool_request field? Something else?
-	2.	Side effects / IO boundary
-It crosses the boundary into the outside world (HTTP request, DB query, etc).
-Does your scheduler need to know this is “special” IO,
-or can it just treat it as “a node that might be slow and async”?
-	3.	Structured output + logging
-It needs to:
-	•	Put the tool result back into the state (structured)
-	•	Optionally append a “tool message” to your messages history
-In your state shape, where will the tool result live?
-And how will you remember which tool was called later for replay/debugging?
-
-Once you answer those, the shape of a “tool node” almost falls out.
-
-⸻
-
-3. Who should know it’s a “tool node”?
-
-Another key design question:
-
-Should your runtime/graph engine know about “tool nodes” as a special type,
-or should a tool node be just a normal node whose inner function follows a convention?
-
-Two paths:
-	•	Engine-aware:
-	•	You add a kind = "tool" or similar in your node metadata.
-	•	The runtime might, for example, treat it differently for tracing, retries, or timeouts.
-	•	Engine-agnostic:
-	•	To the engine, it’s just node(name="call_ironscales", func=...).
-	•	The func internally knows it’s calling a tool and how to update state.
-
-Which direction fits the philosophy of your engine so far?
-
-⸻
-
-4. Think in terms of “adapters”
-
-A nice way to think of a tool node:
+    A compiled graph used as a node of another graph.
+    - input_map: {subgraph key: parent key} copied into the subgraph when it starts
+    - output_map: {subgraph key: parent key} copied back into the parent state
 
-It’s an adapter between your graph state and a “tool function”.
-
-So mentally, you could separate:
-	•	A tool definition: “Given some inputs, I hit this API and return a result.”
-	•	A tool node: “Given the current state, I:
-	•	Extract the right inputs
-	•	Call the tool
-	•	Put the result back into state
-	•	Log a message in messages describing what happened”
-
-Ask yourself:
-
-Where in your codebase do you want that adapter logic to live?
-Close to the tool definition, or inside generic node wrappers?
-
-⸻
-
-5. Messages + tracing
-
-You already decided you’ll have a messages list in the state.
-
-So a key design question:
-
-When a tool node runs, what message entries should it append?
-
-Typical pattern conceptually:
-	•	Before tool call: a message like “agent requested tool X with args Y”
-	•	After tool call: a message like “tool X responded with Z”
-
-If you solve what those messages look like, and where they go in state, you’re basically defining what it means to be a tool node in your engine.
-
-⸻
+    compile() inlines the subgraph's nodes into the parent plan where it can,
+    otherwise `func` runs the subgraph as one async node on the parent's loop.
+    """
+    __slots__ = ("graph", "input_map", "output_map")
+
+    def __init__(
+        self,
+        id: str,
+        func: Callable,
+        graph,
+        input_map: Dict[str, str],
+        output_map: Dict[str, str],
+        status: NodeStatus = NodeStatus.INITIALIZED,
+    ):
+        super().__init__(id=id, func=func, status=status)
+        self.graph = graph
+        self.input_map = input_map
+        self.output_map = output_map
 
-6. Questions to answer for yourself (design spec)
+    def __repr__(self):
+        return f"SubgraphNode(id: {self.id}, input_map={self.input_map}, output_map={self.output_map}, status={self.status})"
 
-If you answer these, you’ve designed your tool node:
-	1.	How does a node know which tool it represents?
-	2.	Where in state does it look to build the tool’s input?
-	3.	How does it represent success/failure in the state after calling the tool?
-	4.	What entries does it append to messages so future nodes (and you, debugging) can see the tool call happened?
-	5.	Does the scheduler/runtime need to treat tool nodes differently, or are they just “slow/effectful nodes” from its point of view?
+class ToolNode(Node):
+    """
+    Adapter between graph state and a set of tools.
+
+    - reads function_call requests ({"name", "arguments", "call_id"}) from
+      state[input_key]
+    - runs the calls concurrently, each bounded by the tool's timeout or the
+      node's default timeout
+    - appends one function_call_output message per call to state[output_key]
+      (call_id links it back to the request for replay / debugging) and
+      clears state[input_key]
+
+    Tool nodes are IO-bound: the scheduler always awaits them on the event
+    loop and never ships them to a worker thread or process.
+    """
+    __slots__ = ("tools", "input_key", "output_key", "timeout")
+
+    def __init__(
+        self,
+        id: str,
+        tools,
+        input_key: str = "tool_calls",
+        output_key: str = "messages",
+        timeout: float | None = None,
+        status: NodeStatus = NodeStatus.INITIALIZED,
+    ):
+        if not isinstance(tools, ToolRegistry):
+            tools = ToolRegistry(tools if isinstance(tools, (list, tuple)) else [tools])
+        self.tools = tools
+        self.input_key = input_key
+        self.output_key = output_key
+        self.timeout = timeout
+        super().__init__(id=id, func=self.run_tools, status=status)
+        self.is_io_bound = True
+
+    async def run_tools(self, state: dict):
+        requests = state.get(self.input_key) or []
+        outputs = await execute_tool_calls(self.tools, requests, self.timeout)
+        return {
+            self.output_key: list(state.get(self.output_key) or []) + outputs,
+            self.input_key: [],
+        }
 
-Write those answers out in English first. Once you’re happy with that conceptual contract, turning it into code will be almost mechanical.
+    def __repr__(self):
+        return f"ToolNode(id: {self.id}, tools={self.tools.names()}, status={self.status})"
 
-If you want, you can tell me your current state shape (fields you already have), and I’ll ask you very targeted questions to help you “click” into one specific, clean design.
+def concat_updates(updates: List[Dict]) -> Dict:
     """
-    pass
\ No newline at end of file
+    Default map reducer: gathers every key into one list in element order.
+    List values are concatenated, other values are appended.
+    """
+    gathered: Dict[str, list] = {}
+    for update in updates:
+        for key, value in update.items():
+            values = gathered.setdefault(key, [])
+            if isinstance(value, list):
+                values.extend(value)
+            else:
+                values.append(value)
+    return gathered
+
+class MapNode(Node):
+    """
+    Runs `func` once per chunk of the list in state[over], decided at run time.
+
+    - every task gets the state with state[over] replaced by its chunk of at
+      most chunk_size elements, so a node written for the whole list works
+      unchanged on a slice
+    - tasks run concurrently, sync funcs in the thread pool (or the graph's
+      executor backend), bounded by the graph's max_concurrency
+    - reducer(updates) turns the task updates, in element order, into the
+      node's update, concat_updates by default
+
+    Map nodes are awaited on the event loop like tool nodes, the fan-out
+    happens inside them.
+    """
+    __slots__ = ("over", "chunk_size", "reducer", "func_is_async")
+
+    def __init__(
+        self,
+        id: str,
+        func: Callable,
+        over: str,
+        chunk_size: int = 1,
+        reducer: Callable[[List[Dict]], Dict] | None = None,
+        status: NodeStatus = NodeStatus.INITIALIZED,
+    ):
+        if chunk_size < 1:
+            raise ValueError(f"Error: chunk_size must be at least 1, but received: {chunk_size}")
+        super().__init__(id=id, func=func, status=status)
+        self.over = over
+        self.chunk_size = chunk_size
+        self.reducer = reducer or concat_updates
+        self.func_is_async = self.is_async
+        self.is_io_bound = True
+
+    def chunks(self, items: list) -> List[list]:
+        return [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+
+    def __repr__(self):
+        return f"MapNode(id: {self.id}, over={self.over}, chunk_size={self.chunk_size}, status={self.status})"
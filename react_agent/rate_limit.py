@@ -0,0 +1,146 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from collections import deque
+from typing import Awaitable, Callable
+import asyncio
+import time
+
+class TokenBucket:
+    """Refills `per_minute` units per minute up to `capacity` (one minute's worth by default)"""
+    __slots__ = ("rate", "capacity", "level", "updated")
+
+    def __init__(self, per_minute: float, now: float, capacity: float | None = None):
+        if per_minute <= 0:
+            raise ValueError(f"Error: rate limits must be positive, but received: {per_minute}")
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else float(per_minute)
+        self.level = self.capacity
+        self.updated = now
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def seconds_until(self, amount: float) -> float:
+        # Requests bigger than the bucket run once it is full instead of never
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float):
+        # The level may go negative when usage is corrected upwards, later requests wait for it
+        self.level -= amount
+
+class RateLimiter:
+    """
+    Async limiter for requests per minute and tokens per minute.
+
+    Callers are served in arrival order: only the head of the queue waits for
+    the buckets to refill, everyone behind it waits for their turn, so a large
+    request can't be starved by a stream of small ones. `clock` and `sleep`
+    can be replaced by a simulated clock in tests.
+    """
+    def __init__(
+        self,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable] = asyncio.sleep,
+    ):
+        self.clock = clock
+        self.sleep = sleep
+        now = clock()
+        self.requests = TokenBucket(requests_per_minute, now) if requests_per_minute is not None else None
+        self.tokens = TokenBucket(tokens_per_minute, now) if tokens_per_minute is not None else None
+
+        self._waiters: deque[asyncio.Future] = deque()
+        self._busy = False
+
+        # Metrics
+        self.acquired = 0
+        self.waited = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def seconds_until(self, tokens: int) -> float:
+        now = self.clock()
+        wait = 0.0
+        if self.requests is not None:
+            self.requests.refill(now)
+            wait = self.requests.seconds_until(1)
+        if self.tokens is not None and tokens:
+            self.tokens.refill(now)
+            wait = max(wait, self.tokens.seconds_until(tokens))
+        return wait
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Waits for one request and `tokens` tokens, returns the seconds spent waiting"""
+        start = self.clock()
+        await self._wait_for_turn()
+        try:
+            wait = self.seconds_until(tokens)
+            while wait > 0:
+                await self.sleep(wait)
+                wait = self.seconds_until(tokens)
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(tokens)
+        finally:
+            self._next_turn()
+
+        waited = self.clock() - start
+        self.acquired += 1
+        if waited > 0:
+            self.waited += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return waited
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Corrects the token bucket once a call reports what it really used"""
+        if self.tokens is not None:
+            self.tokens.take(actual_tokens - estimated_tokens)
+
+    async def _wait_for_turn(self):
+        if not self._busy and not self._waiters:
+            self._busy = True
+            return
+        turn = asyncio.get_running_loop().create_future()
+        self._waiters.append(turn)
+        try:
+            await turn
+        except asyncio.CancelledError:
+            if turn.done() and not turn.cancelled():
+                # Our turn came with the cancellation, hand it on
+                self._next_turn()
+            elif turn in self._waiters:
+                self._waiters.remove(turn)
+            raise
+
+    def _next_turn(self):
+        while self._waiters:
+            turn = self._waiters.popleft()
+            if not turn.done():
+                turn.set_result(None)
+                return
+        self._busy = False
+
+    @property
+    def mean_wait_seconds(self) -> float:
+        return self.total_wait_seconds / self.acquired if self.acquired else 0.0
+
+    def __repr__(self):
+        return (
+            f"RateLimiter(acquired={self.acquired}, waited={self.waited}, "
+            f"mean_wait_seconds={self.mean_wait_seconds:.3f}, max_wait_seconds={self.max_wait_seconds:.3f})"
+        )
+
+# Process-wide limiter used by model calls that weren't given their own
+_default_rate_limiter: RateLimiter | None = None
+
+def set_default_rate_limiter(limiter: RateLimiter | None):
+    global _default_rate_limiter
+    _default_rate_limiter = limiter
+
+def get_default_rate_limiter() -> RateLimiter | None:
+    return _default_rate_limiter
@@ -1,25 +1,146 @@
 # Create a React Agent for handling user queries and generating responses.
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import asyncio
 from typing import Any, Dict, List
+from openai import AsyncOpenAI
 from react_agent.tool import Tool
+from react_agent.tool_registry import ToolRegistry
+from react_agent.graph import Graph, State, START, END
+from react_agent.tool_calling import OpenAIToolCall
+from react_agent.history import HistoryManager
+from react_agent.rate_limit import RateLimiter
+from utils.serializable import to_serializable
+
+LLM_NODE = "llm"
+TOOLS_NODE = "tools"
+ROUTER_NODE = "route"
 
 class ReActAgent:
-    """A ReAct Agent that uses tools to answer user queries."""
-    def __init__(self, openai_api_key: str):
+    """
+    A ReAct Agent that uses tools to answer user queries.
+
+    The agent graph is built and compiled once in register_tools:
+        START -> llm -> route -> (tools -> llm) | END
+    Every query runs on its own copy of the compiled graph, so state is never
+    shared between concurrent queries.
+    """
+    def __init__(
+        self,
+        openai_api_key: str,
+        client = None,
+        model: str = "gpt-4.1",
+        max_steps: int = 10,
+        history: HistoryManager | None = None,
+        top_k: int | None = None,
+        tool_timeout: float | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ):
         self.openai_api_key = openai_api_key
+        self.tools = ToolRegistry()
+        self.max_steps = max_steps
+        self.tool_timeout = tool_timeout
+        self.graph: Graph | None = None
 
-    def register_tools(self, tools: List[Tool]):
+        if client is None:
+            client = AsyncOpenAI(api_key=openai_api_key)
+        self.tool_call = OpenAIToolCall(
+            client=client,
+            model=model,
+            history=history,
+            top_k=top_k,
+            rate_limiter=rate_limiter,
+        )
+        self.instructions = "Answer the user's query. Call the available tools when they are relevant."
+
+    def register_tools(self, tools: List[Tool] | ToolRegistry):
+        if not isinstance(tools, ToolRegistry):
+            tools = ToolRegistry(tools)
+        if self.tool_call.top_k is not None:
+            # Index the catalog now instead of on the first query
+            tools.build_index()
         self.tools = tools
-        # Add logic to register the tools
-        return [tool.name for tool in tools]
-    
-    def _run_react_graph(self, query: str) -> str:
-        # Placeholder for the ReAct graph logic
-        return "This is a placeholder response from ReActAgent."
-    
+        self.graph = self._build_graph()
+        return self.tools.names()
+
+    def _initial_state(self, query: str) -> State:
+        return State({
+            "messages": [{"role": "user", "content": query}],
+            "tool_calls": [],
+            "output_text": "",
+        })
+
+    def _build_graph(self) -> Graph:
+        async def call_llm(state: dict):
+            response = await self.tool_call.create_response(
+                self.tools,
+                state["messages"],
+                instructions=self.instructions,
+            )
+            output = to_serializable(list(response.output))
+            function_calls = [item for item in output if item.get("type") == "function_call"]
+            return {
+                "messages": state["messages"] + output,
+                "tool_calls": function_calls,
+                "output_text": response.output_text,
+            }
+
+        def route(state: dict):
+            if state["tool_calls"]:
+                return "call_tools"
+            return "respond"
+
+        graph = Graph(self._initial_state(""))
+        graph.run_state.set_max_retries(self.max_steps)
+        graph.add_node(LLM_NODE, call_llm)
+        graph.add_tool_node(TOOLS_NODE, self.tools, input_key="tool_calls", output_key="messages", timeout=self.tool_timeout)
+        graph.add_conditional_node(ROUTER_NODE, route)
+
+        graph.add_edge(START, LLM_NODE)
+        graph.add_edge(LLM_NODE, ROUTER_NODE)
+        graph.add_conditional_edges(
+            ROUTER_NODE,
+            {
+                "call_tools": TOOLS_NODE,
+                "respond": END,
+            }
+        )
+        graph.add_edge(TOOLS_NODE, LLM_NODE)
+        graph.compile()
+        return graph
+
+    def _new_run(self, query: str) -> Graph:
+        if self.graph is None:
+            raise RuntimeError("Error: register_tools must be called before invoking the agent")
+        return self.graph.new_run(self._initial_state(query))
+
     # def _clarify_query(self, query: str) -> str:
     #     # Placeholder for query clarification logic
     #     return "The agent asks a follow up question to clarify the query."
-    
-    def invoke(self, query: str) -> str:
-        # Placeholder for invoking the agent with a query
-        return "This is a placeholder response from ReActAgent."
\ No newline at end of file
+
+    async def _run_react_graph(self, query: str, deadline: float | None = None) -> Dict[str, Any]:
+        run = self._new_run(query)
+        await run.invoke(deadline)
+        return run.state.state
+
+    async def ainvoke(self, query: str, deadline: float | None = None) -> str:
+        """
+        deadline: time budget in seconds for the whole query. When it passes
+        the run stops and the text produced so far (possibly empty) is returned
+        """
+        state = await self._run_react_graph(query, deadline)
+        return state["output_text"]
+
+    async def astream(self, query: str, deadline: float | None = None):
+        """Yields one update per superstep of the agent graph"""
+        run = self._new_run(query)
+        async for update in run.stream(deadline):
+            yield update
+
+    def invoke(self, query: str, deadline: float | None = None) -> str:
+        # Sync entry point, use ainvoke when already inside an event loop
+        return asyncio.run(self.ainvoke(query, deadline))
+
+    async def aclose(self):
+        """Shuts down the resources the tools opened (see Tool on_startup / on_shutdown)"""
+        await self.tools.shutdown()
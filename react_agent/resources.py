@@ -0,0 +1,167 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from collections import deque
+from typing import Any, Callable
+import asyncio
+import contextlib
+import threading
+
+# Returned by _take when the caller has to wait for a release
+_WAIT = object()
+
+class AsyncWaiter:
+    """An acquire() waiting on its event loop, released resources are handed to it directly"""
+    __slots__ = ("pool", "loop", "future")
+
+    def __init__(self, pool: 'ResourcePool', loop):
+        self.pool = pool
+        self.loop = loop
+        self.future = loop.create_future()
+
+    def offer(self, resource: Any) -> bool:
+        if self.future.done():
+            # Cancelled while waiting
+            return False
+        try:
+            self.loop.call_soon_threadsafe(self.deliver, resource)
+        except RuntimeError:
+            # The waiter's loop is closed
+            return False
+        return True
+
+    def deliver(self, resource: Any):
+        if self.future.done():
+            # Cancelled after the handoff, pass the resource on
+            self.pool._give_back(resource)
+        else:
+            self.future.set_result(resource)
+
+    def fail(self, error: Exception):
+        def set_error():
+            if not self.future.done():
+                self.future.set_exception(error)
+        try:
+            self.loop.call_soon_threadsafe(set_error)
+        except RuntimeError:
+            pass
+
+class SyncWaiter:
+    """An acquire_sync() blocked in its thread"""
+    __slots__ = ("event", "resource", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.resource = None
+        self.error: Exception | None = None
+
+    def offer(self, resource: Any) -> bool:
+        self.resource = resource
+        self.event.set()
+        return True
+
+    def fail(self, error: Exception):
+        self.error = error
+        self.event.set()
+
+class ResourcePool:
+    """
+    Bounded pool of reusable resources (clients, DB connections) for tools.
+
+    Resources are created by `factory` when no idle one is left, up to `size`,
+    and each is used by one call at a time: async tools lease one with
+    `async with pool.acquire()`, sync tools (run in worker threads) with
+    `with pool.acquire_sync()`. Safe to share across threads and event loops.
+    Waiters are served in order, async ones wait on their loop without a thread.
+    """
+    def __init__(self, factory: Callable[[], Any], size: int = 4, close: Callable[[Any], None] | None = None):
+        if size < 1:
+            raise ValueError(f"Error: size must be at least 1, but received: {size}")
+        self.factory = factory
+        self.size = size
+        self.close_resource = close
+        # Used as a stack so the most recently used (warmest) resource is reused first
+        self._idle: list = []
+        self._waiters: deque = deque()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.closed = False
+
+    def _take(self, waiter: AsyncWaiter | SyncWaiter | None = None) -> Any:
+        """An idle resource, a new one if the pool isn't full, else queues the waiter and returns _WAIT"""
+        with self._lock:
+            if self.closed:
+                raise RuntimeError("Error: the resource pool is closed")
+            if self._idle:
+                return self._idle.pop()
+            create = self.created < self.size
+            if create:
+                self.created += 1
+            elif waiter is not None:
+                self._waiters.append(waiter)
+        if not create:
+            return _WAIT
+        try:
+            return self.factory()
+        except BaseException:
+            with self._lock:
+                self.created -= 1
+            raise
+
+    def _give_back(self, resource: Any):
+        with self._lock:
+            if not self.closed:
+                while self._waiters:
+                    if self._waiters.popleft().offer(resource):
+                        return
+                self._idle.append(resource)
+                return
+        self._close(resource)
+
+    @contextlib.contextmanager
+    def acquire_sync(self):
+        waiter = SyncWaiter()
+        resource = self._take(waiter)
+        if resource is _WAIT:
+            waiter.event.wait()
+            if waiter.error is not None:
+                raise waiter.error
+            resource = waiter.resource
+        try:
+            yield resource
+        finally:
+            self._give_back(resource)
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        waiter = AsyncWaiter(self, asyncio.get_running_loop())
+        resource = self._take(waiter)
+        if resource is _WAIT:
+            try:
+                resource = await waiter.future
+            except asyncio.CancelledError:
+                # A resource handed over just before the cancellation goes back
+                if waiter.future.done() and not waiter.future.cancelled():
+                    self._give_back(waiter.future.result())
+                raise
+        try:
+            yield resource
+        finally:
+            self._give_back(resource)
+
+    def _close(self, resource: Any):
+        if self.close_resource is not None:
+            self.close_resource(resource)
+
+    def close(self):
+        """Closes the idle resources and fails the waiters, leased ones are closed when they come back"""
+        with self._lock:
+            self.closed = True
+            idle, self._idle = self._idle, []
+            waiters, self._waiters = self._waiters, deque()
+        for waiter in waiters:
+            waiter.fail(RuntimeError("Error: the resource pool is closed"))
+        for resource in idle:
+            self._close(resource)
+
+    def __repr__(self):
+        return f"ResourcePool(size={self.size}, created={self.created}, idle={len(self._idle)}, closed={self.closed})"
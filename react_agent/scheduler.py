@@ -0,0 +1,80 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from typing import Dict, List
+import abc
+
+class LatencyStats:
+    """
+    Exponentially weighted moving average of each node's run time, in seconds.
+    Shared by every run of a compiled graph, so estimates improve across runs.
+    """
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.ewma: Dict[str, float] = {}
+        self.samples: Dict[str, int] = {}
+
+    def update(self, node_id: str, seconds: float):
+        self.samples[node_id] = self.samples.get(node_id, 0) + 1
+        previous = self.ewma.get(node_id)
+        if previous is None:
+            self.ewma[node_id] = seconds
+        else:
+            self.ewma[node_id] = self.alpha * seconds + (1 - self.alpha) * previous
+
+    def get(self, node_id: str) -> float:
+        """Estimate for a node, nodes that never ran get the mean of the known ones"""
+        estimate = self.ewma.get(node_id)
+        if estimate is not None:
+            return estimate
+        if not self.ewma:
+            return 0.0
+        return sum(self.ewma.values()) / len(self.ewma)
+
+    def is_proven_below(self, node_id: str, seconds: float, min_samples: int) -> bool:
+        """True once the node ran at least min_samples times and its estimate is under `seconds`"""
+        return self.samples.get(node_id, 0) >= min_samples and self.ewma[node_id] < seconds
+
+class SchedulingPolicy(abc.ABC):
+    """Decides which ready nodes get the free slots first when concurrency is capped"""
+    @abc.abstractmethod
+    def order(self, graph, node_ids: List[str]) -> List[str]:
+        pass
+
+class FifoPolicy(SchedulingPolicy):
+    """Activation order, the engine's behavior without a cap"""
+    def order(self, graph, node_ids: List[str]) -> List[str]:
+        return list(node_ids)
+
+class LongestFirstPolicy(SchedulingPolicy):
+    """Slowest nodes first: a capped superstep is as long as its last finishing node"""
+    def order(self, graph, node_ids: List[str]) -> List[str]:
+        return sorted(node_ids, key=graph.latency_stats.get, reverse=True)
+
+class CriticalPathPolicy(SchedulingPolicy):
+    """
+    Longest estimated path to END first (the node's own latency plus its
+    slowest chain of descendants). Routers count as all of their targets and
+    cycles are cut at the first revisit.
+    """
+    def order(self, graph, node_ids: List[str]) -> List[str]:
+        memo: Dict[str, float] = {}
+        return sorted(node_ids, key=lambda node_id: self.path_length(graph, node_id, memo, set()), reverse=True)
+
+    def path_length(self, graph, node_id: str, memo: Dict[str, float], visiting: set) -> float:
+        if node_id in memo:
+            return memo[node_id]
+        if node_id in visiting or node_id not in graph.node_registry:
+            return 0.0
+
+        visiting.add(node_id)
+        children = graph.adjacency_list.get(node_id) or []
+        if isinstance(children, dict):
+            children = children.values()
+        longest_child = max(
+            (self.path_length(graph, child_id, memo, visiting) for child_id in children),
+            default=0.0,
+        )
+        visiting.discard(node_id)
+
+        memo[node_id] = graph.latency_stats.get(node_id) + longest_child
+        return memo[node_id]
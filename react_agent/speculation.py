@@ -0,0 +1,103 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from typing import Dict, List
+
+# Speculation modes, picked at compile()
+LIKELY = "likely"   # only the router target chosen most often so far
+ALL = "all"         # every speculative target of the router
+
+_MISSING = object()
+
+class TrackedState(dict):
+    """
+    State view handed to a speculative run. Records the keys the node reads,
+    so its result can be checked against the state it would really have seen.
+    Iterating the whole state counts as reading every key.
+    """
+    __slots__ = ("reads", "read_all")
+
+    def __init__(self, state: Dict):
+        super().__init__(state)
+        self.reads = set()
+        self.read_all = False
+
+    def __getitem__(self, key):
+        self.reads.add(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.reads.add(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self.reads.add(key)
+        return super().__contains__(key)
+
+    def __iter__(self):
+        self.read_all = True
+        return super().__iter__()
+
+    def keys(self):
+        self.read_all = True
+        return super().keys()
+
+    def values(self):
+        self.read_all = True
+        return super().values()
+
+    def items(self):
+        self.read_all = True
+        return super().items()
+
+    def copy(self):
+        self.read_all = True
+        return dict(super().items())
+
+    def is_still_valid(self, state: Dict) -> bool:
+        """True if every key the node read has the same value in `state`"""
+        keys = dict.keys(self) | state.keys() if self.read_all else self.reads
+        for key in keys:
+            before = dict.get(self, key, _MISSING)
+            after = state.get(key, _MISSING)
+            if before is not after and before != after:
+                return False
+        return True
+
+class SpeculationStats:
+    """
+    Router choice counts (used to pick the likely branch) and the outcome of
+    every speculative run. Shared by every run of a compiled graph.
+    """
+    def __init__(self):
+        self.router_choices: Dict[str, Dict[str, int]] = {}
+        self.launched = 0
+        self.hits = 0        # the router picked the branch and its inputs were unchanged
+        self.misses = 0      # the router picked another branch, the work was dropped
+        self.stale = 0       # picked, but the upstream update changed its inputs (or it failed)
+        self.wasted_seconds = 0.0
+
+    def record_route(self, router_id: str, target: str):
+        choices = self.router_choices.setdefault(router_id, {})
+        choices[target] = choices.get(target, 0) + 1
+
+    def likely_targets(self, router_id: str, targets: List[str], candidates: List[str]) -> List[str]:
+        """
+        The router's most chosen target if it is one of the speculative
+        candidates, the first candidate while the router has no history
+        """
+        choices = self.router_choices.get(router_id)
+        if not choices:
+            return candidates[:1]
+        likely = max(targets, key=lambda target: choices.get(target, 0))
+        return [likely] if likely in candidates else []
+
+    @property
+    def hit_rate(self) -> float:
+        resolved = self.hits + self.misses + self.stale
+        return self.hits / resolved if resolved else 0.0
+
+    def __repr__(self):
+        return (
+            f"SpeculationStats(launched={self.launched}, hits={self.hits}, misses={self.misses}, "
+            f"stale={self.stale}, hit_rate={self.hit_rate:.2f}, wasted_seconds={self.wasted_seconds:.3f})"
+        )
@@ -1,52 +1,156 @@
+import asyncio
 import functools
 import inspect
-from typing import Any, Callable
+import json
+import time
+from typing import Any, Callable, Dict
 from typing import get_type_hints, get_origin, get_args
 from typing import Union, Annotated
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from utils.is_async_callable import _is_async_callable
+from utils.serializable import to_serializable
+from react_agent.context import get_run_context
+from react_agent.tracing import get_current_trace
+from react_agent.rate_limit import RateLimiter
 
 PRIMITIVES = (int, float, str, bool)
 
 class ToolResult:
-    """A class representing the result of a tool execution."""
+    """The result of one tool call, every call gets its own."""
+    __slots__ = ("content", "error")
+
     def __init__(self, content: Any, error: Exception = None):
         self.content = content
         self.error = error
 
+    def __repr__(self):
+        return f"ToolResult(content={self.content!r}, error={self.error!r})"
+
+class Resource:
+    """
+    Annotation for tool parameters filled from the tool's on_startup resources
+    instead of the model's arguments, e.g. `def search(query: str, client: Resource)`.
+    Such parameters are left out of the args schema.
+    """
+
 class Tool:
-    """A class representing a tool with metadata."""
-    def __init__(self, func: Callable, name: str = None, description: str = None, result: ToolResult = None):
+    """
+    A class representing a tool with metadata.
+    The args schema is built on first access, so decorating or registering
+    large tool catalogs doesn't pay for signature inspection up front.
+    """
+    def __init__(
+        self,
+        func: Callable,
+        name: str = None,
+        description: str = None,
+        result: ToolResult = None,
+        timeout: float | None = None,
+        rate_limiter: RateLimiter | None = None,
+        on_startup: Callable[[], Dict[str, Any]] | None = None,
+        on_shutdown: Callable[[Dict[str, Any]], None] | None = None,
+    ):
+        """
+        result: unused, results are per call (see run)
+        on_startup: called once before the first call (sync or async), returns
+            the resources {name: resource} injected into Resource parameters,
+            e.g. a ResourcePool of clients shared by concurrent calls
+        on_shutdown: called with those resources by shutdown()
+        """
         self.func = func
         self.name = name or func.__name__
         self.description = description or func.__doc__ or "No description provided."
-        self.result: ToolResult | None = None
         self.is_async = _is_async_callable(func)
-        self.args_schema = self._build_args_schema(func)
+        # Seconds a single call may take, overrides the caller's default
+        self.timeout = timeout
+        # Calls wait for this limiter first, share one limiter between tools that hit the same API
+        self.rate_limiter = rate_limiter
+        self._args_schema: dict | None = None
+        self._arg_descriptions: tuple[str, Dict[str, str] | None] | None = None
+
+        self.on_startup = on_startup
+        self.on_shutdown = on_shutdown
+        # Set by startup(), None until then
+        self.resources: Dict[str, Any] | None = None
+        self._resource_params: tuple[str, ...] | None = None
+        self._startup_lock: asyncio.Lock | None = None
+
+    @property
+    def args_schema(self) -> dict:
+        if self._args_schema is None:
+            self._args_schema = self._build_args_schema(self.func)
+        return self._args_schema
+
+    @property
+    def arg_descriptions(self) -> Dict[str, str]:
+        """Param name -> description parsed from the 'Args:' section"""
+        return self._parse_arg_descriptions(self.description) or {}
+
+    @property
+    def resource_params(self) -> tuple[str, ...]:
+        """Names of the parameters annotated with Resource"""
+        if self._resource_params is None:
+            hints = get_type_hints(self.func)
+            self._resource_params = tuple(
+                name for name in inspect.signature(self.func).parameters
+                if hints.get(name) is Resource
+            )
+        return self._resource_params
+
+    def injected(self) -> Dict[str, Any]:
+        if not self.resource_params:
+            return {}
+        resources = self.resources or {}
+        missing = [name for name in self.resource_params if name not in resources]
+        if missing:
+            raise KeyError(f"Error: tool {self.name} needs resources {missing}, start it with an on_startup that provides them")
+        return {name: resources[name] for name in self.resource_params}
+
+    async def startup(self):
+        """Runs on_startup once, concurrent first calls wait for the same startup"""
+        if self.resources is not None:
+            return
+        if self._startup_lock is None:
+            self._startup_lock = asyncio.Lock()
+        async with self._startup_lock:
+            if self.resources is not None:
+                return
+            resources = self.on_startup() if self.on_startup is not None else {}
+            if inspect.isawaitable(resources):
+                resources = await resources
+            self.resources = resources or {}
+
+    async def shutdown(self):
+        """Runs on_shutdown with the resources, the next call starts the tool again"""
+        if self.resources is None:
+            return
+        resources, self.resources = self.resources, None
+        if self.on_shutdown is not None:
+            res = self.on_shutdown(resources)
+            if inspect.isawaitable(res):
+                await res
+
+    async def run(self, **kwargs) -> ToolResult:
+        """
+        Runs one call and returns its own result, the Tool is never modified
+        (apart from the one-time startup). Sync tools run in a worker thread.
+        """
+        try:
+            if self.resources is None and (self.on_startup is not None or self.resource_params):
+                await self.startup()
+            kwargs.update(self.injected())
+            if self.is_async:
+                value = await self.func(**kwargs)
+            else:
+                value = await asyncio.to_thread(self.func, **kwargs)
+            return ToolResult(content=value)
+        except Exception as e:
+            return ToolResult(content=None, error=e)
 
     def __call__(self, *args, **kwargs):
-        # sync tool
-        if not self.is_async:
-            try:
-                value = self.func(*args, **kwargs)
-                self.result = ToolResult(content=value)
-                return value
-            except Exception as e:
-                self.result = ToolResult(content=None, error=e)
-                raise
-
-        # async tool
-        async def runner():
-            try:
-                value = await self.func(*args, **kwargs)
-                self.result = ToolResult(content=value)
-                return value
-            except Exception as e:
-                self.result = ToolResult(content=None, error=e)
-                raise
-
-        return runner()
+        # Direct calls return the value (a coroutine for async tools), started resources are injected
+        return self.func(*args, **self.injected(), **kwargs)
 
     def _resolve_base_type(self, anno):
         """
@@ -98,7 +202,7 @@ class Tool:
         properties = {}
 
         for name, param in sig.parameters.items():
-            if name == "self":
+            if name == "self" or name in self.resource_params:
                 continue
 
             prop = {}
@@ -167,7 +271,7 @@ class Tool:
         required = [
             name
             for name, param in sig.parameters.items()
-            if name != "self" and param.default is inspect._empty
+            if name != "self" and name not in self.resource_params and param.default is inspect._empty
         ]
 
         schema = {
@@ -182,17 +286,24 @@ class Tool:
         }
         return schema
     
-    def _get_arg_description(self, description: str, target_name: str) -> str:
-        in_args = False
+    def _parse_arg_descriptions(self, description: str) -> Dict[str, str] | None:
+        """
+        Parses the 'Args:' section once into {param name: description}.
+        Returns None if there is no 'Args:' section.
+        """
+        if self._arg_descriptions is not None and self._arg_descriptions[0] is description:
+            return self._arg_descriptions[1]
+
+        arg_descriptions = None
         for line in description.splitlines():
             stripped = line.strip()
 
             # Enter Args: section
             if stripped.startswith("Args:"):
-                in_args = True
+                arg_descriptions = {}
                 continue
 
-            if in_args:
+            if arg_descriptions is not None:
                 # End of Args section if blank line or no indent
                 if not stripped:
                     break
@@ -200,11 +311,17 @@ class Tool:
                 # Expect lines like: "num_times: The number of times..."
                 if ":" in stripped:
                     name, _, rest = stripped.partition(":")
-                    name = name.strip()
-                    desc = rest.strip()
+                    arg_descriptions.setdefault(name.strip(), rest.strip())
 
-                    if name == target_name:
-                        return desc
+        self._arg_descriptions = (description, arg_descriptions)
+        return arg_descriptions
+
+    def _get_arg_description(self, description: str, target_name: str) -> str:
+        arg_descriptions = self._parse_arg_descriptions(description)
+        in_args = arg_descriptions is not None
+
+        if in_args and target_name in arg_descriptions:
+            return arg_descriptions[target_name]
                     
         if in_args is False:
             raise ValueError(
@@ -254,8 +371,95 @@ class Tool:
         return desc
     
     def __repr__(self):
-        return f"Tool(name='{self.name}', description='{self.description}', result={self.result}, is_async={self.is_async}, args_schema={self.args_schema})"
+        return f"Tool(name='{self.name}', description='{self.description}', is_async={self.is_async}, args_schema={self.args_schema})"
+
+def tool(
+    func: Callable = None,
+    *,
+    timeout: float | None = None,
+    requests_per_minute: float | None = None,
+    rate_limiter: RateLimiter | None = None,
+    on_startup: Callable[[], Dict[str, Any]] | None = None,
+    on_shutdown: Callable[[Dict[str, Any]], None] | None = None,
+):
+    """
+    Decorator, usable as @tool or @tool(timeout=5, requests_per_minute=60).
+    requests_per_minute gives the tool its own limiter, rate_limiter shares one.
+    on_startup / on_shutdown manage the tool's resources (see Tool).
+    """
+    if requests_per_minute is not None and rate_limiter is not None:
+        raise ValueError("Error: pass either requests_per_minute or rate_limiter, not both")
+
+    def wrap(func: Callable) -> Tool:
+        limiter = rate_limiter
+        if requests_per_minute is not None:
+            limiter = RateLimiter(requests_per_minute=requests_per_minute)
+        return Tool(
+            func=func,
+            name=func.__name__,
+            description=func.__doc__,
+            timeout=timeout,
+            rate_limiter=limiter,
+            on_startup=on_startup,
+            on_shutdown=on_shutdown,
+        )
 
-def tool(func):
-    tool_obj = Tool(func=func, name=func.__name__, description=func.__doc__)
-    return tool_obj
\ No newline at end of file
+    if func is None:
+        return wrap
+    return wrap(func)
+
+async def execute_tool_call(tool: Tool | None, item: dict, timeout: float | None = None) -> dict:
+    """
+    Runs one function_call item {"name", "arguments", "call_id"} and returns
+    its function_call_output item. Errors and timeouts are reported in the
+    output instead of raised, so one failing call doesn't fail its siblings.
+    The call never runs past the deadline of the run it belongs to.
+    """
+    context = get_run_context()
+    trace = get_current_trace()
+    start = time.perf_counter()
+    try:
+        if tool is None:
+            raise KeyError(f"Tool {item['name']} is not registered")
+        args = item.get("arguments") or {}
+        if isinstance(args, str):
+            args = json.loads(args)
+
+        async def call():
+            # Time spent waiting for the tool's rate limit counts against its timeout
+            if tool.rate_limiter is not None:
+                await tool.rate_limiter.acquire()
+            # Sync tools are assumed to block on IO, run() keeps them off the event loop
+            result = await tool.run(**args)
+            if result.error is not None:
+                raise result.error
+            return result.content
+
+        timeout = context.timeout(tool.timeout if tool.timeout is not None else timeout)
+        if timeout is not None:
+            result = await asyncio.wait_for(call(), timeout)
+        else:
+            result = await call()
+        output = {f"{item['name']}_result": result}
+    except asyncio.TimeoutError:
+        if context.expired():
+            output = {f"{item['name']}_error": f"Tool {item['name']} was stopped at the run deadline"}
+        else:
+            output = {f"{item['name']}_error": f"Tool {item['name']} timed out after {timeout}s"}
+    except Exception as e:
+        output = {f"{item['name']}_error": str(e)}
+
+    if trace is not None:
+        trace.complete(item["name"], "tool", start, time.perf_counter(), call_id=item["call_id"], ok=f"{item['name']}_result" in output)
+    return {
+        "type": "function_call_output",
+        "call_id": item["call_id"],
+        "output": json.dumps(to_serializable(output)),
+    }
+
+async def execute_tool_calls(tools, items: list[dict], timeout: float | None = None) -> list[dict]:
+    """Runs every call concurrently, `tools` is anything with .get(name). Outputs keep the call order"""
+    return list(await asyncio.gather(*[
+        execute_tool_call(tools.get(item["name"]), item, timeout)
+        for item in items
+    ]))
@@ -1,16 +1,53 @@
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from openai import OpenAI
-import json
+import asyncio
+import contextlib
+import inspect
 from dotenv import load_dotenv
 load_dotenv()
 from utils.serializable import to_serializable
+from react_agent.history import HistoryManager, estimate_tokens
+from react_agent.rate_limit import RateLimiter, get_default_rate_limiter
+from react_agent.tool_registry import ToolRegistry
+from react_agent.tool import execute_tool_call, execute_tool_calls
+from react_agent.context import get_run_context
+from react_agent.tracing import TraceRecorder, get_current_trace, reset_current_trace, set_current_trace, trace_span
 
-client = OpenAI()
+client = None
+
+def get_default_client():
+    # Create the client lazily so importing this module doesn't require credentials
+    global client
+    if client is None:
+        client = OpenAI()
+    return client
 
 class OpenAIToolCall:
-    def __init__(self):
-        pass
+    def __init__(
+        self,
+        client = None,
+        model: str = "gpt-4.1",
+        history: HistoryManager | None = None,
+        top_k: int | None = None,
+        rate_limiter: RateLimiter | None = None,
+        tracer: TraceRecorder | None = None,
+    ):
+        self.client = client
+        self.model = model
+        # Optional token budget for the input list re-sent on every call
+        self.history = history
+        # Optional number of tools sent per call, picked by relevance to the latest user message
+        self.top_k = top_k
+        # Model calls wait for this limiter, defaults to the process-wide one (see rate_limit)
+        self.rate_limiter = rate_limiter
+        # Traces run_tools and stream_tools calls made outside a traced graph run
+        self.tracer = tracer
+
+    def get_client(self):
+        if self.client is None:
+            self.client = get_default_client()
+        return self.client
 
     def to_openai_tool(self, tool_dict: dict) -> dict:
         schema = tool_dict.get("args_schema")
@@ -22,56 +59,216 @@ class OpenAIToolCall:
             "parameters": schema.get("parameters", {"type": "object", "properties": {}}),
         }
 
-    async def run_tools(self, tools, input_list):
-        tool_metadata = [tool.args_schema for tool in tools]
+    def latest_user_text(self, input_list) -> str:
+        for item in reversed(input_list):
+            if isinstance(item, dict) and item.get("role") == "user":
+                content = item.get("content")
+                if isinstance(content, str):
+                    return content
+                return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        return ""
+
+    def select_tools(self, tools, input_list):
+        if self.top_k is None or not isinstance(tools, ToolRegistry):
+            return tools
+        tools.build_index()
+        return tools.select(self.latest_user_text(input_list), self.top_k)
+
+    async def build_request(self, tools, input_list, instructions: str) -> dict:
+        tools = self.select_tools(tools, input_list)
+
+        if self.history is not None:
+            input_list = await self.history.compact(input_list)
+
+        request = {
+            "model": self.model,
+            "instructions": instructions,
+            "tools": [tool.args_schema for tool in tools],
+            "input": input_list,
+        }
+
+        # The request gets whatever is left of the run's deadline as its timeout
+        context = get_run_context()
+        if context.expired():
+            raise TimeoutError("Error: the run deadline passed before the model call")
+        if context.deadline is not None:
+            request["timeout"] = context.timeout()
+        return request
+
+    def get_rate_limiter(self) -> RateLimiter | None:
+        return self.rate_limiter if self.rate_limiter is not None else get_default_rate_limiter()
+
+    async def wait_for_rate_limit(self, request: dict) -> int:
+        """Waits for the request's turn and returns its estimated token count (0 when unlimited)"""
+        limiter = self.get_rate_limiter()
+        if limiter is None:
+            return 0
+        estimated = estimate_tokens(request["instructions"]) + sum(estimate_tokens(item) for item in request["input"])
+        with trace_span("rate limit", "rate_limit", tokens=estimated):
+            await limiter.acquire(estimated)
+        # The wait shortened the run's remaining budget
+        if "timeout" in request:
+            request["timeout"] = get_run_context().timeout()
+        return estimated
+
+    def record_usage(self, response, estimated: int):
+        limiter = self.get_rate_limiter()
+        usage = getattr(response, "usage", None)
+        total_tokens = getattr(usage, "total_tokens", None)
+        if limiter is not None and total_tokens is not None:
+            limiter.record_usage(estimated, total_tokens)
+
+    async def call_create(self, **kwargs):
+        """Calls responses.create, a sync client's blocking call runs in a thread"""
+        create = self.get_client().responses.create
+        if inspect.iscoroutinefunction(create):
+            return await create(**kwargs)
+        response = await asyncio.to_thread(create, **kwargs)
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
+    async def create_response(self, tools, input_list, instructions: str):
+        request = await self.build_request(tools, input_list, instructions)
+        estimated = await self.wait_for_rate_limit(request)
+
+        # Works with both the sync and the async OpenAI clients
+        with trace_span(self.model, "model", tools=len(request["tools"])):
+            response = await self.call_create(**request)
+        self.record_usage(response, estimated)
+        return response
+
+    async def stream_response(self, tools, input_list, instructions: str):
+        """Yields the response's stream events as they arrive, for sync and async clients"""
+        request = await self.build_request(tools, input_list, instructions)
+        estimated = await self.wait_for_rate_limit(request)
+
+        # The span covers the whole stream, including the time the consumer spends between events
+        with trace_span(self.model, "model", tools=len(request["tools"]), stream=True):
+            events = await self.call_create(stream=True, **request)
+            if hasattr(events, "__aiter__"):
+                async for event in events:
+                    if event.type == "response.completed":
+                        self.record_usage(event.response, estimated)
+                    yield event
+            else:
+                # A sync stream blocks while it waits for the next event, read it in a thread
+                # so tool calls started from earlier events keep running on the loop
+                events = iter(events)
+                while (event := await asyncio.to_thread(next, events, None)) is not None:
+                    if event.type == "response.completed":
+                        self.record_usage(event.response, estimated)
+                    yield event
+
+    @contextlib.contextmanager
+    def traced_run(self):
+        """Starts a run trace from self.tracer, unless the caller is already part of a traced run"""
+        if self.tracer is None or get_current_trace() is not None:
+            yield
+            return
+        token = set_current_trace(self.tracer.start_run("tool_calls"))
+        try:
+            yield
+        finally:
+            reset_current_trace(token)
+
+    async def run_tool_calls(self, tools: ToolRegistry, function_calls: list[dict]) -> list[dict]:
+        # Run every requested tool concurrently, outputs keep the call order
+        return await execute_tool_calls(tools, function_calls)
+
+    async def stream_tools(self, tools, input_list):
+        """
+        Streaming version of run_tools. Each tool starts as soon as the model
+        has finished its function_call item, while the model is still
+        generating the rest of the response. Yields the text deltas of the
+        final answer.
+        """
+        with self.traced_run():
+            async for delta in self.stream_traced_tools(tools, input_list):
+                yield delta
+
+    async def stream_traced_tools(self, tools, input_list):
+        if not isinstance(tools, ToolRegistry):
+            tools = ToolRegistry(tools)
+
+        pending = []
+        response = None
+        try:
+            async for event in self.stream_response(
+                tools,
+                input_list,
+                instructions="Generate relevant tool arguments using the list of tools",
+            ):
+                if event.type == "response.output_item.done" and event.item.type == "function_call":
+                    item = to_serializable(event.item)
+                    pending.append(asyncio.ensure_future(execute_tool_call(tools.get(item["name"]), item)))
+                elif event.type == "response.completed":
+                    response = event.response
+
+            if response is None:
+                raise RuntimeError("Error: the response stream ended before response.completed")
+
+            # Outputs keep the call order, like run_tool_calls
+            input_list += response.output
+            input_list += await asyncio.gather(*pending)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        async for event in self.stream_response(
+            tools,
+            input_list,
+            instructions="Respond only with the relevant answer generated by a tool.",
+        ):
+            if event.type == "response.output_text.delta":
+                yield event.delta
+
+    async def run_tools(self, tools, input_list, stream: bool = False):
+        with self.traced_run():
+            await self.run_traced_tools(tools, input_list, stream)
+
+    async def run_traced_tools(self, tools, input_list, stream: bool = False):
+        if not isinstance(tools, ToolRegistry):
+            tools = ToolRegistry(tools)
+
+        if stream:
+            print("Final output:")
+            async for delta in self.stream_tools(tools, input_list):
+                print(delta, end="", flush=True)
+            print()
+            return
+
+        tool_metadata = tools.schemas()
 
         print("tool metadata: ", tool_metadata)
 
         # Call LLM to get the tool params
-        response = client.responses.create(
-            model="gpt-4.1",
+        response = await self.create_response(
+            tools,
+            input_list,
             instructions="Generate relevant tool arguments using the list of tools",
-            tools=tool_metadata,
-            input=input_list,
         )
 
         # Save function call outputs for subsequent requests
         input_list += response.output
 
-        for item in response.output:
-            if item.type == "function_call":
-                # 3. Execute the function logic
-                for tool in tools:
-                    if item.name == tool.name:
-                        args = json.loads(item.arguments)
-                        if tool.is_async is True:
-                            result = await tool(**args)
-                        else:
-                            result = tool(**args)
-                        print("result: ", result)
-                
-                # # 4. Provide function call results to the model
-                input_list.append({
-                    "type": "function_call_output",
-                    "call_id": item.call_id,
-                    "output": json.dumps({
-                        f"{item.name}_result": result
-                    })
-                })
-
-        serialized_tools = to_serializable(tools)
-        tools = [self.to_openai_tool(t) for t in serialized_tools]
+        # 3. Execute the function logic
+        # 4. Provide function call results to the model
+        function_calls = [
+            to_serializable(item) for item in response.output
+            if item.type == "function_call"
+        ]
+        input_list += await self.run_tool_calls(tools, function_calls)
 
         # Call LLM to generate a response based on the tools called
-        response = client.responses.create(
-            model="gpt-4.1",
+        response = await self.create_response(
+            tools,
+            input_list,
             instructions="Respond only with the relevant answer generated by a tool.",
-            tools=tools,
-            input=input_list,
         )
 
         # The model should be able to give a response!
         print("Final output:")
         print(response)
         print(response.model_dump_json(indent=2))
-        print("\n" + response.output_text)
\ No newline at end of file
+        print("\n" + response.output_text)
@@ -0,0 +1,101 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from collections import Counter
+from typing import Dict, List
+import heapq
+import math
+import re
+from react_agent.tool import Tool
+
+TOKEN_PATTERN = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "the", "this", "that", "to", "was", "will", "with",
+})
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens, snake_case and camelCase names are split into words"""
+    return [
+        token for token in (match.lower() for match in TOKEN_PATTERN.findall(text))
+        if token not in STOPWORDS
+    ]
+
+class ToolIndex:
+    """
+    Incremental BM25 index over tool names, descriptions and the argument
+    descriptions parsed from the 'Args:' docstring section.
+
+    Postings are kept per term, so a query only touches the tools that share
+    a term with it. Adding a tool only updates the postings of its own terms.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75, name_weight: int = 2):
+        self.k1 = k1
+        self.b = b
+        self.name_weight = name_weight
+
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+        # Per-tool length normalization, recomputed lazily after tools are added
+        self._norms: Dict[str, float] | None = None
+
+    def _tool_terms(self, tool: Tool) -> List[str]:
+        terms = tokenize(tool.name) * self.name_weight
+        terms += tokenize(tool._get_main_description(tool.description))
+        for arg_name, arg_description in tool.arg_descriptions.items():
+            terms += tokenize(arg_name)
+            terms += tokenize(arg_description)
+        return terms
+
+    def add(self, tool: Tool):
+        if tool.name in self.doc_lengths:
+            raise ValueError(f"Tool with name {tool.name} already exists in the index.")
+
+        terms = self._tool_terms(tool)
+        for term, count in Counter(terms).items():
+            self.postings.setdefault(term, {})[tool.name] = count
+        self.doc_lengths[tool.name] = len(terms)
+        self.total_length += len(terms)
+        self._norms = None
+
+    def _get_norms(self) -> Dict[str, float]:
+        if self._norms is None:
+            avg_length = self.total_length / len(self.doc_lengths)
+            self._norms = {
+                name: self.k1 * (1 - self.b + self.b * length / avg_length)
+                for name, length in self.doc_lengths.items()
+            }
+        return self._norms
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def search(self, query: str, k: int = 5) -> List[str]:
+        """
+        Returns the names of the top-k tools, best first. When fewer than k
+        tools match (or none do), the rest is padded with unmatched tools in
+        the order they were added, so the model always has something to call.
+        """
+        n_docs = len(self.doc_lengths)
+        if n_docs == 0 or k <= 0:
+            return []
+
+        norms = self._get_norms()
+        k1_plus_one = self.k1 + 1
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            weight = idf * k1_plus_one
+            for name, tf in postings.items():
+                scores[name] = scores.get(name, 0.0) + weight * tf / (tf + norms[name])
+
+        ranked = [name for name, _ in heapq.nlargest(k, scores.items(), key=lambda item: item[1])]
+        for name in self.doc_lengths:
+            if len(ranked) >= k:
+                break
+            if name not in scores:
+                ranked.append(name)
+        return ranked
@@ -0,0 +1,115 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from typing import Callable, Dict, Iterable, Iterator, List
+import asyncio
+from react_agent.tool import Tool
+from react_agent.tool_index import ToolIndex
+
+class ToolRegistry:
+    """
+    Name-indexed collection of tools.
+    - lookups by name are O(1)
+    - schemas are only built when they are first requested
+    - bulk registration validates names before adding anything
+    - with an index, tools are added to it as they are registered and
+      `select` returns the most relevant tools for a query
+    - `async with registry:` starts every tool's resources up front and
+      shuts them down on exit (tools otherwise start on their first call)
+    """
+    def __init__(self, tools: Iterable[Tool | Callable] | None = None, index: ToolIndex | None = None):
+        self._tools: Dict[str, Tool] = {}
+        self.index = index
+        if tools is not None:
+            self.register_many(tools)
+
+    def _to_tool(self, tool: Tool | Callable) -> Tool:
+        if isinstance(tool, Tool):
+            return tool
+        if callable(tool):
+            return Tool(func=tool, name=tool.__name__, description=tool.__doc__)
+        raise TypeError(f"Expected a Tool or a callable, but received: {type(tool)}")
+
+    def register(self, tool: Tool | Callable) -> Tool:
+        tool = self._to_tool(tool)
+        if tool.name in self._tools:
+            raise ValueError(f"Tool with name {tool.name} already exists in the registry.")
+        self._tools[tool.name] = tool
+        if self.index is not None:
+            self.index.add(tool)
+        return tool
+
+    def register_many(self, tools: Iterable[Tool | Callable]) -> List[Tool]:
+        new_tools = [self._to_tool(tool) for tool in tools]
+
+        # Validate every name first so a bad catalog doesn't leave a partial registry
+        seen = set()
+        for tool in new_tools:
+            if tool.name in self._tools or tool.name in seen:
+                raise ValueError(f"Tool with name {tool.name} already exists in the registry.")
+            seen.add(tool.name)
+
+        for tool in new_tools:
+            self._tools[tool.name] = tool
+            if self.index is not None:
+                self.index.add(tool)
+        return new_tools
+
+    def build_index(self, index: ToolIndex | None = None) -> ToolIndex:
+        # Index the tools registered so far, later registrations are added incrementally
+        if self.index is None:
+            self.index = index or ToolIndex()
+            for tool in self._tools.values():
+                self.index.add(tool)
+        return self.index
+
+    def select(self, query: str, k: int) -> List[Tool]:
+        if self.index is None:
+            raise RuntimeError("Error: the registry has no index, call build_index() first")
+        return [self._tools[name] for name in self.index.search(query, k)]
+
+    def get(self, name: str) -> Tool | None:
+        return self._tools.get(name)
+
+    def __getitem__(self, name: str) -> Tool:
+        tool = self._tools.get(name)
+        if tool is None:
+            raise KeyError(f"Tool {name} is not registered")
+        return tool
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def __iter__(self) -> Iterator[Tool]:
+        return iter(self._tools.values())
+
+    def names(self) -> List[str]:
+        return list(self._tools.keys())
+
+    def schemas(self, names: Iterable[str] | None = None) -> List[dict]:
+        # Builds (and caches on each tool) only the schemas that are requested
+        if names is None:
+            return [tool.args_schema for tool in self._tools.values()]
+        return [self[name].args_schema for name in names]
+
+    async def startup(self):
+        await asyncio.gather(*[tool.startup() for tool in self._tools.values()])
+
+    async def shutdown(self):
+        """Shuts down every started tool, the first error is raised after all of them ran"""
+        results = await asyncio.gather(*[tool.shutdown() for tool in self._tools.values()], return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    async def __aenter__(self):
+        await self.startup()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.shutdown()
+
+    def __repr__(self):
+        return f"ToolRegistry(tools={self.names()})"
@@ -0,0 +1,156 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from contextvars import ContextVar
+from typing import Dict, List
+import asyncio
+import contextlib
+import itertools
+import json
+import random
+import threading
+import time
+
+class RunTrace:
+    """
+    Events of one traced run. Each run is one process track in the trace,
+    with a thread track per OS thread and per asyncio task that recorded
+    something (async work on the loop thread overlaps, so tasks get their own).
+    """
+    __slots__ = ("recorder", "run_id", "events")
+
+    def __init__(self, recorder: 'TraceRecorder', run_id: int, name: str):
+        self.recorder = recorder
+        self.run_id = run_id
+        self.events: List[Dict] = [
+            {"name": "process_name", "ph": "M", "pid": run_id, "tid": 0, "args": {"name": name}},
+        ]
+
+    def track(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is not None:
+            return self.recorder.track_id(self, "task", task.get_name())
+        thread = threading.current_thread()
+        return self.recorder.track_id(self, "thread", f"{thread.name} ({thread.ident})")
+
+    def complete(self, name: str, cat: str, start: float, end: float, **args):
+        """Records a span measured with time.perf_counter"""
+        self.events.append({
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": self.recorder.micros(start),
+            "dur": (end - start) * 1e6,
+            "pid": self.run_id,
+            "tid": self.track(),
+            "args": args,
+        })
+
+    def instant(self, name: str, cat: str, **args):
+        self.events.append({
+            "name": name,
+            "cat": cat,
+            "ph": "i",
+            "s": "t",
+            "ts": self.recorder.micros(time.perf_counter()),
+            "pid": self.run_id,
+            "tid": self.track(),
+            "args": args,
+        })
+
+    @contextlib.contextmanager
+    def span(self, name: str, cat: str, **args):
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.complete(name, cat, start, time.perf_counter(), **args)
+
+    def to_chrome_trace(self) -> Dict:
+        return {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+
+class TraceRecorder:
+    """
+    Records timeline traces of graph runs (see Graph.compile(tracer=...)) as
+    Chrome Trace Event JSON, which chrome://tracing and Perfetto open.
+
+    sample_rate: fraction of runs that are traced, the others record nothing
+    """
+    def __init__(self, sample_rate: float = 1.0, seed: int | None = None):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"Error: sample_rate must be between 0 and 1, but received: {sample_rate}")
+        self.sample_rate = sample_rate
+        self.epoch = time.perf_counter()
+        self.random = random.Random(seed)
+        self.runs: List[RunTrace] = []
+        self.run_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        # (run id, kind, name) -> tid
+        self.tracks: Dict[tuple, int] = {}
+        self.skipped = 0
+
+    def micros(self, t: float) -> float:
+        return (t - self.epoch) * 1e6
+
+    def start_run(self, name: str = "run") -> RunTrace | None:
+        """A trace for a new run, or None when the run isn't sampled"""
+        if self.sample_rate < 1.0 and self.random.random() >= self.sample_rate:
+            self.skipped += 1
+            return None
+        with self.lock:
+            run_id = next(self.run_ids)
+            trace = RunTrace(self, run_id, f"{name} {run_id}")
+            self.runs.append(trace)
+        return trace
+
+    def track_id(self, trace: RunTrace, kind: str, name: str) -> int:
+        key = (trace.run_id, kind, name)
+        tid = self.tracks.get(key)
+        if tid is None:
+            with self.lock:
+                tid = self.tracks.get(key)
+                if tid is None:
+                    tid = len(self.tracks) + 1
+                    self.tracks[key] = tid
+                    trace.events.append({
+                        "name": "thread_name", "ph": "M", "pid": trace.run_id, "tid": tid,
+                        "args": {"name": f"{kind} {name}"},
+                    })
+        return tid
+
+    def to_chrome_trace(self) -> Dict:
+        events = []
+        for trace in self.runs:
+            events.extend(trace.events)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f, default=str)
+
+    def clear(self):
+        with self.lock:
+            self.runs = []
+            self.tracks = {}
+
+# Trace of the run the current node belongs to, read by tool and model calls
+_current_trace: ContextVar[RunTrace | None] = ContextVar("run_trace", default=None)
+
+def get_current_trace() -> RunTrace | None:
+    return _current_trace.get()
+
+def set_current_trace(trace: RunTrace | None):
+    """Returns a token for reset_current_trace"""
+    return _current_trace.set(trace)
+
+def reset_current_trace(token):
+    _current_trace.reset(token)
+
+def trace_span(name: str, cat: str, **args):
+    """Span in the current run's trace, a no-op context when the run isn't traced"""
+    trace = _current_trace.get()
+    if trace is None:
+        return contextlib.nullcontext(args)
+    return trace.span(name, cat, **args)
@@ -0,0 +1,311 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from typing import Callable, Dict, List
+import abc
+import asyncio
+import inspect
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import pickle
+import threading
+import time
+
+class ExecutorBackend(abc.ABC):
+    """
+    Runs node callables outside the graph's process (see Graph.compile(executor=...)).
+    Only sync plain nodes with picklable callables are shipped, tool nodes,
+    routers, async and subgraph nodes always run in the graph's process.
+    """
+    def start(self):
+        pass
+
+    def shutdown(self):
+        pass
+
+    @abc.abstractmethod
+    async def submit(self, node_id: str, func: Callable, state: Dict) -> tuple[Dict, float]:
+        """Runs func(state) and returns its result and run time in seconds"""
+        pass
+
+    def reads(self, node_id: str) -> List[str] | None:
+        """The state keys shipped to node_id, None when it gets the whole state"""
+        return None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+def worker_main(tasks, results, heartbeat_interval: float):
+    """
+    Worker process loop: runs (task id, pickled (node id, func, state)) tasks
+    from its queue and reports results and heartbeats on its own pipe.
+    """
+    send_lock = threading.Lock()
+
+    def send(message: tuple):
+        try:
+            with send_lock:
+                results.send(message)
+        except OSError:
+            # The broker closed our pipe (we were replaced or it shut down)
+            os._exit(0)
+
+    def beat():
+        while True:
+            send(("heartbeat",))
+            time.sleep(heartbeat_interval)
+
+    threading.Thread(target=beat, daemon=True).start()
+
+    while True:
+        item = tasks.get()
+        if item is None:
+            return
+        task_id, payload = item
+        start = time.perf_counter()
+        try:
+            _, func, state = pickle.loads(payload)
+            res = func(state)
+            if inspect.isawaitable(res):
+                res = asyncio.run(res)
+            # Pickle here so an unpicklable result is reported as a node error
+            output = ("result", task_id, True, pickle.dumps(res), time.perf_counter() - start)
+        except Exception as e:
+            output = ("result", task_id, False, f"{type(e).__name__}: {e}", time.perf_counter() - start)
+        send(output)
+
+class WorkerHandle:
+    __slots__ = ("process", "tasks", "results", "in_flight", "last_heartbeat", "ready")
+
+    def __init__(self, process, tasks, results, now: float):
+        self.process = process
+        self.tasks = tasks
+        self.results = results
+        self.in_flight: set = set()
+        self.last_heartbeat = now
+        # Set by the first heartbeat, until then the worker is still importing
+        self.ready = False
+
+class PendingTask:
+    __slots__ = ("node_id", "payload", "future", "loop", "attempts")
+
+    def __init__(self, node_id: str, payload: bytes, future: asyncio.Future, loop):
+        self.node_id = node_id
+        self.payload = payload
+        self.future = future
+        self.loop = loop
+        self.attempts = 0
+
+class ProcessBackend(ExecutorBackend):
+    """
+    Local broker for a pool of worker processes.
+
+    Every worker has its own task queue and result pipe, so the broker knows
+    which tasks each worker holds and a killed worker can't leave a shared
+    queue locked. Workers send a heartbeat every heartbeat_interval seconds
+    from a separate thread. A worker that exits or misses heartbeats for heartbeat_timeout seconds (e.g. stuck
+    holding the GIL) is killed and replaced, and its tasks are dispatched again,
+    up to max_attempts runs per task. A new worker has startup_timeout seconds
+    to send its first heartbeat (spawned workers re-import the main module).
+
+    input_keys: node id -> the state keys the node reads. Only that slice of
+    the state is shipped, other nodes receive the whole state.
+    """
+    def __init__(
+        self,
+        workers: int = 2,
+        heartbeat_interval: float = 0.5,
+        heartbeat_timeout: float = 5.0,
+        max_attempts: int = 3,
+        startup_timeout: float = 30.0,
+        input_keys: Dict[str, List[str]] | None = None,
+        start_method: str = "spawn",
+    ):
+        if workers < 1:
+            raise ValueError(f"Error: workers must be at least 1, but received: {workers}")
+        self.num_workers = workers
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+        self.startup_timeout = startup_timeout
+        self.input_keys = input_keys or {}
+        self.context = multiprocessing.get_context(start_method)
+
+        self.workers: Dict[int, WorkerHandle] = {}
+        self.pending: Dict[int, PendingTask] = {}
+        self.lock = threading.Lock()
+        self.task_ids = itertools.count()
+        self.worker_ids = itertools.count()
+        self.collector: threading.Thread | None = None
+        self.stopping = threading.Event()
+
+        # Metrics
+        self.restarts = 0
+        self.redispatched = 0
+
+    def start(self):
+        with self.lock:
+            if self.collector is not None:
+                return
+            self.stopping.clear()
+            for _ in range(self.num_workers):
+                self.spawn()
+            self.collector = threading.Thread(target=self.collect, daemon=True)
+            self.collector.start()
+
+    def spawn(self) -> int:
+        worker_id = next(self.worker_ids)
+        tasks = self.context.Queue()
+        results, worker_end = self.context.Pipe(duplex=False)
+        process = self.context.Process(
+            target=worker_main,
+            args=(tasks, worker_end, self.heartbeat_interval),
+            daemon=True,
+        )
+        process.start()
+        # Only the worker holds the sending end, so its death shows up as EOF
+        worker_end.close()
+        self.workers[worker_id] = WorkerHandle(process, tasks, results, time.monotonic())
+        return worker_id
+
+    def shutdown(self):
+        with self.lock:
+            if self.collector is None:
+                return
+            self.stopping.set()
+            for worker in self.workers.values():
+                worker.tasks.put(None)
+        self.collector.join()
+        for worker in self.workers.values():
+            worker.process.join(timeout=1)
+            if worker.process.is_alive():
+                worker.process.kill()
+            worker.results.close()
+        for task in self.pending.values():
+            self.resolve(task, RuntimeError("Error: the worker pool was shut down"))
+        self.workers.clear()
+        self.pending.clear()
+        self.collector = None
+
+    def reads(self, node_id: str) -> List[str] | None:
+        return self.input_keys.get(node_id)
+
+    async def submit(self, node_id: str, func: Callable, state: Dict) -> tuple[Dict, float]:
+        keys = self.input_keys.get(node_id)
+        if keys is not None:
+            state = {key: state[key] for key in keys}
+        payload = pickle.dumps((node_id, func, state))
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        task_id = next(self.task_ids)
+        task = PendingTask(node_id, payload, loop.create_future(), loop)
+        with self.lock:
+            self.pending[task_id] = task
+            self.dispatch(task_id)
+        try:
+            return await task.future
+        finally:
+            # Cancelled (e.g. deadline): a late result is dropped
+            with self.lock:
+                self.pending.pop(task_id, None)
+
+    def dispatch(self, task_id: int):
+        """Sends a task to the least loaded worker, the lock must be held"""
+        task = self.pending[task_id]
+        task.attempts += 1
+        worker_id = min(self.workers, key=lambda worker_id: len(self.workers[worker_id].in_flight))
+        worker = self.workers[worker_id]
+        worker.in_flight.add(task_id)
+        worker.tasks.put((task_id, task.payload))
+
+    def resolve(self, task: PendingTask, result):
+        def set_result():
+            if task.future.done():
+                return
+            if isinstance(result, Exception):
+                task.future.set_exception(result)
+            else:
+                task.future.set_result(result)
+        try:
+            task.loop.call_soon_threadsafe(set_result)
+        except RuntimeError:
+            # The caller's loop is already closed, nobody is waiting
+            pass
+
+    def collect(self):
+        """Broker thread: routes results, records heartbeats and replaces dead workers"""
+        while not self.stopping.is_set():
+            with self.lock:
+                connections = {worker.results: worker_id for worker_id, worker in self.workers.items()}
+            ready = multiprocessing.connection.wait(list(connections), timeout=self.heartbeat_interval)
+
+            with self.lock:
+                for connection in ready:
+                    worker_id = connections[connection]
+                    if worker_id not in self.workers:
+                        continue
+                    try:
+                        message = connection.recv()
+                    except (EOFError, OSError):
+                        # The worker died, check_workers replaces it
+                        self.workers[worker_id].last_heartbeat = float("-inf")
+                        continue
+                    self.handle(self.workers[worker_id], message)
+                self.check_workers()
+
+    def handle(self, worker: WorkerHandle, message: tuple):
+        worker.last_heartbeat = time.monotonic()
+        worker.ready = True
+        if message[0] != "result":
+            return
+
+        _, task_id, ok, value, elapsed = message
+        worker.in_flight.discard(task_id)
+        task = self.pending.pop(task_id, None)
+        if task is None:
+            return
+        if not ok:
+            self.resolve(task, RuntimeError(f"Error: node {task.node_id} failed in a worker: {value}"))
+            return
+        try:
+            self.resolve(task, (pickle.loads(value), elapsed))
+        except Exception as e:
+            self.resolve(task, e)
+
+    def check_workers(self):
+        now = time.monotonic()
+        for worker_id, worker in list(self.workers.items()):
+            alive = worker.process.is_alive()
+            timeout = self.heartbeat_timeout if worker.ready else self.startup_timeout
+            if alive and now - worker.last_heartbeat <= timeout:
+                continue
+            if alive:
+                worker.process.kill()
+            worker.results.close()
+            del self.workers[worker_id]
+            self.restarts += 1
+            self.spawn()
+
+            for task_id in worker.in_flight:
+                task = self.pending.get(task_id)
+                if task is None:
+                    continue
+                if task.attempts >= self.max_attempts:
+                    del self.pending[task_id]
+                    self.resolve(task, RuntimeError(
+                        f"Error: node {task.node_id} was lost with {task.attempts} workers, giving up"
+                    ))
+                else:
+                    self.redispatched += 1
+                    self.dispatch(task_id)
+
+    def __repr__(self):
+        return (
+            f"ProcessBackend(workers={len(self.workers)}, pending={len(self.pending)}, "
+            f"restarts={self.restarts}, redispatched={self.redispatched})"
+        )
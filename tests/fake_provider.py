@@ -0,0 +1,125 @@
+import asyncio
+import json
+import time
+
+class FakeFunctionCall:
+    def __init__(self, name: str, arguments: dict, call_id: str):
+        self.type = "function_call"
+        self.name = name
+        self.arguments = json.dumps(arguments)
+        self.call_id = call_id
+
+class FakeMessage:
+    def __init__(self, text: str):
+        self.type = "message"
+        self.role = "assistant"
+        self.content = [{"type": "output_text", "text": text}]
+
+class FakeResponse:
+    def __init__(self, output: list):
+        self.output = output
+
+    @property
+    def output_text(self) -> str:
+        return "".join(
+            part["text"]
+            for item in self.output if item.type == "message"
+            for part in item.content
+        )
+
+class FakeEvent:
+    def __init__(self, type: str, **fields):
+        self.type = type
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+class FakeResponses:
+    def __init__(self, script, latency: float = 0.0, item_latency: float = 0.0):
+        self.script = script
+        self.latency = latency
+        # Streaming only: time the model spends generating each output item
+        self.item_latency = item_latency
+        self.calls = []
+        # (event type, time.perf_counter()) for every streamed event
+        self.events = []
+
+    async def create(self, stream: bool = False, **kwargs):
+        self.calls.append(kwargs)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if stream:
+            return self.stream(self.script(kwargs))
+        return FakeResponse(self.script(kwargs))
+
+    async def stream(self, output: list):
+        for index, item in enumerate(output):
+            if self.item_latency:
+                await asyncio.sleep(self.item_latency)
+            if item.type == "message":
+                text = item.content[0]["text"]
+                # Two word deltas, like a model streaming tokens
+                words = text.split(" ")
+                for i in range(0, len(words), 2):
+                    delta = " ".join(words[i:i + 2]) + (" " if i + 2 < len(words) else "")
+                    yield self.emit(FakeEvent("response.output_text.delta", output_index=index, delta=delta))
+            else:
+                yield self.emit(FakeEvent("response.function_call_arguments.done", output_index=index, arguments=item.arguments))
+            yield self.emit(FakeEvent("response.output_item.done", output_index=index, item=item))
+        yield self.emit(FakeEvent("response.completed", response=FakeResponse(output)))
+
+    def emit(self, event: FakeEvent) -> FakeEvent:
+        self.events.append((event.type, time.perf_counter()))
+        return event
+
+class FakeSyncResponses(FakeResponses):
+    """Blocking create() and stream, like the sync OpenAI client"""
+    def create(self, stream: bool = False, **kwargs):
+        self.calls.append(kwargs)
+        if self.latency:
+            time.sleep(self.latency)
+        if stream:
+            return self.stream(self.script(kwargs))
+        return FakeResponse(self.script(kwargs))
+
+    def stream(self, output: list):
+        for index, item in enumerate(output):
+            if self.item_latency:
+                time.sleep(self.item_latency)
+            if item.type == "message":
+                yield self.emit(FakeEvent("response.output_text.delta", output_index=index, delta=item.content[0]["text"]))
+            yield self.emit(FakeEvent("response.output_item.done", output_index=index, item=item))
+        yield self.emit(FakeEvent("response.completed", response=FakeResponse(output)))
+
+class FakeClock:
+    """Simulated monotonic clock for rate limiters: sleep() advances time instantly"""
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        # Let everything runnable now run before time jumps
+        await asyncio.sleep(0)
+        self.now += seconds
+
+class FakeAsyncClient:
+    """
+    Local stand-in for AsyncOpenAI. `script` receives the create() kwargs and
+    returns the list of output items for that call.
+    """
+    def __init__(self, script, latency: float = 0.0, item_latency: float = 0.0):
+        self.responses = FakeResponses(script, latency, item_latency)
+
+class FakeSyncClient:
+    """Local stand-in for the sync OpenAI client, see FakeAsyncClient"""
+    def __init__(self, script, latency: float = 0.0, item_latency: float = 0.0):
+        self.responses = FakeSyncResponses(script, latency, item_latency)
+
+def call_tool_once(tool_name: str, arguments: dict, answer: str = "done"):
+    """Script that calls one tool, then answers once the tool output is in the input"""
+    def script(kwargs):
+        if any(isinstance(item, dict) and item.get("type") == "function_call_output" for item in kwargs["input"]):
+            return [FakeMessage(answer)]
+        return [FakeFunctionCall(tool_name, arguments, call_id="call_1")]
+    return script
@@ -0,0 +1,131 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import mmap
+import pytest
+from react_agent.blob_store import BlobRef, BlobStore
+from react_agent.graph import Graph, State, START, END
+from utils.serializable import to_serializable
+from typing import Dict
+
+DOCUMENT = "lorem ipsum " * 100_000
+
+def build_rag_graph(**graph_options) -> Graph:
+    """START -> retrieve -> summarize -> END"""
+    def retrieve(state: Dict):
+        return {"document": DOCUMENT}
+
+    def summarize(state: Dict):
+        document = state["document"]
+        return {"summary": f"{len(document)} bytes, starts with {bytes(document.view()[:5]).decode()}"}
+
+    graph = Graph(State({"document": "", "summary": ""}), **graph_options)
+    graph.add_node("retrieve", retrieve)
+    graph.add_node("summarize", summarize)
+    graph.add_edge(START, "retrieve")
+    graph.add_edge("retrieve", "summarize")
+    graph.add_edge("summarize", END)
+    graph.compile()
+    return graph
+
+@pytest.mark.asyncio
+async def test_large_values_are_stored_once_and_referenced():
+    graph = build_rag_graph(blob_threshold=1024)
+    run = graph.new_run(State({}))
+    await run.invoke()
+
+    ref = run.state.state["document"]
+    assert isinstance(ref, BlobRef)
+    assert ref.text() == DOCUMENT
+    assert run.state.state["summary"] == f"{len(DOCUMENT)} bytes, starts with lorem"
+
+    # Every later history entry holds the same reference to a single blob
+    refs = [state.state["document"] for state in run.history[1:]]
+    assert all(entry is ref for entry in refs)
+    assert len(run.blob_store) == 1
+    # Runs get their own store
+    assert graph.blob_store is not run.blob_store and len(graph.blob_store) == 0
+
+@pytest.mark.asyncio
+async def test_blobs_spill_to_mmapped_files():
+    graph = build_rag_graph(blob_threshold=1024, blob_dir="")
+    await graph.invoke()
+
+    ref = graph.state.state["document"]
+    view = ref.view()
+    assert isinstance(view.obj, mmap.mmap)
+    assert os.path.exists(os.path.join(graph.blob_store.directory, ref.digest))
+    assert view[:11].tobytes() == b"lorem ipsum"
+
+@pytest.mark.asyncio
+async def test_parallel_writes_of_references_merge_into_a_list():
+    def fan_out(state: Dict):
+        return {"docs": []}
+
+    def left(state: Dict):
+        return {"docs": b"L" * 4096}
+
+    def right(state: Dict):
+        return {"docs": b"L" * 4096}
+
+    graph = Graph(State({"docs": []}), blob_threshold=1024)
+    graph.add_node("fan_out", fan_out)
+    graph.add_node("left", left)
+    graph.add_node("right", right)
+    graph.add_edge(START, "fan_out")
+    graph.add_edge("fan_out", "left")
+    graph.add_edge("fan_out", "right")
+    graph.add_edge("left", END)
+    graph.add_edge("right", END)
+    graph.compile()
+    await graph.invoke()
+
+    docs = graph.state.state["docs"]
+    assert len(docs) == 2 and docs[0] == docs[1]
+    # Identical payloads share one blob
+    assert len(graph.blob_store) == 1
+    assert docs[0].value() == b"L" * 4096
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("large_first", [True, False])
+async def test_large_and_small_writes_to_one_key_merge(large_first):
+    def fan_out(state: Dict):
+        return {"notes": ""}
+
+    def large(state: Dict):
+        return {"notes": "x" * 4096}
+
+    def small(state: Dict):
+        return {"notes": "short"}
+
+    graph = Graph(State({"notes": ""}), blob_threshold=1024)
+    graph.add_node("fan_out", fan_out)
+    graph.add_edge(START, "fan_out")
+    branches = [("large", large), ("small", small)]
+    for node_id, func in branches if large_first else reversed(branches):
+        graph.add_node(node_id, func)
+        graph.add_edge("fan_out", node_id)
+        graph.add_edge(node_id, END)
+    graph.compile()
+    graph.run_state.set_max_retries(3)
+    await graph.invoke()
+
+    notes = graph.state.state["notes"]
+    assert len(notes) == 2
+    # The large write stays a reference, the small one inline
+    assert sorted(note.text() if isinstance(note, BlobRef) else note for note in notes) == ["short", "x" * 4096]
+
+def test_small_values_stay_inline_and_refs_serialize_as_references():
+    store = BlobStore(threshold=8)
+    assert store.externalize("short") == "short"
+
+    update = {"small": 1, "large": "x" * 16}
+    externalized = store.externalize_update(update)
+    assert externalized is not update and update["large"] == "x" * 16
+    ref = externalized["large"]
+    assert to_serializable(ref) == {"blob": ref.digest, "size": 16}
+
+    unchanged = {"small": 1}
+    assert store.externalize_update(unchanged) is unchanged
+
+    with pytest.raises(KeyError):
+        store.get("missing")
@@ -0,0 +1,143 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import asyncio
+import json
+import time
+import pytest
+from react_agent import ReActAgent, RunContext, get_run_context, tool
+from react_agent.context import set_run_context, reset_run_context
+from react_agent.graph import Graph, State, START, END, DATAFLOW
+from react_agent.tool import execute_tool_call
+from tests.fake_provider import FakeAsyncClient, call_tool_once
+from typing import Dict
+
+def build_slow_chain(mode: str = "bsp", seen: list = None) -> Graph:
+    """START -> fast -> slow -> END"""
+    def fast(state: Dict):
+        seen.append(get_run_context().remaining())
+        return {"fast": 1}
+
+    async def slow(state: Dict):
+        seen.append(get_run_context().remaining())
+        await asyncio.sleep(1)
+        return {"slow": 1}
+
+    graph = Graph(State({"fast": 0, "slow": 0}))
+    graph.add_node("fast", fast)
+    graph.add_node("slow", slow)
+    graph.add_edge(START, "fast")
+    graph.add_edge("fast", "slow")
+    graph.add_edge("slow", END)
+    graph.compile(mode=mode)
+    return graph
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["bsp", DATAFLOW])
+async def test_deadline_ends_the_run_with_partial_state(mode):
+    seen = []
+    graph = build_slow_chain(mode, seen)
+
+    start = time.perf_counter()
+    await graph.invoke(deadline=0.2)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5
+    assert graph.run_state.deadline_exceeded is True
+    assert graph.state.state == {"fast": 1, "slow": 0}
+    # Both the sync node (worker thread) and the async node saw the budget
+    assert len(seen) == 2 and all(remaining is not None and remaining <= 0.2 for remaining in seen)
+
+@pytest.mark.asyncio
+async def test_deadline_bounds_a_fused_chain():
+    def a(state: Dict):
+        return {"x": 1}
+
+    def b(state: Dict):
+        time.sleep(1)
+        return {"x": 2}
+
+    def c(state: Dict):
+        return {"x": 3}
+
+    graph = Graph(State({"x": 0}))
+    graph.add_node("a", a, inline=False)
+    graph.add_node("b", b, inline=False)
+    graph.add_node("c", c, inline=False)
+    graph.add_edge(START, "a")
+    graph.add_edge("a", "b")
+    graph.add_edge("b", "c")
+    graph.add_edge("c", END)
+    graph.compile()
+    assert graph.fused_next["a"] == "b"
+
+    start = time.perf_counter()
+    await graph.invoke(deadline=0.2)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.6
+    assert graph.run_state.deadline_exceeded is True
+    # b finished after the deadline, its update is dropped
+    await asyncio.sleep(1)
+    assert graph.state.state == {"x": 1}
+
+@pytest.mark.asyncio
+async def test_run_without_deadline_is_unbounded():
+    seen = []
+    graph = build_slow_chain(seen=seen)
+    await graph.invoke()
+
+    assert graph.run_state.deadline_exceeded is False
+    assert seen == [None, None]
+    assert graph.state.state == {"fast": 1, "slow": 1}
+
+@tool
+async def sleepy(seconds: float):
+    """
+    Sleeps
+
+    Args:
+        seconds: How long to sleep
+    """
+    await asyncio.sleep(seconds)
+    return "awake"
+
+@pytest.mark.asyncio
+async def test_tool_call_is_bounded_by_the_run_deadline():
+    item = {"name": "sleepy", "arguments": json.dumps({"seconds": 1}), "call_id": "call_1"}
+    token = set_run_context(RunContext.with_budget(0.05))
+    try:
+        start = time.perf_counter()
+        output = await execute_tool_call(sleepy, item, timeout=5)
+    finally:
+        reset_run_context(token)
+
+    assert time.perf_counter() - start < 0.5
+    assert "run deadline" in json.loads(output["output"])["sleepy_error"]
+
+def test_run_context_timeout_takes_the_smaller_budget():
+    now = [100.0]
+    context = RunContext.with_budget(2, clock=lambda: now[0])
+    assert context.timeout(5) == 2
+    assert context.timeout(1) == 1
+    now[0] = 103.0
+    assert context.expired() and context.remaining() == 0.0
+    assert RunContext().timeout(5) == 5
+
+@pytest.mark.asyncio
+async def test_agent_passes_the_remaining_budget_to_the_model():
+    client = FakeAsyncClient(call_tool_once("sleepy", {"seconds": 0}, answer="done"))
+    agent = ReActAgent(openai_api_key="test", client=client)
+    agent.register_tools([sleepy])
+
+    assert await agent.ainvoke("wake up", deadline=5) == "done"
+    assert all(0 < call["timeout"] <= 5 for call in client.responses.calls)
+
+@pytest.mark.asyncio
+async def test_agent_returns_partial_output_at_the_deadline():
+    client = FakeAsyncClient(call_tool_once("sleepy", {"seconds": 0}), latency=1)
+    agent = ReActAgent(openai_api_key="test", client=client)
+    agent.register_tools([sleepy])
+
+    start = time.perf_counter()
+    assert await agent.ainvoke("wake up", deadline=0.1) == ""
+    assert time.perf_counter() - start < 0.5
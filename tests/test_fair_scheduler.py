@@ -0,0 +1,181 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import asyncio
+import threading
+import time
+import pytest
+from react_agent.fair_scheduler import FairScheduler
+from react_agent.graph import Graph, State, START, END
+from typing import Dict
+
+async def hold_workers(scheduler: FairScheduler, count: int) -> tuple[threading.Event, list]:
+    """Occupies count workers until the returned event is set, so later tasks queue up"""
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def block():
+        started.release()
+        release.wait()
+
+    blockers = [asyncio.ensure_future(scheduler.run(block, tenant="hold")) for _ in range(count)]
+    for _ in range(count):
+        await asyncio.to_thread(started.acquire)
+    return release, blockers
+
+@pytest.mark.asyncio
+async def test_tenants_share_workers_by_weight():
+    order = []
+    with FairScheduler(workers=1, tenant_weights={"a": 3.0, "b": 1.0}) as scheduler:
+        release, blockers = await hold_workers(scheduler, 1)
+        tasks = [
+            asyncio.ensure_future(scheduler.run(order.append, tenant, tenant=tenant))
+            for tenant in ["a", "b"] for _ in range(20)
+        ]
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(*blockers, *tasks)
+
+    assert order[:16].count("a") == 12
+    assert order[:16].count("b") == 4
+
+@pytest.mark.asyncio
+async def test_runs_share_their_tenant_by_weight():
+    order = []
+    with FairScheduler(workers=1) as scheduler:
+        release, blockers = await hold_workers(scheduler, 1)
+        tasks = [
+            asyncio.ensure_future(scheduler.run(order.append, run_id, run_id=run_id, weight=weight))
+            for run_id, weight in [("big", 2.0), ("small", 1.0)] for _ in range(12)
+        ]
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(*blockers, *tasks)
+
+    assert order[:9].count("big") == 6
+
+@pytest.mark.asyncio
+async def test_higher_priority_runs_first():
+    order = []
+    with FairScheduler(workers=1, tenant_priorities={"interactive": 1}) as scheduler:
+        release, blockers = await hold_workers(scheduler, 1)
+        batch = [asyncio.ensure_future(scheduler.run(order.append, "batch", tenant="batch")) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        interactive = asyncio.ensure_future(scheduler.run(order.append, "interactive", tenant="interactive"))
+        urgent = asyncio.ensure_future(scheduler.run(order.append, "urgent", tenant="batch", run_id="urgent", priority=1))
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(*blockers, *batch, interactive, urgent)
+
+    assert order[:2] == ["interactive", "urgent"]
+
+@pytest.mark.asyncio
+async def test_caps_limit_running_tasks():
+    running = {"batch": 0, "capped run": 0}
+    peak = {"batch": 0, "capped run": 0}
+    lock = threading.Lock()
+
+    def work(name: str):
+        with lock:
+            running[name] += 1
+            peak[name] = max(peak[name], running[name])
+        time.sleep(0.005)
+        with lock:
+            running[name] -= 1
+
+    with FairScheduler(workers=4, tenant_caps={"batch": 2}) as scheduler:
+        await asyncio.gather(
+            *[scheduler.run(work, "batch", tenant="batch") for _ in range(12)],
+            *[scheduler.run(work, "capped run", run_id="capped", cap=1) for _ in range(6)],
+        )
+
+    assert peak == {"batch": 2, "capped run": 1}
+
+@pytest.mark.asyncio
+async def test_errors_reach_the_caller_and_metrics_are_kept():
+    def fail():
+        raise KeyError("missing")
+
+    with FairScheduler(workers=2) as scheduler:
+        assert await scheduler.run(sum, [1, 2, 3], tenant="t") == 6
+        with pytest.raises(KeyError):
+            await scheduler.run(fail, tenant="t")
+        stats = scheduler.stats("t")
+
+    assert stats.submitted == 2
+    assert stats.completed == 2
+    assert stats.queue_seconds_percentile(0.99) <= stats.max_queue_seconds
+    assert stats.mean_queue_seconds <= stats.max_queue_seconds
+
+@pytest.mark.asyncio
+async def test_shutdown_fails_queued_tasks():
+    scheduler = FairScheduler(workers=1)
+    release, blockers = await hold_workers(scheduler, 1)
+    queued = asyncio.ensure_future(scheduler.run(time.sleep, 0))
+    await asyncio.sleep(0.01)
+
+    stopper = asyncio.ensure_future(asyncio.to_thread(scheduler.shutdown))
+    await asyncio.sleep(0.01)
+    release.set()
+    await stopper
+    await asyncio.gather(*blockers)
+    with pytest.raises(RuntimeError):
+        await queued
+
+def build_batch_graph(items: int) -> Graph:
+    """START -> process (mapped over items, 5ms each) -> END"""
+    def process(state: Dict):
+        time.sleep(0.005)
+        return {"done": list(state["items"])}
+
+    graph = Graph(State({"items": list(range(items)), "done": []}))
+    graph.add_map_node("process", process, over="items")
+    graph.add_edge(START, "process")
+    graph.add_edge("process", END)
+    return graph
+
+def build_interactive_graph() -> Graph:
+    """START -> parse -> answer -> END, both sync"""
+    def parse(state: Dict):
+        time.sleep(0.001)
+        return {"parsed": True}
+
+    def answer(state: Dict):
+        time.sleep(0.001)
+        return {"answered": True}
+
+    graph = Graph(State({"parsed": False, "answered": False}))
+    graph.add_node("parse", parse, inline=False)
+    graph.add_node("answer", answer, inline=False)
+    graph.add_edge(START, "parse")
+    graph.add_edge("parse", "answer")
+    graph.add_edge("answer", END)
+    return graph
+
+@pytest.mark.asyncio
+async def test_interactive_queue_time_stays_low_during_a_batch_job():
+    with FairScheduler(workers=2) as scheduler:
+        batch = build_batch_graph(200)
+        batch.compile(fair_scheduler=scheduler)
+        interactive = build_interactive_graph()
+        interactive.compile(fuse=False, fair_scheduler=scheduler)
+
+        batch_run = asyncio.ensure_future(batch.new_run(State({}), tenant="batch").invoke())
+        await asyncio.sleep(0.02)
+        runs = []
+        for _ in range(10):
+            run = interactive.new_run(State({}), tenant="interactive")
+            await run.invoke()
+            runs.append(run)
+            await asyncio.sleep(0.005)
+        assert not batch_run.done()
+        await batch_run
+
+        interactive_stats = scheduler.stats("interactive")
+        batch_stats = scheduler.stats("batch")
+
+    assert all(run.state.state["answered"] for run in runs)
+    assert interactive_stats.completed == 20
+    # An interactive task waits for at most about one batch task per worker
+    assert interactive_stats.queue_seconds_percentile(0.99) < 0.05
+    # while the batch backlog waits for most of the job
+    assert batch_stats.max_queue_seconds > 0.2
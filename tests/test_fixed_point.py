@@ -0,0 +1,115 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import pytest
+from react_agent.graph import Graph, State, START, END, DATAFLOW
+from react_agent.fixed_point import STOP, RAISE, FixedPointDetector
+from typing import Dict
+
+def build_self_loop(limit: int, calls: list, **compile_options) -> Graph:
+    """START -> count -> count (self loop), count saturates at `limit`"""
+    def count(state: Dict):
+        calls.append(state["count"])
+        return {"count": min(state["count"] + 1, limit)}
+
+    graph = Graph(State({"count": 0}))
+    graph.add_node("count", count)
+    graph.add_edge(START, "count")
+    graph.add_edge("count", "count")
+    graph.run_state.set_max_retries(20)
+    graph.compile(**compile_options)
+    return graph
+
+def build_router_cycle(calls: list, **compile_options) -> Graph:
+    """START -> draft -> check -> {"retry": draft, "done": END}, the draft stops improving"""
+    def draft(state: Dict):
+        calls.append(state["draft"])
+        return {"draft": min(state["draft"] + 1, 2)}
+
+    def check(state: Dict):
+        return "done" if state["draft"] >= 5 else "retry"
+
+    graph = Graph(State({"draft": 0}))
+    graph.add_node("draft", draft)
+    graph.add_conditional_node("check", check)
+    graph.add_edge(START, "draft")
+    graph.add_edge("draft", "check")
+    graph.add_conditional_edges("check", {"retry": "draft", "done": END})
+    graph.run_state.set_max_retries(20)
+    graph.compile(**compile_options)
+    return graph
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["bsp", DATAFLOW])
+async def test_self_loop_stops_once_state_stops_changing(mode):
+    calls = []
+    graph = build_self_loop(3, calls, mode=mode, fixed_point=STOP)
+    await graph.invoke()
+
+    assert graph.state.state["count"] == 3
+    # 0, 1, 2 change the state, the first run on 3 repeats the barrier after the run on 2
+    assert calls == [0, 1, 2, 3]
+    assert graph.run_state.fixed_point_step is not None
+
+@pytest.mark.asyncio
+async def test_router_cycle_stops_once_state_stops_changing():
+    calls = []
+    graph = build_router_cycle(calls, fixed_point=STOP)
+    await graph.invoke()
+
+    assert graph.state.state["draft"] == 2
+    assert len(calls) < 6
+
+@pytest.mark.asyncio
+async def test_raise_reports_the_repeated_step():
+    graph = build_self_loop(1, [], fixed_point=RAISE)
+    with pytest.raises(RuntimeError, match="fixed point"):
+        await graph.invoke()
+
+@pytest.mark.asyncio
+async def test_loops_run_to_max_retries_by_default():
+    calls = []
+    graph = build_self_loop(3, calls)
+    await graph.invoke()
+
+    assert len(calls) == 20
+    assert graph.run_state.fixed_point_step is None
+
+@pytest.mark.asyncio
+async def test_loop_that_keeps_changing_state_is_not_stopped():
+    calls = []
+    graph = build_self_loop(100, calls, fixed_point=STOP)
+    await graph.invoke()
+    assert len(calls) == 20
+    assert graph.run_state.fixed_point_step is None
+
+@pytest.mark.asyncio
+async def test_new_runs_start_with_no_fingerprints():
+    calls = []
+    graph = build_self_loop(2, calls, fixed_point=STOP)
+    await graph.invoke()
+    calls.clear()
+
+    run = graph.new_run(State({"count": 0}))
+    await run.invoke()
+    assert calls == [0, 1, 2]
+
+def test_compile_rejects_unknown_fixed_point():
+    with pytest.raises(ValueError):
+        build_self_loop(1, [], fixed_point="halt")
+
+def test_incremental_fingerprint_matches_a_fresh_one():
+    state = {"a": 1, "b": [1, 2], "c": {"x": "y"}}
+    detector = FixedPointDetector(state)
+    state["b"] = [1, 2, 3]
+    detector.update(state, ["b"])
+    assert detector.state_fingerprint == FixedPointDetector(state).state_fingerprint
+
+    state["b"] = [1, 2]
+    detector.update(state, ["b"])
+    assert detector.state_fingerprint == FixedPointDetector({"a": 1, "b": [1, 2], "c": {"x": "y"}}).state_fingerprint
+
+def test_repeat_needs_the_same_active_nodes():
+    detector = FixedPointDetector({"a": 1})
+    assert detector.repeated(0, ["x"], {}) is None
+    assert detector.repeated(1, ["y"], {}) is None
+    assert detector.repeated(2, ["x"], {}) == 0
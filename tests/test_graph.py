@@ -3,7 +3,8 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 import pytest
 import asyncio
-from react_agent.graph import Graph, State, START, END
+from react_agent.graph import Graph, State, START, END, DATAFLOW
+import time
 from typing import Dict
 
 @pytest.mark.asyncio
@@ -230,5 +231,174 @@ async def test_simple_infinite_loop():
     # Be able to stop the loop after x max loops
     assert graph.state.state["step"] == 100
 
+def build_linear_chain(length: int, fuse: bool) -> Graph:
+    def make_node(i):
+        def node(state: Dict):
+            return {"step": state["step"] + 1, "message": f"Node {i} executed"}
+        return node
+
+    graph = Graph(State({"step": 0, "message": "Initial state"}), keep_results=True)
+    for i in range(length):
+        graph.add_node(f"node{i}", func=make_node(i))
+    graph.add_edge(START, "node0")
+    for i in range(length - 1):
+        graph.add_edge(f"node{i}", f"node{i + 1}")
+    graph.add_edge(f"node{length - 1}", END)
+    graph.compile(fuse=fuse)
+    return graph
+
+@pytest.mark.asyncio
+async def test_fused_linear_chain_matches_unfused():
+    fused = build_linear_chain(6, fuse=True)
+    unfused = build_linear_chain(6, fuse=False)
+
+    assert fused.fused_next == {f"node{i}": f"node{i + 1}" for i in range(5)}
+    assert unfused.fused_next == {}
+
+    fused_updates = [update async for update in fused.stream()]
+    unfused_updates = [update async for update in unfused.stream()]
+
+    assert fused_updates == unfused_updates
+    assert [s.state for s in fused.history] == [s.state for s in unfused.history]
+    assert fused.run_state.step_count == unfused.run_state.step_count
+    for i in range(6):
+        node_id = f"node{i}"
+        assert fused.node_registry[node_id].result.msg.content == unfused.node_registry[node_id].result.msg.content
+    assert fused.state.state == {"step": 6, "message": "Node 5 executed"}
+
+@pytest.mark.asyncio
+async def test_fused_chain_respects_step_budget():
+    graph = build_linear_chain(10, fuse=True)
+    graph.run_state.set_max_retries(4)
+
+    await graph.invoke()
+
+    assert graph.state.state["step"] == 4
+    assert graph.run_state.step_count == 3
+
+@pytest.mark.asyncio
+async def test_messages_released_after_merge():
+    graph = build_linear_chain(4, fuse=False)
+    graph.keep_results = False
+    graph.history_limit = 2
+
+    await graph.invoke()
+
+    assert graph.state.state == {"step": 4, "message": "Node 3 executed"}
+    assert graph.run_state.inbox_msgs == []
+    for node in graph.get_all_nodes():
+        assert node.result.status.name == "SUCCESS"
+        assert node.result.msg is None
+        assert node.internal_inbox_msg is None
+    assert [s.state["step"] for s in graph.history] == [3, 4]
+
+def build_skewed_fan_out(mode: str) -> Graph:
+    def init(state: Dict):
+        return {"started": True}
+
+    async def slow(state: Dict):
+        await asyncio.sleep(0.2)
+        return {"slow": "done"}
+
+    def make_fast(key):
+        async def fast(state: Dict):
+            await asyncio.sleep(0.05)
+            return {key: "done"}
+        return fast
+
+    graph = Graph(State({"started": False, "slow": "", "fast1": "", "fast2": "", "fast3": ""}))
+    graph.add_node("init", init)
+    graph.add_node("slow", slow)
+    for key in ("fast1", "fast2", "fast3"):
+        graph.add_node(key, make_fast(key))
+    graph.add_edge(START, "init")
+    graph.add_edge("init", "slow")
+    graph.add_edge("init", "fast1")
+    graph.add_edge("fast1", "fast2")
+    graph.add_edge("fast2", "fast3")
+    graph.add_edge("slow", END)
+    graph.add_edge("fast3", END)
+    graph.compile(mode=mode)
+    return graph
+
+@pytest.mark.asyncio
+async def test_dataflow_mode_does_not_wait_at_barriers():
+    graph = build_skewed_fan_out(DATAFLOW)
+
+    start = time.perf_counter()
+    await graph.invoke()
+    elapsed = time.perf_counter() - start
+
+    # BSP takes slow + fast2 + fast3 (~0.3s), dataflow only the slowest branch
+    assert elapsed < 0.27
+    assert graph.state.state == {"started": True, "slow": "done", "fast1": "done", "fast2": "done", "fast3": "done"}
+
+@pytest.mark.asyncio
+async def test_dataflow_mode_routing_and_step_budget():
+    def node_first(state: Dict):
+        return {"step": state["step"] + 1}
+
+    def router(state: Dict):
+        return "again" if state["step"] < 4 else "done"
+
+    def node_last(state: Dict):
+        return {"step": 5}
+
+    graph = Graph(State({"step": 0}))
+    graph.add_node("node_first", func=node_first)
+    graph.add_node("node_last", func=node_last)
+    graph.add_conditional_node("router", func=router)
+    graph.add_edge(START, "node_first")
+    graph.add_edge("node_first", "router")
+    graph.add_conditional_edges("router", {"again": "node_first", "done": "node_last"})
+    graph.add_edge("node_last", END)
+    graph.compile(mode=DATAFLOW)
+    await graph.invoke()
+    assert graph.state.state["step"] == 5
+
+    loop_graph = Graph(State({"step": 0}))
+    loop_graph.add_node("node_first", func=node_first)
+    loop_graph.add_edge(START, "node_first")
+    loop_graph.add_edge("node_first", "node_first")
+    loop_graph.compile(mode=DATAFLOW)
+    await loop_graph.invoke()
+    assert loop_graph.state.state["step"] == 100
+
+def build_same_key_fan_out(mode: str) -> Graph:
+    """START -> init -> {first, second} -> END, both siblings write "v", second finishes first"""
+    def init(state: Dict):
+        return {"started": True}
+
+    async def first(state: Dict):
+        await asyncio.sleep(0.05)
+        return {"v": 1}
+
+    async def second(state: Dict):
+        return {"v": 2}
+
+    graph = Graph(State({"started": False, "v": 0}))
+    graph.add_node("init", init)
+    graph.add_node("first", first)
+    graph.add_node("second", second)
+    graph.add_edge(START, "init")
+    graph.add_edge("init", "first")
+    graph.add_edge("init", "second")
+    graph.add_edge("first", END)
+    graph.add_edge("second", END)
+    graph.compile(mode=mode)
+    return graph
+
+@pytest.mark.asyncio
+async def test_sibling_writes_to_one_key_merge_the_same_in_both_modes():
+    final = {}
+    for mode in ("bsp", DATAFLOW):
+        graph = build_same_key_fan_out(mode)
+        await graph.invoke()
+        final[mode] = graph.state.state
+
+    # Dataflow accumulates in finish order, BSP in activation order
+    assert sorted(final["bsp"]["v"]) == sorted(final[DATAFLOW]["v"]) == [1, 2]
+    assert final["bsp"]["started"] is final[DATAFLOW]["started"] is True
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
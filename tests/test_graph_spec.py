@@ -0,0 +1,104 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import json
+import pytest
+from react_agent.graph import Graph
+from react_agent.graph_spec import load_graph, spec_hash
+from typing import Dict
+
+def double(state: Dict):
+    return {"value": state["value"] * 2}
+
+def route(state: Dict):
+    return "again" if state["value"] < 10 else "done"
+
+def finish(state: Dict):
+    return {"done": True}
+
+def left(state: Dict):
+    return {"left": True}
+
+def right(state: Dict):
+    return {"right": True}
+
+def vote(state: Dict):
+    return {"votes": 1}
+
+SPEC = {
+    "state": {"value": 1, "done": False},
+    "nodes": [
+        {"id": "double", "callable": "tests.test_graph_spec:double"},
+        {"id": "route", "callable": "tests.test_graph_spec:route", "kind": "conditional"},
+        {"id": "finish", "callable": "tests.test_graph_spec:finish"},
+    ],
+    "edges": [["START", "double"], ["double", "route"], ["finish", "END"]],
+    "conditional_edges": {"route": {"again": "double", "done": "finish"}},
+}
+
+@pytest.mark.asyncio
+async def test_load_graph_from_spec_file(tmp_path):
+    spec_path = tmp_path / "graph.json"
+    spec_path.write_text(json.dumps(SPEC))
+
+    graph = load_graph(str(spec_path))
+    await graph.invoke()
+
+    assert graph.state.state == {"value": 16, "done": True}
+
+@pytest.mark.asyncio
+async def test_warm_start_skips_validation(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "plans")
+    cold = load_graph(SPEC, cache_dir=cache_dir)
+    assert os.path.exists(os.path.join(cache_dir, f"{spec_hash(SPEC)}.json"))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("validation ran on a warm start")
+    monkeypatch.setattr(Graph, "has_state_dict", fail)
+    monkeypatch.setattr(Graph, "compile", fail)
+
+    warm = load_graph(SPEC, cache_dir=cache_dir)
+    assert warm.frozen
+    assert warm.adjacency_list == cold.adjacency_list
+
+    await warm.invoke()
+    assert warm.state.state == {"value": 16, "done": True}
+
+def test_invalid_spec_is_rejected_and_not_cached(tmp_path):
+    spec = dict(SPEC, edges=[["START", "double"], ["double", "missing"]])
+    with pytest.raises(ValueError):
+        load_graph(spec, cache_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+@pytest.mark.asyncio
+async def test_warm_start_keeps_quorum_joins(tmp_path):
+    spec = {
+        "state": {"left": False, "right": False, "votes": 0},
+        "nodes": [
+            {"id": "left", "callable": "tests.test_graph_spec:left"},
+            {"id": "right", "callable": "tests.test_graph_spec:right"},
+            {"id": "vote", "callable": "tests.test_graph_spec:vote", "join": 1},
+        ],
+        "edges": [["START", "left"], ["left", "right"], ["left", "vote"], ["right", "vote"], ["vote", "END"]],
+        "compile": {"fuse": False},
+    }
+    cache_dir = str(tmp_path / "plans")
+    load_graph(spec, cache_dir=cache_dir)
+    warm = load_graph(spec, cache_dir=cache_dir)
+
+    assert warm.join_in_degree == {"vote": 2}
+    await warm.invoke()
+    # One vote, merged as a list since right ran in the same superstep
+    assert warm.state.state["votes"] == [1]
+
+def test_warm_start_keeps_max_concurrency(tmp_path):
+    spec = dict(SPEC, compile={"max_concurrency": 2})
+    cache_dir = str(tmp_path / "plans")
+    cold = load_graph(spec, cache_dir=cache_dir)
+    warm = load_graph(spec, cache_dir=cache_dir)
+    assert cold.max_concurrency == warm.max_concurrency == 2
+
+def test_object_compile_options_are_rejected_in_specs(tmp_path):
+    spec = dict(SPEC, compile={"scheduling_policy": "critical_path"})
+    with pytest.raises(ValueError):
+        load_graph(spec, cache_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == []
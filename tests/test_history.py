@@ -0,0 +1,65 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import pytest
+from react_agent.history import HistoryManager
+
+def count_one(item):
+    return 1
+
+def turn(i: int):
+    return [
+        {"type": "function_call", "name": "search", "arguments": "{}", "call_id": f"call_{i}"},
+        {"type": "function_call_output", "call_id": f"call_{i}", "output": f"result {i}"},
+    ]
+
+@pytest.mark.asyncio
+async def test_compact_keeps_call_output_pairs_under_budget():
+    history = HistoryManager(max_tokens=5, token_counter=count_one)
+    messages = [{"role": "user", "content": "query"}]
+    for i in range(5):
+        messages += turn(i)
+
+    compacted = await history.compact(messages)
+
+    # The user query plus the two most recent call/output pairs
+    assert compacted == [messages[0]] + turn(3) + turn(4)
+    call_ids = [item["call_id"] for item in compacted if item.get("type") == "function_call"]
+    output_ids = [item["call_id"] for item in compacted if item.get("type") == "function_call_output"]
+    assert call_ids == output_ids
+
+@pytest.mark.asyncio
+async def test_compact_truncates_large_tool_outputs():
+    history = HistoryManager(max_tool_output_chars=10)
+    messages = [
+        {"role": "user", "content": "query"},
+        {"type": "function_call_output", "call_id": "call_1", "output": "x" * 100},
+    ]
+
+    compacted = await history.compact(messages)
+
+    assert compacted[1]["output"].startswith("x" * 10)
+    assert "truncated 90 chars" in compacted[1]["output"]
+    # The original message is left untouched
+    assert messages[1]["output"] == "x" * 100
+
+@pytest.mark.asyncio
+async def test_compact_summarizer_and_token_cache():
+    counted = []
+    def counter(item):
+        counted.append(item)
+        return 1
+
+    async def summarize(dropped):
+        return {"role": "assistant", "content": f"summary of {len(dropped)} items"}
+
+    history = HistoryManager(max_tokens=3, token_counter=counter, summarizer=summarize)
+    messages = [{"role": "user", "content": "query"}] + turn(0) + turn(1)
+
+    compacted = await history.compact(messages)
+    assert compacted == [messages[0], {"role": "assistant", "content": "summary of 2 items"}] + turn(1)
+
+    # Estimates are cached, only the new item is counted again
+    counted.clear()
+    messages.append({"role": "user", "content": "follow up"})
+    await history.compact(messages)
+    assert counted == [messages[-1]]
@@ -0,0 +1,85 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import threading
+import time
+import pytest
+from react_agent.graph import Graph, State, START, END, INLINE_MIN_SAMPLES
+
+def build_glue_graph(threads: dict, inline: dict = None, **compile_options) -> Graph:
+    """START -> split -> [tiny, blocking] -> END"""
+    inline = inline or {}
+
+    def split(state: dict):
+        threads.setdefault("split", []).append(threading.get_ident())
+        return {"split": True}
+
+    def tiny(state: dict):
+        threads.setdefault("tiny", []).append(threading.get_ident())
+        return {"tiny": True}
+
+    def blocking(state: dict):
+        threads.setdefault("blocking", []).append(threading.get_ident())
+        time.sleep(0.002)
+        return {"blocking": True}
+
+    graph = Graph(State({"split": False, "tiny": False, "blocking": False}))
+    graph.add_node("split", split, inline=inline.get("split"))
+    graph.add_node("tiny", tiny, inline=inline.get("tiny"))
+    graph.add_node("blocking", blocking, inline=inline.get("blocking"))
+    graph.add_edge(START, "split")
+    graph.add_edge("split", "tiny")
+    graph.add_edge("split", "blocking")
+    graph.add_edge("tiny", END)
+    graph.add_edge("blocking", END)
+    graph.compile(**compile_options)
+    return graph
+
+async def run_times(graph: Graph, n: int):
+    for _ in range(n):
+        await graph.new_run(State({})).invoke()
+
+@pytest.mark.asyncio
+async def test_cheap_nodes_move_inline_once_proven():
+    loop_thread = threading.get_ident()
+    threads = {}
+    graph = build_glue_graph(threads)
+
+    await run_times(graph, INLINE_MIN_SAMPLES + 2)
+
+    # The first runs are measured in the thread pool, later ones run on the loop
+    assert all(thread != loop_thread for thread in threads["tiny"][:INLINE_MIN_SAMPLES])
+    assert all(thread == loop_thread for thread in threads["tiny"][INLINE_MIN_SAMPLES:])
+    # Blocking nodes keep being offloaded
+    assert all(thread != loop_thread for thread in threads["blocking"])
+
+@pytest.mark.asyncio
+async def test_inline_can_be_forced_per_node():
+    loop_thread = threading.get_ident()
+    threads = {}
+    graph = build_glue_graph(threads, inline={"tiny": False, "blocking": True})
+
+    await run_times(graph, INLINE_MIN_SAMPLES + 2)
+
+    assert all(thread != loop_thread for thread in threads["tiny"])
+    assert all(thread == loop_thread for thread in threads["blocking"])
+
+@pytest.mark.asyncio
+async def test_threshold_none_disables_adaptive_inlining():
+    loop_thread = threading.get_ident()
+    threads = {}
+    graph = build_glue_graph(threads, inline_threshold=None)
+
+    await run_times(graph, INLINE_MIN_SAMPLES + 2)
+
+    assert all(thread != loop_thread for thread in threads["tiny"] + threads["split"])
+
+@pytest.mark.asyncio
+async def test_slow_inline_run_sends_the_node_back_to_the_pool():
+    threads = {}
+    graph = build_glue_graph(threads)
+    await run_times(graph, INLINE_MIN_SAMPLES)
+    assert graph.should_inline(graph.get_node_by_id("tiny"))
+
+    # One slow run lifts the estimate above the threshold
+    graph.latency_stats.update("tiny", 0.01)
+    assert not graph.should_inline(graph.get_node_by_id("tiny"))
@@ -0,0 +1,209 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import pytest
+from react_agent.graph import Graph, State, START, END, DATAFLOW
+from typing import Dict
+
+def build_uneven_diamond(join, mode: str = "bsp", calls: list = None) -> Graph:
+    """START -> a -> [b, c]; b -> d; c -> e -> d; d -> END"""
+    def a(state: Dict):
+        return {"a": 1}
+
+    def b(state: Dict):
+        return {"b": 1}
+
+    def c(state: Dict):
+        return {"c": 1}
+
+    def e(state: Dict):
+        return {"e": 1}
+
+    def d(state: Dict):
+        calls.append(dict(state))
+        return {"d": 1}
+
+    graph = Graph(State({"a": 0, "b": 0, "c": 0, "e": 0, "d": 0}))
+    graph.add_node("a", a)
+    graph.add_node("b", b)
+    graph.add_node("c", c)
+    graph.add_node("e", e)
+    graph.add_node("d", d, join=join)
+    graph.add_edge(START, "a")
+    graph.add_edge("a", "b")
+    graph.add_edge("a", "c")
+    graph.add_edge("b", "d")
+    graph.add_edge("c", "e")
+    graph.add_edge("e", "d")
+    graph.add_edge("d", END)
+    graph.compile(mode=mode)
+    return graph
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["bsp", DATAFLOW])
+async def test_join_waits_for_all_parents(mode):
+    calls = []
+    graph = build_uneven_diamond("all", mode, calls)
+
+    assert graph.join_required == {"d": 2}
+    await graph.invoke()
+
+    # d runs once, with the updates of both branches
+    assert len(calls) == 1
+    assert calls[0]["b"] != 0 and calls[0]["e"] == 1
+    assert graph.state.state["d"] == 1
+
+@pytest.mark.asyncio
+async def test_without_join_the_child_runs_per_parent():
+    calls = []
+    graph = build_uneven_diamond(None, calls=calls)
+    await graph.invoke()
+    assert len(calls) == 2
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["bsp", DATAFLOW])
+async def test_join_quorum(mode):
+    calls = []
+    graph = build_uneven_diamond(1, mode, calls)
+    await graph.invoke()
+    # d runs as soon as b arrives, e's later arrival belongs to the same wave
+    assert len(calls) == 1
+    assert calls[0]["e"] == 0
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["bsp", DATAFLOW])
+async def test_join_quorum_runs_once_per_wave(mode):
+    calls = []
+
+    def split(state: Dict):
+        return {"split": True}
+
+    def fast(state: Dict):
+        return {"fast": True}
+
+    def medium(state: Dict):
+        return {"medium": True}
+
+    def slow(state: Dict):
+        return {"slow": True}
+
+    def slower(state: Dict):
+        return {"slower": True}
+
+    def vote(state: Dict):
+        calls.append(len(calls) + 1)
+        return {"vote": True}
+
+    def again(state: Dict):
+        return "again" if len(calls) < 2 else "done"
+
+    graph = Graph(State({"split": False, "fast": False, "medium": False, "slow": False, "slower": False, "vote": False}))
+    graph.add_node("split", split)
+    graph.add_node("fast", fast)
+    graph.add_node("medium", medium)
+    graph.add_node("slow", slow)
+    graph.add_node("slower", slower)
+    graph.add_node("vote", vote, join=2)
+    graph.add_conditional_node("again", again)
+    graph.add_edge(START, "split")
+    for branch in ("fast", "medium", "slow"):
+        graph.add_edge("split", branch)
+    graph.add_edge("fast", "vote")
+    graph.add_edge("medium", "vote")
+    graph.add_edge("slow", "slower")
+    graph.add_edge("slower", "vote")
+    graph.add_edge("vote", "again")
+    graph.add_conditional_edges("again", {"again": "split", "done": END})
+    graph.compile(mode=mode)
+    graph.run_state.set_max_retries(20)
+    await graph.invoke()
+
+    # A 2-of-3 quorum: one vote per round, the late parent is absorbed
+    assert calls == [1, 2]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["bsp", DATAFLOW])
+async def test_join_quorum_in_a_loop_with_alternating_branches(mode):
+    joined = []
+
+    def start(state: Dict):
+        return {"started": True}
+
+    def pick(state: Dict):
+        return "p1" if len(joined) % 2 == 0 else "p2"
+
+    def p1(state: Dict):
+        return {"branch": "p1"}
+
+    def p2(state: Dict):
+        return {"branch": "p2"}
+
+    def j(state: Dict):
+        joined.append(state["branch"])
+        return {"joined": True}
+
+    def loop(state: Dict):
+        return "again" if len(joined) < 4 else "done"
+
+    graph = Graph(State({"started": False, "branch": "", "joined": False}))
+    graph.add_node("start", start)
+    graph.add_conditional_node("pick", pick)
+    graph.add_node("p1", p1)
+    graph.add_node("p2", p2)
+    graph.add_node("j", j, join=1)
+    graph.add_conditional_node("loop", loop)
+    graph.add_edge(START, "start")
+    graph.add_edge("start", "pick")
+    graph.add_conditional_edges("pick", {"p1": "p1", "p2": "p2"})
+    graph.add_edge("p1", "j")
+    graph.add_edge("p2", "j")
+    graph.add_edge("j", "loop")
+    graph.add_conditional_edges("loop", {"again": "start", "done": END})
+    graph.compile(mode=mode)
+    graph.run_state.set_max_retries(40)
+    await graph.invoke()
+
+    # The branch the router didn't pick never belongs to the wave, so every pass joins
+    assert joined == ["p1", "p2", "p1", "p2"]
+
+@pytest.mark.asyncio
+async def test_join_released_when_a_parent_is_never_activated():
+    calls = []
+
+    def a(state: Dict):
+        return {"value": 1}
+
+    def router(state: Dict):
+        return "left"
+
+    def left(state: Dict):
+        return {"value": 2}
+
+    def right(state: Dict):
+        return {"value": 3}
+
+    def merge(state: Dict):
+        calls.append(state["value"])
+        return {"value": state["value"] * 10}
+
+    graph = Graph(State({"value": 0}))
+    graph.add_node("a", a)
+    graph.add_node("left", left)
+    graph.add_node("right", right)
+    graph.add_node("merge", merge, join="all")
+    graph.add_conditional_node("router", router)
+    graph.add_edge(START, "a")
+    graph.add_edge("a", "router")
+    graph.add_conditional_edges("router", {"left": "left", "right": "right"})
+    graph.add_edge("left", "merge")
+    graph.add_edge("right", "merge")
+    graph.add_edge("merge", END)
+    graph.compile()
+    await graph.invoke()
+
+    assert calls == [2]
+    assert graph.state.state["value"] == 20
+
+def test_join_quorum_larger_than_in_degree():
+    calls = []
+    with pytest.raises(ValueError):
+        build_uneven_diamond(3, calls=calls)
@@ -0,0 +1,166 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import asyncio
+import threading
+import pytest
+from react_agent.graph import Graph, State, START, END
+from react_agent.graph_spec import load_graph
+from react_agent.node import NodeStatus, concat_updates
+from typing import Dict
+
+def build_map_graph(func, docs: list, chunk_size: int = 1, reducer=None, **compile_options) -> Graph:
+    """START -> embed (mapped over docs) -> END"""
+    graph = Graph(State({"docs": docs, "lengths": [], "total": 0}))
+    graph.add_map_node("embed", func, over="docs", chunk_size=chunk_size, reducer=reducer)
+    graph.add_edge(START, "embed")
+    graph.add_edge("embed", END)
+    graph.compile(**compile_options)
+    return graph
+
+def lengths(state: Dict):
+    return {"lengths": [len(doc) for doc in state["docs"]]}
+
+@pytest.mark.asyncio
+async def test_one_task_per_element_in_order():
+    docs = [f"doc-{i}" * (i + 1) for i in range(20)]
+    graph = build_map_graph(lengths, docs)
+    await graph.invoke()
+
+    assert graph.state.state["lengths"] == [len(doc) for doc in docs]
+    assert graph.get_node_by_id("embed").status == NodeStatus.SUCCESS
+
+@pytest.mark.asyncio
+async def test_chunks_get_a_slice_of_the_list():
+    chunks = []
+
+    def record(state: Dict):
+        chunks.append(list(state["docs"]))
+        return {"lengths": [len(doc) for doc in state["docs"]]}
+
+    graph = build_map_graph(record, ["a", "bb", "ccc", "dddd", "eeeee"], chunk_size=2)
+    await graph.invoke()
+
+    assert sorted(chunks) == [["a", "bb"], ["ccc", "dddd"], ["eeeee"]]
+    assert graph.state.state["lengths"] == [1, 2, 3, 4, 5]
+
+@pytest.mark.asyncio
+async def test_tasks_respect_max_concurrency():
+    running = 0
+    peak = 0
+
+    async def slow(state: Dict):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"lengths": [len(state["docs"][0])]}
+
+    graph = build_map_graph(slow, ["x"] * 12, max_concurrency=3)
+    await graph.invoke()
+
+    assert peak == 3
+    assert graph.state.state["lengths"] == [1] * 12
+
+@pytest.mark.asyncio
+async def test_map_nodes_share_the_graph_cap():
+    running = 0
+    peak = 0
+
+    async def work(state: Dict):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.005)
+        running -= 1
+        return {"lengths": [1]}
+
+    def start(state: Dict):
+        return {"total": 0}
+
+    async def plain(state: Dict):
+        return await work(state)
+
+    graph = Graph(State({"docs": ["x"] * 8, "lengths": [], "total": 0}))
+    graph.add_node("start", start)
+    graph.add_map_node("left", work, over="docs")
+    graph.add_map_node("right", work, over="docs")
+    graph.add_node("plain", plain)
+    graph.add_edge(START, "start")
+    for node_id in ("left", "right", "plain"):
+        graph.add_edge("start", node_id)
+        graph.add_edge(node_id, END)
+    graph.compile(max_concurrency=3)
+    await graph.invoke()
+
+    # Both map nodes and the plain node ran together, within one cap
+    assert peak == 3
+    assert graph.get_node_by_id("left").status == NodeStatus.SUCCESS
+    assert graph.get_node_by_id("right").status == NodeStatus.SUCCESS
+
+@pytest.mark.asyncio
+async def test_sync_tasks_run_in_the_thread_pool():
+    threads = set()
+
+    def record_thread(state: Dict):
+        threads.add(threading.get_ident())
+        return {"lengths": [0]}
+
+    graph = build_map_graph(record_thread, ["x"] * 4)
+    await graph.invoke()
+    assert threading.get_ident() not in threads
+
+@pytest.mark.asyncio
+async def test_custom_reducer():
+    def total(updates: list) -> Dict:
+        return {"total": sum(sum(update["lengths"]) for update in updates)}
+
+    graph = build_map_graph(lengths, ["ab", "cde", "f"], chunk_size=2, reducer=total)
+    await graph.invoke()
+    assert graph.state.state["total"] == 6
+    assert graph.state.state["lengths"] == []
+
+@pytest.mark.asyncio
+async def test_empty_list_runs_no_tasks():
+    graph = build_map_graph(lengths, [])
+    await graph.invoke()
+    assert graph.state.state["lengths"] == []
+    assert graph.get_node_by_id("embed").status == NodeStatus.SUCCESS
+
+@pytest.mark.asyncio
+async def test_failed_task_fails_the_node():
+    def fail_on_b(state: Dict):
+        if state["docs"] == ["b"]:
+            raise RuntimeError("bad doc")
+        return {"lengths": [1]}
+
+    graph = build_map_graph(fail_on_b, ["a", "b", "c"])
+    graph.run_state.set_max_retries(2)
+    await graph.invoke()
+
+    node = graph.get_node_by_id("embed")
+    assert node.status == NodeStatus.FAILED
+    assert "bad doc" in str(node.result.error)
+
+def test_add_map_node_validates_arguments():
+    graph = Graph(State({"docs": []}))
+    with pytest.raises(KeyError):
+        graph.add_map_node("embed", lengths, over="missing")
+    with pytest.raises(ValueError):
+        graph.add_map_node("embed", lengths, over="docs", chunk_size=0)
+
+def test_concat_updates_keeps_element_order():
+    assert concat_updates([{"a": [1, 2], "b": "x"}, {"a": [3], "b": "y"}]) == {"a": [1, 2, 3], "b": ["x", "y"]}
+
+@pytest.mark.asyncio
+async def test_map_node_from_spec(tmp_path):
+    spec = {
+        "state": {"docs": ["a", "bb", "ccc"], "lengths": [], "total": 0},
+        "nodes": [{"id": "embed", "callable": "tests.test_map:lengths", "kind": "map", "over": "docs", "chunk_size": 2}],
+        "edges": [["START", "embed"], ["embed", "END"]],
+    }
+    for _ in range(2):
+        # Cold start, then a warm start from the cached plan
+        graph = load_graph(spec, cache_dir=str(tmp_path))
+        await graph.invoke()
+        assert graph.state.state["lengths"] == [1, 2, 3]
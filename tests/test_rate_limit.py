@@ -0,0 +1,114 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import asyncio
+import json
+import pytest
+from react_agent import RateLimiter, ReActAgent, tool
+from react_agent.tool import execute_tool_calls
+from react_agent.tool_registry import ToolRegistry
+from tests.fake_provider import FakeAsyncClient, FakeClock, FakeMessage
+
+@pytest.mark.asyncio
+async def test_requests_queue_in_arrival_order():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=2, clock=clock, sleep=clock.sleep)
+    finished = []
+
+    async def request(i):
+        await limiter.acquire()
+        finished.append((i, clock()))
+
+    await asyncio.gather(*[request(i) for i in range(5)])
+
+    # Two requests fit the bucket, then one every 30 seconds
+    assert finished == [(0, 0.0), (1, 0.0), (2, 30.0), (3, 60.0), (4, 90.0)]
+    assert limiter.acquired == 5 and limiter.waited == 3
+    assert limiter.max_wait_seconds == 90.0
+    assert limiter.mean_wait_seconds == pytest.approx(180.0 / 5)
+
+@pytest.mark.asyncio
+async def test_token_budget_and_fairness():
+    clock = FakeClock()
+    limiter = RateLimiter(tokens_per_minute=600, clock=clock, sleep=clock.sleep)
+    await limiter.acquire(600)
+    finished = []
+
+    async def request(name, tokens):
+        await limiter.acquire(tokens)
+        finished.append((name, clock()))
+
+    # The large request arrived first, the small ones can't overtake it
+    await asyncio.gather(request("large", 300), request("small 1", 10), request("small 2", 10))
+    assert finished == [("large", 30.0), ("small 1", 31.0), ("small 2", 32.0)]
+
+@pytest.mark.asyncio
+async def test_usage_correction_delays_later_requests():
+    clock = FakeClock()
+    limiter = RateLimiter(tokens_per_minute=60, clock=clock, sleep=clock.sleep)
+    await limiter.acquire(10)
+    limiter.record_usage(estimated_tokens=10, actual_tokens=70)
+
+    # The bucket is 10 tokens in debt, 20 tokens are available after 30 seconds
+    assert await limiter.acquire(10) == 20.0
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_passes_its_turn_on():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=1, clock=clock, sleep=clock.sleep)
+    await limiter.acquire()
+
+    blocked = asyncio.ensure_future(limiter.acquire())
+    waiting = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    waiting.cancel()
+    queued = asyncio.ensure_future(limiter.acquire())
+
+    await asyncio.gather(blocked, queued)
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert limiter.acquired == 3
+
+@pytest.mark.asyncio
+async def test_agent_model_calls_share_the_limiter():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=1, clock=clock, sleep=clock.sleep)
+    client = FakeAsyncClient(lambda kwargs: [FakeMessage("hi")])
+    agent = ReActAgent(openai_api_key="test", client=client, rate_limiter=limiter)
+    agent.register_tools([])
+
+    answers = await asyncio.gather(*[agent.ainvoke(f"query {i}") for i in range(3)])
+
+    assert answers == ["hi"] * 3
+    assert limiter.acquired == 3
+    assert clock() == 120.0
+
+@pytest.mark.asyncio
+async def test_per_tool_rate_limit():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=1, clock=clock, sleep=clock.sleep)
+
+    @tool(rate_limiter=limiter)
+    def ping(host: str):
+        """
+        Pings a host
+
+        Args:
+            host: The host to ping
+        """
+        return f"pong from {host}"
+
+    calls = [
+        {"name": "ping", "arguments": json.dumps({"host": host}), "call_id": f"call_{host}"}
+        for host in ("a", "b")
+    ]
+    outputs = await execute_tool_calls(ToolRegistry([ping]), calls)
+
+    assert [json.loads(item["output"]) for item in outputs] == [
+        {"ping_result": "pong from a"},
+        {"ping_result": "pong from b"},
+    ]
+    assert limiter.waited == 1 and clock() == 60.0
+
+def test_tool_rejects_two_limits():
+    with pytest.raises(ValueError):
+        tool(requests_per_minute=10, rate_limiter=RateLimiter(requests_per_minute=10))
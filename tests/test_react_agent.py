@@ -0,0 +1,60 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import asyncio
+import json
+import pytest
+from react_agent import ReActAgent, tool
+from tests.fake_provider import FakeAsyncClient, FakeFunctionCall, call_tool_once
+
+@tool
+def add(a: int, b: int):
+    """
+    Adds two numbers
+
+    Args:
+        a: The first number
+        b: The second number
+    """
+    return a + b
+
+@pytest.mark.asyncio
+async def test_agent_calls_tool_and_answers():
+    client = FakeAsyncClient(call_tool_once("add", {"a": 1, "b": 2}, answer="3"))
+    agent = ReActAgent(openai_api_key="test", client=client)
+    agent.register_tools([add])
+
+    answer = await agent.ainvoke("What is 1 + 2?")
+
+    assert answer == "3"
+    assert len(client.responses.calls) == 2
+    tool_output = client.responses.calls[1]["input"][-1]
+    assert json.loads(tool_output["output"]) == {"add_result": 3}
+
+@pytest.mark.asyncio
+async def test_agent_reuses_compiled_graph_with_isolated_state():
+    client = FakeAsyncClient(call_tool_once("add", {"a": 2, "b": 2}), latency=0.01)
+    agent = ReActAgent(openai_api_key="test", client=client)
+    agent.register_tools([add])
+    graph = agent.graph
+
+    answers = await asyncio.gather(*[agent.ainvoke(f"query {i}") for i in range(5)])
+
+    assert answers == ["done"] * 5
+    assert agent.graph is graph
+    # Each run only saw its own query
+    first_inputs = [call["input"][0]["content"] for call in client.responses.calls]
+    assert sorted(set(first_inputs)) == [f"query {i}" for i in range(5)]
+    assert all(len(call["input"]) in (1, 3) for call in client.responses.calls)
+
+@pytest.mark.asyncio
+async def test_agent_step_budget():
+    # The model keeps asking for tools forever
+    client = FakeAsyncClient(lambda kwargs: [FakeFunctionCall("add", {"a": 1, "b": 1}, call_id="loop")])
+    agent = ReActAgent(openai_api_key="test", client=client, max_steps=5)
+    agent.register_tools([add])
+
+    updates = [update async for update in agent.astream("loop forever")]
+
+    assert len(updates) == 5
+    assert updates[0]["nodes"] == ["llm"]
+    assert updates[1]["nodes"] == ["tools"]
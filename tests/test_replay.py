@@ -0,0 +1,100 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import pytest
+from react_agent.graph import Graph, State, START, END, DATAFLOW
+from typing import Dict
+
+def build_pipeline(calls: Dict[str, int], mode: str = "bsp", record_outputs: bool = True) -> Graph:
+    """START -> fetch -> [summarize, count] -> END"""
+    def fetch(state: Dict):
+        calls["fetch"] += 1
+        return {"docs": [f"{state['query']} doc {i}" for i in range(3)]}
+
+    async def summarize(state: Dict):
+        calls["summarize"] += 1
+        return {"summary": f"{state['style']}: {', '.join(state['docs'])}"}
+
+    def count(state: Dict):
+        calls["count"] += 1
+        return {"count": len(state["docs"])}
+
+    graph = Graph(State({"query": "cats", "style": "long", "docs": [], "summary": "", "count": 0}), record_outputs=record_outputs)
+    graph.add_node("fetch", fetch)
+    graph.add_node("summarize", summarize)
+    graph.add_node("count", count)
+    graph.add_edge(START, "fetch")
+    graph.add_edge("fetch", "summarize")
+    graph.add_edge("fetch", "count")
+    graph.add_edge("summarize", END)
+    graph.add_edge("count", END)
+    graph.compile(mode=mode)
+    return graph
+
+async def first_run(calls: Dict[str, int], **options) -> Graph:
+    run = build_pipeline(calls, **options).new_run(State({}))
+    await run.invoke()
+    assert calls == {"fetch": 1, "summarize": 1, "count": 1}
+    return run
+
+@pytest.mark.asyncio
+async def test_replay_only_recomputes_nodes_whose_inputs_changed():
+    calls = {"fetch": 0, "summarize": 0, "count": 0}
+    run = await first_run(calls)
+
+    await run.invoke(replay_from=0, overrides={"style": "short"})
+
+    assert calls == {"fetch": 1, "summarize": 2, "count": 1}
+    assert run.run_state.recomputed == [(1, "summarize")]
+    assert sorted(run.run_state.reused) == [(0, "fetch"), (1, "count")]
+    # Parallel writes in one superstep are merged into lists
+    assert run.state.state["summary"] == ["short: cats doc 0, cats doc 1, cats doc 2"]
+    assert run.state.state["count"] == [3]
+    # History is rewound to the replayed step, then continues
+    assert len(run.history) == 3 and run.history[0].state["style"] == "short"
+
+@pytest.mark.asyncio
+async def test_changed_upstream_output_invalidates_downstream_nodes():
+    calls = {"fetch": 0, "summarize": 0, "count": 0}
+    run = await first_run(calls)
+
+    await run.invoke(replay_from=0, overrides={"query": "dogs"})
+
+    assert calls == {"fetch": 2, "summarize": 2, "count": 2}
+    assert run.run_state.reused == []
+    assert run.state.state["summary"] == ["long: dogs doc 0, dogs doc 1, dogs doc 2"]
+
+@pytest.mark.asyncio
+async def test_recompute_forces_nodes_to_run_again():
+    calls = {"fetch": 0, "summarize": 0, "count": 0}
+    run = await first_run(calls)
+
+    await run.invoke(replay_from=1, recompute=["count"])
+
+    assert calls == {"fetch": 1, "summarize": 1, "count": 2}
+    assert run.run_state.recomputed == [(1, "count")]
+    assert run.run_state.reused == [(1, "summarize")]
+
+@pytest.mark.asyncio
+async def test_replay_without_records_reruns_every_node():
+    calls = {"fetch": 0, "summarize": 0, "count": 0}
+    run = await first_run(calls, record_outputs=False)
+
+    await run.invoke(replay_from=0, overrides={"style": "short"})
+
+    assert calls == {"fetch": 2, "summarize": 2, "count": 2}
+    assert run.run_state.reused == []
+
+@pytest.mark.asyncio
+async def test_replay_rejects_bad_requests():
+    calls = {"fetch": 0, "summarize": 0, "count": 0}
+    run = await first_run(calls)
+
+    with pytest.raises(ValueError):
+        await run.invoke(replay_from=5)
+    with pytest.raises(KeyError):
+        await run.invoke(replay_from=0, overrides={"missing": 1})
+
+    dataflow_run = build_pipeline(calls, mode=DATAFLOW)
+    await dataflow_run.invoke()
+    with pytest.raises(ValueError):
+        await dataflow_run.invoke(replay_from=0)
@@ -0,0 +1,71 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import asyncio
+import time
+import pytest
+from react_agent.graph import Graph, State, START, END, DATAFLOW
+from react_agent.scheduler import CriticalPathPolicy, FifoPolicy, LatencyStats, LongestFirstPolicy
+from typing import Dict
+
+DELAYS = {"fast1": 0.05, "fast2": 0.05, "fast3": 0.05, "slow": 0.15}
+
+def build_fan_out(policy, mode: str = "bsp") -> Graph:
+    def init(state: Dict):
+        return {"init": True}
+
+    def make_node(key, delay):
+        async def node(state: Dict):
+            await asyncio.sleep(delay)
+            return {key: True}
+        return node
+
+    graph = Graph(State({"init": False, **{key: False for key in DELAYS}}))
+    graph.add_node("init", init)
+    for key, delay in DELAYS.items():
+        graph.add_node(key, make_node(key, delay))
+    graph.add_edge(START, "init")
+    for key in DELAYS:
+        graph.add_edge("init", key)
+        graph.add_edge(key, END)
+    graph.compile(mode=mode, max_concurrency=2, scheduling_policy=policy)
+
+    # Latency estimates as learned from earlier runs
+    for key, delay in DELAYS.items():
+        graph.latency_stats.update(key, delay)
+    return graph
+
+def test_latency_stats_ewma():
+    stats = LatencyStats(alpha=0.5)
+    stats.update("a", 1.0)
+    stats.update("a", 3.0)
+    stats.update("b", 4.0)
+    assert stats.get("a") == 2.0
+    # Unknown nodes get the mean estimate
+    assert stats.get("unknown") == 3.0
+
+def test_policies_order_slowest_first():
+    graph = build_fan_out(FifoPolicy())
+    ready = ["fast1", "fast2", "fast3", "slow"]
+
+    assert FifoPolicy().order(graph, ready) == ready
+    assert LongestFirstPolicy().order(graph, ready)[0] == "slow"
+    graph.latency_stats.update("init", 1.0)
+    assert CriticalPathPolicy().order(graph, ["slow", "init"]) == ["init", "slow"]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["bsp", DATAFLOW])
+async def test_capped_superstep_starts_slowest_node_first(mode):
+    fifo = build_fan_out(FifoPolicy(), mode)
+    start = time.perf_counter()
+    await fifo.invoke()
+    fifo_elapsed = time.perf_counter() - start
+
+    critical = build_fan_out(CriticalPathPolicy(), mode)
+    start = time.perf_counter()
+    await critical.invoke()
+    critical_elapsed = time.perf_counter() - start
+
+    # FIFO: fast1+fast2, then fast3+slow -> ~0.20s. Slowest first: slow || fast1..3 -> ~0.15s
+    assert all(critical.state.state[key] for key in DELAYS)
+    assert critical_elapsed < fifo_elapsed
+    assert critical_elapsed < 0.19
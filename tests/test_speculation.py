@@ -0,0 +1,243 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import asyncio
+import threading
+import time
+import pytest
+from react_agent.graph import Graph, State, START, END, DATAFLOW
+from react_agent.speculation import ALL, LIKELY, SpeculationStats, TrackedState
+from react_agent.tracing import TraceRecorder
+from typing import Dict
+
+DELAY = 0.2
+
+def build_routed_graph(
+    llm_update: Dict,
+    route: str,
+    mode: str = "bsp",
+    speculation: str | None = ALL,
+    calls: list = None,
+    graph_options: Dict | None = None,
+    **compile_options,
+) -> Graph:
+    """START -> llm -> router -> {"search": search, "answer": answer, "done": END}"""
+    async def llm(state: Dict):
+        await asyncio.sleep(DELAY)
+        return llm_update
+
+    def router(state: Dict):
+        return route
+
+    async def search(state: Dict):
+        calls.append(state["query"])
+        await asyncio.sleep(DELAY)
+        return {"results": f"results for {state['query']}"}
+
+    def answer(state: Dict):
+        return {"results": "answered"}
+
+    graph = Graph(State({"query": "weather", "draft": "", "results": ""}), **(graph_options or {}))
+    graph.add_node("llm", llm)
+    graph.add_conditional_node("router", router)
+    graph.add_node("search", search, speculative=True)
+    graph.add_node("answer", answer, speculative=True)
+    graph.add_edge(START, "llm")
+    graph.add_edge("llm", "router")
+    graph.add_conditional_edges("router", {"search": "search", "answer": "answer", "done": END})
+    graph.add_edge("search", END)
+    graph.add_edge("answer", END)
+    graph.compile(mode=mode, speculation=speculation, **compile_options)
+    return graph
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["bsp", DATAFLOW])
+async def test_confirmed_branch_overlaps_the_upstream_node(mode):
+    calls = []
+    graph = build_routed_graph({"draft": "look it up"}, "search", mode, calls=calls)
+
+    start = time.perf_counter()
+    await graph.invoke()
+    elapsed = time.perf_counter() - start
+
+    assert graph.state.state["results"] == "results for weather"
+    assert calls == ["weather"]
+    assert elapsed < 2 * DELAY
+    assert graph.speculation_stats.hits == 1
+    # answer was started too and dropped once the router picked search
+    assert graph.speculation_stats.misses == 1
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["bsp", DATAFLOW])
+async def test_branch_reading_a_changed_key_runs_again(mode):
+    calls = []
+    graph = build_routed_graph({"query": "weather in Paris"}, "search", mode, calls=calls)
+    await graph.invoke()
+
+    assert graph.state.state["results"] == "results for weather in Paris"
+    assert calls == ["weather", "weather in Paris"]
+    assert graph.speculation_stats.stale == 1
+    assert graph.speculation_stats.hits == 0
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["bsp", DATAFLOW])
+async def test_speculation_hits_are_recorded_and_traced(mode):
+    calls = []
+    recorder = TraceRecorder()
+    graph = build_routed_graph(
+        {"draft": "look it up"}, "search", mode, calls=calls,
+        graph_options={"record_outputs": True}, tracer=recorder,
+    )
+    await graph.invoke()
+
+    assert graph.speculation_stats.hits == 1
+    [(tracked, update)] = graph.records["search"]
+    assert tracked.reads == {"query"}
+    assert update == {"results": "results for weather"}
+
+    node_spans = [
+        event for event in recorder.to_chrome_trace()["traceEvents"]
+        if event["ph"] == "X" and event["cat"] == "node" and event["name"] == "search"
+    ]
+    assert len(node_spans) == 1 and node_spans[0]["args"]["speculative"] is True
+
+@pytest.mark.asyncio
+async def test_stale_rerun_uses_the_regular_dispatch():
+    threads = []
+
+    async def llm(state: Dict):
+        await asyncio.sleep(0.01)
+        return {"query": "changed"}
+
+    def router(state: Dict):
+        return "answer"
+
+    def answer(state: Dict):
+        threads.append(threading.get_ident())
+        return {"results": state["query"]}
+
+    graph = Graph(State({"query": "weather", "results": ""}))
+    graph.add_node("llm", llm)
+    graph.add_conditional_node("router", router)
+    graph.add_node("answer", answer, speculative=True, inline=True)
+    graph.add_edge(START, "llm")
+    graph.add_edge("llm", "router")
+    graph.add_conditional_edges("router", {"answer": "answer"})
+    graph.add_edge("answer", END)
+    graph.compile(speculation=ALL)
+    await graph.invoke()
+
+    assert graph.speculation_stats.stale == 1
+    assert graph.state.state["results"] == "changed"
+    # The rerun of the inline node ran on the loop thread, not in the pool
+    assert threads[-1] == threading.get_ident()
+
+def build_counted_graph(mode: str, peak: list, **compile_options) -> Graph:
+    """START -> llm -> router -> {"search": search, "answer": answer}, sync nodes of 0.1s counting how many run at once"""
+    lock = threading.Lock()
+    running = [0]
+
+    def counted(update: Dict):
+        def work(state: Dict):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.1)
+            with lock:
+                running[0] -= 1
+            return update
+        return work
+
+    def router(state: Dict):
+        return "search"
+
+    graph = Graph(State({"draft": "", "results": ""}))
+    graph.add_node("llm", counted({"draft": "done"}), inline=False)
+    graph.add_conditional_node("router", router)
+    graph.add_node("search", counted({"results": "searched"}), speculative=True, inline=False)
+    graph.add_node("answer", counted({"results": "answered"}), speculative=True, inline=False)
+    graph.add_edge(START, "llm")
+    graph.add_edge("llm", "router")
+    graph.add_conditional_edges("router", {"search": "search", "answer": "answer"})
+    graph.add_edge("search", END)
+    graph.add_edge("answer", END)
+    graph.compile(mode=mode, speculation=ALL, fuse=False, **compile_options)
+    return graph
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["bsp", DATAFLOW])
+async def test_speculation_stays_within_max_concurrency(mode):
+    peak = [0]
+    graph = build_counted_graph(mode, peak, max_concurrency=1)
+    await graph.invoke()
+
+    assert graph.state.state["results"] == "searched"
+    assert peak[0] == 1
+    # No slot was free while llm ran, so nothing was started speculatively
+    assert graph.speculation_stats.launched == 0
+
+    # Spare slots are still used
+    peak = [0]
+    graph = build_counted_graph(mode, peak, max_concurrency=3)
+    await graph.invoke()
+
+    assert graph.state.state["results"] == "searched"
+    assert peak[0] == 3
+    assert graph.speculation_stats.hits == 1
+
+@pytest.mark.asyncio
+async def test_unpicked_branches_are_dropped():
+    calls = []
+    graph = build_routed_graph({"draft": "done"}, "done", calls=calls)
+    await graph.invoke()
+
+    stats = graph.speculation_stats
+    assert graph.state.state["results"] == ""
+    assert stats.launched == 2 and stats.misses == 2
+    assert stats.hit_rate == 0.0
+    assert stats.wasted_seconds > 0
+
+@pytest.mark.asyncio
+async def test_likely_speculates_on_the_most_picked_target():
+    calls = []
+    graph = build_routed_graph({"draft": ""}, "search", speculation=LIKELY, calls=calls)
+    graph.speculation_stats.record_route("router", "search")
+
+    await graph.new_run(State({})).invoke()
+
+    assert graph.speculation_stats.launched == 1
+    assert graph.speculation_stats.hits == 1
+    assert graph.speculation_stats.misses == 0
+
+@pytest.mark.asyncio
+async def test_speculation_is_off_by_default():
+    calls = []
+    graph = build_routed_graph({"draft": ""}, "search", speculation=None, calls=calls)
+    await graph.invoke()
+
+    assert calls == ["weather"]
+    assert graph.speculation_stats.launched == 0
+
+def test_tracked_state_records_reads():
+    tracked = TrackedState({"a": 1, "b": 2})
+    assert tracked["a"] == 1
+    assert tracked.reads == {"a"}
+    assert tracked.is_still_valid({"a": 1, "b": 3})
+    assert not tracked.is_still_valid({"a": 2, "b": 2})
+
+    list(tracked.items())
+    assert not tracked.is_still_valid({"a": 1, "b": 3})
+
+def test_likely_targets_skips_non_speculative_favorites():
+    stats = SpeculationStats()
+    assert stats.likely_targets("router", ["x", END], ["x"]) == ["x"]
+
+    stats.record_route("router", END)
+    assert stats.likely_targets("router", ["x", END], ["x"]) == []
+
+def test_compile_rejects_unknown_speculation():
+    graph = Graph(State({"a": 0}))
+    graph.add_node("a", lambda state: {"a": 1})
+    graph.add_edge(START, "a")
+    graph.add_edge("a", END)
+    with pytest.raises(ValueError):
+        graph.compile(speculation="eager")
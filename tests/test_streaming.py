@@ -0,0 +1,83 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import asyncio
+import json
+import time
+import pytest
+from react_agent import tool
+from react_agent.tool_calling import OpenAIToolCall
+from tests.fake_provider import FakeAsyncClient, FakeFunctionCall, FakeMessage, FakeSyncClient
+
+started = []
+
+@tool
+async def lookup(key: str):
+    """
+    Looks up a key
+
+    Args:
+        key: The key to look up
+    """
+    started.append((key, time.perf_counter()))
+    await asyncio.sleep(0.05)
+    return key.upper()
+
+def call_then_explain(kwargs):
+    """First call: two function calls followed by a long text item. Second call: the answer"""
+    if any(isinstance(item, dict) and item.get("type") == "function_call_output" for item in kwargs["input"]):
+        return [FakeMessage("The values are A and B")]
+    return [
+        FakeFunctionCall("lookup", {"key": "a"}, call_id="call_1"),
+        FakeFunctionCall("lookup", {"key": "b"}, call_id="call_2"),
+        FakeMessage("Looking up both keys now"),
+    ]
+
+@pytest.mark.asyncio
+async def test_tools_start_before_the_model_finishes():
+    started.clear()
+    client = FakeAsyncClient(call_then_explain, item_latency=0.05)
+    tool_call = OpenAIToolCall(client=client)
+    input_list = [{"role": "user", "content": "look up a and b"}]
+
+    deltas = [delta async for delta in tool_call.stream_tools([lookup], input_list)]
+
+    completed_at = next(at for event_type, at in client.responses.events if event_type == "response.completed")
+    assert [key for key, _ in started] == ["a", "b"]
+    assert all(at < completed_at for _, at in started)
+
+    # Outputs follow the model's items in call order
+    outputs = [item for item in input_list if isinstance(item, dict) and item.get("type") == "function_call_output"]
+    assert [item["call_id"] for item in outputs] == ["call_1", "call_2"]
+    assert json.loads(outputs[0]["output"]) == {"lookup_result": "A"}
+
+    assert len(deltas) > 1
+    assert "".join(deltas) == "The values are A and B"
+    assert client.responses.calls[1]["input"] is input_list
+
+@pytest.mark.asyncio
+async def test_tools_start_before_a_sync_stream_finishes():
+    started.clear()
+    client = FakeSyncClient(call_then_explain, item_latency=0.05)
+    tool_call = OpenAIToolCall(client=client)
+    input_list = [{"role": "user", "content": "look up a and b"}]
+
+    deltas = [delta async for delta in tool_call.stream_tools([lookup], input_list)]
+
+    completed_at = next(at for event_type, at in client.responses.events if event_type == "response.completed")
+    assert [key for key, _ in started] == ["a", "b"]
+    assert all(at < completed_at for _, at in started)
+    assert "".join(deltas) == "The values are A and B"
+
+@pytest.mark.asyncio
+async def test_stream_without_completed_event_fails():
+    client = FakeAsyncClient(call_then_explain)
+
+    async def truncated(output):
+        if False:
+            yield None
+
+    client.responses.stream = truncated
+    tool_call = OpenAIToolCall(client=client)
+    with pytest.raises(RuntimeError):
+        async for _ in tool_call.stream_tools([lookup], [{"role": "user", "content": "hi"}]):
+            pass
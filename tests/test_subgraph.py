@@ -0,0 +1,154 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import pytest
+from react_agent.graph import Graph, State, START, END
+from react_agent.node import SubgraphNode
+from typing import Dict
+
+def build_subgraph(end_with_router: bool = False) -> Graph:
+    def double(state: Dict):
+        return {"value": state["value"] * 2}
+
+    def add_one(state: Dict):
+        return {"value": state["value"] + 1, "done": True}
+
+    def router(state: Dict):
+        return "finish"
+
+    subgraph = Graph(State({"value": 0, "done": False}))
+    subgraph.add_node("double", double)
+    subgraph.add_node("add_one", add_one)
+    subgraph.add_edge(START, "double")
+    subgraph.add_edge("double", "add_one")
+    if end_with_router:
+        subgraph.add_conditional_node("router", router)
+        subgraph.add_edge("add_one", "router")
+        subgraph.add_conditional_edges("router", {"finish": END})
+    else:
+        subgraph.add_edge("add_one", END)
+    subgraph.compile()
+    return subgraph
+
+def build_parent(subgraph: Graph) -> Graph:
+    def prepare(state: Dict):
+        return {"number": 5}
+
+    def report(state: Dict):
+        return {"report": f"result={state['result']}"}
+
+    graph = Graph(State({"number": 0, "result": 0, "report": ""}))
+    graph.add_node("prepare", prepare)
+    graph.add_node("math", subgraph, input_map={"value": "number"}, output_map={"value": "result"})
+    graph.add_node("report", report)
+    graph.add_edge(START, "prepare")
+    graph.add_edge("prepare", "math")
+    graph.add_edge("math", "report")
+    graph.add_edge("report", END)
+    graph.compile()
+    return graph
+
+@pytest.mark.asyncio
+async def test_subgraph_is_inlined_at_compile():
+    graph = build_parent(build_subgraph())
+
+    assert "math" not in graph.node_registry
+    assert graph.adjacency_list["prepare"] == ["math/double"]
+    assert graph.adjacency_list["math/add_one"] == ["report"]
+
+    await graph.invoke()
+
+    assert graph.state.state["result"] == 11
+    assert graph.state.state["report"] == "result=11"
+    # Subgraph-private keys are namespaced in the parent state
+    assert graph.state.state["math.done"] is True
+    # Inlined nodes run in the parent's supersteps: prepare, double, add_one, report
+    assert graph.run_state.step_count == 3
+
+@pytest.mark.asyncio
+async def test_subgraph_falls_back_to_a_single_node():
+    graph = build_parent(build_subgraph(end_with_router=True))
+
+    assert isinstance(graph.node_registry["math"], SubgraphNode)
+
+    await graph.invoke()
+
+    assert graph.state.state["report"] == "result=11"
+
+def test_subgraph_must_be_compiled():
+    subgraph = Graph(State({"value": 0}))
+    graph = Graph(State({"number": 0}))
+    with pytest.raises(RuntimeError):
+        graph.add_node("math", subgraph)
+
+def build_cyclic_subgraph() -> Graph:
+    """START -> inc -> router -> {"again": inc, "done": finish} -> END"""
+    def inc(state: Dict):
+        return {"value": state["value"] + 1}
+
+    def router(state: Dict):
+        return "again" if state["value"] < 3 else "done"
+
+    def finish(state: Dict):
+        return {"done": True}
+
+    subgraph = Graph(State({"value": 0, "done": False}))
+    subgraph.add_node("inc", inc)
+    subgraph.add_conditional_node("router", router)
+    subgraph.add_node("finish", finish)
+    subgraph.add_edge(START, "inc")
+    subgraph.add_edge("inc", "router")
+    subgraph.add_conditional_edges("router", {"again": "inc", "done": "finish"})
+    subgraph.add_edge("finish", END)
+    subgraph.compile()
+    return subgraph
+
+@pytest.mark.asyncio
+async def test_subgraph_looping_back_to_its_entry_runs_nested():
+    standalone = build_cyclic_subgraph()
+    await standalone.invoke()
+    assert standalone.state.state["value"] == 3
+
+    def prepare(state: Dict):
+        return {"number": 0}
+
+    graph = Graph(State({"number": 0, "result": 0}))
+    graph.add_node("prepare", prepare)
+    graph.add_node("count", build_cyclic_subgraph(), input_map={"value": "number"}, output_map={"value": "result"})
+    graph.add_edge(START, "prepare")
+    graph.add_edge("prepare", "count")
+    graph.add_edge("count", END)
+    graph.compile()
+
+    assert isinstance(graph.node_registry["count"], SubgraphNode)
+
+    await graph.invoke()
+
+    assert graph.state.state["result"] == 3
+
+@pytest.mark.asyncio
+async def test_subgraph_with_a_map_node_runs_nested():
+    def prep(state: Dict):
+        return {"docs": [doc.upper() for doc in state["docs"]]}
+
+    def lengths(state: Dict):
+        return {"lengths": [len(doc) for doc in state["docs"]]}
+
+    subgraph = Graph(State({"docs": [], "lengths": []}))
+    subgraph.add_node("prep", prep)
+    subgraph.add_map_node("measure", lengths, over="docs")
+    subgraph.add_edge(START, "prep")
+    subgraph.add_edge("prep", "measure")
+    subgraph.add_edge("measure", END)
+    subgraph.compile()
+
+    graph = Graph(State({"texts": ["a", "bb", "ccc"], "sizes": []}))
+    graph.add_node("s", subgraph, input_map={"docs": "texts"}, output_map={"lengths": "sizes"})
+    graph.add_edge(START, "s")
+    graph.add_edge("s", END)
+    graph.compile()
+
+    assert isinstance(graph.node_registry["s"], SubgraphNode)
+
+    await graph.invoke()
+
+    assert graph.state.state["sizes"] == [1, 2, 3]
@@ -0,0 +1,76 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import pytest
+from react_agent import ReActAgent
+from react_agent.tool import Tool
+from react_agent.tool_index import ToolIndex, tokenize
+from react_agent.tool_registry import ToolRegistry
+from tests.fake_provider import FakeAsyncClient, FakeMessage
+
+def make_tool(name: str, summary: str, arg_description: str = "The value to use") -> Tool:
+    def func(value: str):
+        return value
+    doc = f"""
+    {summary}
+
+    Args:
+        value: {arg_description}
+    """
+    return Tool(func=func, name=name, description=doc)
+
+CATALOG = [
+    make_tool("get_weather", "Returns the weather forecast for a city", "The city name"),
+    make_tool("convert_currency", "Converts an amount between currencies", "The currency code, e.g. USD"),
+    make_tool("send_email", "Sends an email to a recipient", "The recipient address"),
+]
+
+def test_tokenize_splits_names():
+    assert tokenize("getWeather_forCity") == ["get", "weather", "city"]
+
+def test_search_ranks_by_name_description_and_args():
+    index = ToolIndex()
+    for tool in CATALOG:
+        index.add(tool)
+
+    assert index.search("what's the weather in Paris?", k=1) == ["get_weather"]
+    assert index.search("how much is 10 USD in EUR", k=1) == ["convert_currency"]
+
+def test_search_falls_back_to_unranked_tools():
+    index = ToolIndex()
+    for tool in CATALOG:
+        index.add(tool)
+
+    # Fewer than k matches, or none, are padded to k in catalog order
+    assert index.search("nothing relevant here", k=1) == ["get_weather"]
+    assert index.search("nothing relevant here", k=2) == ["get_weather", "convert_currency"]
+    assert index.search("send it", k=2) == ["send_email", "get_weather"]
+
+def test_registry_indexes_tools_incrementally():
+    registry = ToolRegistry(CATALOG[:1], index=ToolIndex())
+    registry.register(CATALOG[2])
+
+    assert [tool.name for tool in registry.select("email my boss", k=1)] == ["send_email"]
+    # Selecting tools doesn't build schemas for the rest of the catalog
+    assert registry.get("get_weather")._args_schema is None
+
+@pytest.mark.asyncio
+async def test_agent_sends_only_top_k_tools():
+    client = FakeAsyncClient(lambda kwargs: [FakeMessage("sunny")])
+    agent = ReActAgent(openai_api_key="test", client=client, top_k=1)
+    agent.register_tools(CATALOG)
+
+    await agent.ainvoke("What is the weather forecast in Paris?")
+
+    sent_tools = client.responses.calls[0]["tools"]
+    assert [schema["name"] for schema in sent_tools] == ["get_weather"]
+
+@pytest.mark.asyncio
+async def test_agent_sends_k_tools_when_none_match():
+    client = FakeAsyncClient(lambda kwargs: [FakeMessage("3")])
+    agent = ReActAgent(openai_api_key="test", client=client, top_k=1)
+    agent.register_tools(CATALOG)
+
+    await agent.ainvoke("What is 1 + 2?")
+
+    sent_tools = client.responses.calls[0]["tools"]
+    assert [schema["name"] for schema in sent_tools] == [CATALOG[0].name]
@@ -0,0 +1,180 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import asyncio
+import json
+import threading
+import pytest
+from react_agent.resources import ResourcePool
+from react_agent.tool import Resource, Tool, tool, execute_tool_calls
+from react_agent.tool_registry import ToolRegistry
+
+class FakeClient:
+    """Stands in for a DB connection, only one call may use it at a time"""
+    def __init__(self, opened: list):
+        self.lock = threading.Lock()
+        self.closed = False
+        opened.append(self)
+
+    def query(self, sql: str) -> str:
+        if not self.lock.acquire(blocking=False):
+            raise RuntimeError("client used by two calls at once")
+        try:
+            return f"rows for {sql}"
+        finally:
+            self.lock.release()
+
+    async def aquery(self, sql: str) -> str:
+        if not self.lock.acquire(blocking=False):
+            raise RuntimeError("client used by two calls at once")
+        try:
+            await asyncio.sleep(0.01)
+            return f"rows for {sql}"
+        finally:
+            self.lock.release()
+
+def build_db_tool(opened: list, startups: list, size: int = 2, is_async: bool = True) -> Tool:
+    async def on_startup():
+        startups.append(1)
+        await asyncio.sleep(0.01)
+        return {"pool": ResourcePool(lambda: FakeClient(opened), size=size, close=lambda client: setattr(client, "closed", True))}
+
+    def on_shutdown(resources: dict):
+        resources["pool"].close()
+
+    if is_async:
+        async def query_db(sql: str, pool: Resource):
+            """
+            Runs a query
+
+            Args:
+                sql: The query
+            """
+            async with pool.acquire() as client:
+                return await client.aquery(sql)
+    else:
+        def query_db(sql: str, pool: Resource):
+            """
+            Runs a query
+
+            Args:
+                sql: The query
+            """
+            with pool.acquire_sync() as client:
+                return client.query(sql)
+
+    return tool(query_db, on_startup=on_startup, on_shutdown=on_shutdown)
+
+def calls(n: int) -> list:
+    return [{"name": "query_db", "arguments": json.dumps({"sql": f"q{i}"}), "call_id": f"c{i}"} for i in range(n)]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("is_async", [True, False])
+async def test_concurrent_calls_share_a_pool_started_once(is_async):
+    opened, startups = [], []
+    db = build_db_tool(opened, startups, size=2, is_async=is_async)
+    registry = ToolRegistry([db])
+
+    outputs = await execute_tool_calls(registry, calls(8))
+
+    assert [json.loads(output["output"]) for output in outputs] == [
+        {"query_db_result": f"rows for q{i}"} for i in range(8)
+    ]
+    assert len(startups) == 1
+    assert 1 <= len(opened) <= 2
+
+    await registry.shutdown()
+    assert all(client.closed for client in opened)
+    assert db.resources is None
+
+@pytest.mark.asyncio
+async def test_each_call_gets_its_own_result():
+    async def echo(value: str):
+        """
+        Echoes
+
+        Args:
+            value: The value
+        """
+        await asyncio.sleep(0.01)
+        if value == "bad":
+            raise ValueError("bad value")
+        return value
+
+    echo_tool = Tool(echo)
+    results = await asyncio.gather(*[echo_tool.run(value=v) for v in ["a", "bad", "c"]])
+
+    assert [result.content for result in results] == ["a", None, "c"]
+    assert isinstance(results[1].error, ValueError)
+    assert not hasattr(echo_tool, "result")
+
+def test_resource_params_are_left_out_of_the_schema():
+    db = build_db_tool([], [])
+    schema = db.args_schema["parameters"]
+    assert list(schema["properties"]) == ["sql"]
+    assert schema["required"] == ["sql"]
+
+@pytest.mark.asyncio
+async def test_registry_context_starts_and_shuts_down_tools():
+    opened, startups = [], []
+    db = build_db_tool(opened, startups)
+    async with ToolRegistry([db]) as registry:
+        assert len(startups) == 1
+        assert "pool" in db.resources
+        await execute_tool_calls(registry, calls(2))
+    assert db.resources is None
+
+@pytest.mark.asyncio
+async def test_missing_resource_is_reported_as_a_call_error():
+    def needs_pool(sql: str, pool: Resource):
+        """
+        Runs a query
+
+        Args:
+            sql: The query
+        """
+        return sql
+
+    registry = ToolRegistry([needs_pool])
+    [output] = await execute_tool_calls(registry, [{"name": "needs_pool", "arguments": {"sql": "x"}, "call_id": "c"}])
+    assert "needs resources" in json.loads(output["output"])["needs_pool_error"]
+
+def test_pool_never_creates_more_than_size():
+    created = []
+    pool = ResourcePool(lambda: created.append(1) or object(), size=2)
+    with pool.acquire_sync() as first, pool.acquire_sync() as second:
+        assert first is not second
+    with pool.acquire_sync() as again:
+        assert again in (first, second)
+    assert len(created) == 2
+
+    pool.close()
+    with pytest.raises(RuntimeError):
+        with pool.acquire_sync():
+            pass
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_keep_a_resource():
+    pool = ResourcePool(object, size=1)
+    async with pool.acquire() as first:
+        waiter = asyncio.ensure_future(asyncio.wait_for(pool.acquire().__aenter__(), timeout=0.01))
+        with pytest.raises(asyncio.TimeoutError):
+            await waiter
+
+    assert len(pool._idle) == 1
+    async with pool.acquire() as again:
+        assert again is first
+    assert pool.created == 1
+
+@pytest.mark.asyncio
+async def test_waiters_get_released_resources_in_order():
+    pool = ResourcePool(object, size=1)
+    order = []
+
+    async def use(name: str):
+        async with pool.acquire():
+            order.append(name)
+            await asyncio.sleep(0.005)
+
+    await asyncio.gather(*[use(name) for name in "abcd"])
+    assert order == ["a", "b", "c", "d"]
+    assert pool.created == 1
@@ -0,0 +1,75 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import asyncio
+import json
+import threading
+import time
+import pytest
+from react_agent.graph import Graph, State, START, END
+from react_agent.tool import tool
+
+loop_threads = []
+
+@tool
+async def slow_lookup(key: str):
+    """
+    Looks up a key slowly
+
+    Args:
+        key: The key to look up
+    """
+    loop_threads.append(threading.get_ident())
+    await asyncio.sleep(0.1)
+    return key.upper()
+
+@tool(timeout=0.05)
+async def hangs(key: str):
+    """
+    Never finishes in time
+
+    Args:
+        key: Ignored
+    """
+    await asyncio.sleep(10)
+
+def request(name: str, call_id: str, **arguments):
+    return {"name": name, "arguments": json.dumps(arguments), "call_id": call_id}
+
+def build_graph(tool_calls: list) -> Graph:
+    graph = Graph(State({"tool_calls": tool_calls, "messages": []}))
+    graph.add_tool_node("tools", [slow_lookup, hangs])
+    graph.add_edge(START, "tools")
+    graph.add_edge("tools", END)
+    graph.compile()
+    return graph
+
+@pytest.mark.asyncio
+async def test_tool_node_runs_calls_concurrently_on_the_loop():
+    loop_threads.clear()
+    graph = build_graph([request("slow_lookup", "1", key="a"), request("slow_lookup", "2", key="b")])
+
+    start = time.perf_counter()
+    await graph.invoke()
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.19
+    assert loop_threads == [threading.get_ident()] * 2
+    messages = graph.state.state["messages"]
+    assert [message["call_id"] for message in messages] == ["1", "2"]
+    assert json.loads(messages[1]["output"]) == {"slow_lookup_result": "B"}
+    assert graph.state.state["tool_calls"] == []
+
+@pytest.mark.asyncio
+async def test_tool_node_applies_tool_timeout():
+    graph = build_graph([request("hangs", "1", key="a"), request("missing", "2")])
+
+    await graph.invoke()
+
+    outputs = [json.loads(message["output"]) for message in graph.state.state["messages"]]
+    assert "timed out" in outputs[0]["hangs_error"]
+    assert "not registered" in outputs[1]["missing_error"]
+
+def test_add_tool_node_requires_state_keys():
+    graph = Graph(State({"messages": []}))
+    with pytest.raises(KeyError):
+        graph.add_tool_node("tools", [slow_lookup])
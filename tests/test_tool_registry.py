@@ -0,0 +1,55 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import pytest
+from react_agent.tool import Tool, tool
+from react_agent.tool_registry import ToolRegistry
+
+def make_tool(name: str) -> Tool:
+    def func(query: str, limit: int = 5):
+        return query
+    func.__name__ = name
+    func.__doc__ = f"""
+    Looks up {name}
+
+    Args:
+        query: The search query
+        limit: Max number of results
+    """
+    return Tool(func=func, name=name, description=func.__doc__)
+
+def test_register_many_and_lookup_by_name():
+    registry = ToolRegistry()
+    registry.register_many([make_tool(f"tool_{i}") for i in range(1000)])
+
+    assert len(registry) == 1000
+    assert registry.get("tool_500").name == "tool_500"
+    assert registry.get("missing") is None
+    assert "tool_999" in registry
+    with pytest.raises(KeyError):
+        registry["missing"]
+
+def test_register_many_rejects_duplicates_without_partial_registration():
+    registry = ToolRegistry([make_tool("a")])
+    with pytest.raises(ValueError):
+        registry.register_many([make_tool("b"), make_tool("a")])
+    assert registry.names() == ["a"]
+
+def test_schema_is_built_lazily_once():
+    registry = ToolRegistry([make_tool("search")])
+    search = registry.get("search")
+    assert search._args_schema is None
+
+    schema = registry.schemas(["search"])[0]
+    assert schema["parameters"]["properties"]["query"]["description"] == "The search query"
+    assert schema["parameters"]["properties"]["limit"]["default"] == 5
+    assert schema["parameters"]["required"] == ["query"]
+    assert search.args_schema is schema
+
+def test_missing_args_section_raises_on_first_schema_use():
+    @tool
+    def no_args_doc(x: int):
+        """Has no args section"""
+        return x
+
+    with pytest.raises(ValueError):
+        no_args_doc.args_schema
@@ -0,0 +1,176 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import asyncio
+import json
+import time
+import pytest
+from react_agent import tool
+from react_agent.graph import Graph, State, START, END
+from react_agent.tool_calling import OpenAIToolCall
+from react_agent.tracing import TraceRecorder
+from tests.fake_provider import FakeAsyncClient, FakeFunctionCall, FakeMessage
+from typing import Dict
+
+@tool
+async def lookup(key: str):
+    """
+    Looks up a key
+
+    Args:
+        key: The key to look up
+    """
+    await asyncio.sleep(0.01)
+    return key.upper()
+
+def build_graph(**compile_options) -> Graph:
+    """START -> split -> [slow (sync), fast (async)] -> pick -> {"again": split, "done": END}"""
+    def split(state: Dict):
+        return {"rounds": state["rounds"] + 1}
+
+    def slow(state: Dict):
+        time.sleep(0.02)
+        return {"slow": True}
+
+    async def fast(state: Dict):
+        await asyncio.sleep(0.001)
+        return {"fast": True}
+
+    def pick(state: Dict):
+        return "done"
+
+    graph = Graph(State({"rounds": 0, "slow": False, "fast": False}))
+    graph.add_node("split", split)
+    graph.add_node("slow", slow, inline=False)
+    graph.add_node("fast", fast)
+    graph.add_conditional_node("pick", pick)
+    graph.add_edge(START, "split")
+    graph.add_edge("split", "slow")
+    graph.add_edge("split", "fast")
+    graph.add_edge("slow", "pick")
+    graph.add_edge("fast", "pick")
+    graph.add_conditional_edges("pick", {"again": "split", "done": END})
+    graph.compile(**compile_options)
+    return graph
+
+def spans(trace: dict, cat: str) -> list:
+    return [event for event in trace["traceEvents"] if event["ph"] == "X" and event["cat"] == cat]
+
+@pytest.mark.asyncio
+async def test_run_trace_has_supersteps_nodes_routers_and_merges(tmp_path):
+    recorder = TraceRecorder()
+    graph = build_graph(tracer=recorder)
+    await graph.invoke()
+
+    path = tmp_path / "trace.json"
+    recorder.write(str(path))
+    trace = json.loads(path.read_text())
+
+    assert len(spans(trace, "superstep")) == graph.run_state.step_count + 1
+    nodes = {event["name"]: event for event in spans(trace, "node")}
+    assert set(nodes) == {"split", "slow", "fast"}
+    assert nodes["slow"]["dur"] >= 20_000
+    # pick is evaluated once for every parent that activates it
+    routers = spans(trace, "router")
+    assert len(routers) == 2
+    assert all(router["args"]["route"] == "done" for router in routers)
+    assert len(spans(trace, "merge")) == graph.run_state.step_count + 1
+
+    # The sync node ran in a pool thread, the async one in its own task
+    track_names = {
+        event["tid"]: event["args"]["name"] for event in trace["traceEvents"] if event["name"] == "thread_name"
+    }
+    assert track_names[nodes["slow"]["tid"]].startswith("thread ")
+    assert track_names[nodes["fast"]["tid"]].startswith("task ")
+    assert nodes["slow"]["tid"] != nodes["fast"]["tid"]
+
+@pytest.mark.asyncio
+async def test_tracing_is_off_by_default():
+    graph = build_graph()
+    await graph.invoke()
+    assert graph.trace is None
+
+@pytest.mark.asyncio
+async def test_only_sampled_runs_are_recorded():
+    recorder = TraceRecorder(sample_rate=0.5, seed=7)
+    graph = build_graph(tracer=recorder)
+    for _ in range(20):
+        await graph.new_run(State({})).invoke()
+
+    assert 0 < len(recorder.runs) < 20
+    assert len(recorder.runs) + recorder.skipped == 20
+    # Every run is its own process track
+    pids = {event["pid"] for event in recorder.to_chrome_trace()["traceEvents"]}
+    assert len(pids) == len(recorder.runs)
+
+    none = TraceRecorder(sample_rate=0.0)
+    graph = build_graph(tracer=none)
+    await graph.invoke()
+    assert none.runs == []
+
+@pytest.mark.asyncio
+async def test_tool_node_calls_are_traced():
+    recorder = TraceRecorder()
+    graph = Graph(State({
+        "tool_calls": [
+            {"name": "lookup", "arguments": {"key": "a"}, "call_id": "c1"},
+            {"name": "lookup", "arguments": {"key": "b"}, "call_id": "c2"},
+        ],
+        "messages": [],
+    }))
+    graph.add_tool_node("tools", [lookup])
+    graph.add_edge(START, "tools")
+    graph.add_edge("tools", END)
+    graph.compile(tracer=recorder)
+    await graph.invoke()
+
+    tools = spans(recorder.to_chrome_trace(), "tool")
+    assert sorted(event["args"]["call_id"] for event in tools) == ["c1", "c2"]
+    assert all(event["args"]["ok"] for event in tools)
+
+def call_then_answer(kwargs):
+    if any(isinstance(item, dict) and item.get("type") == "function_call_output" for item in kwargs["input"]):
+        return [FakeMessage("A")]
+    return [FakeFunctionCall("lookup", {"key": "a"}, call_id="call_1")]
+
+@pytest.mark.asyncio
+async def test_model_and_tool_calls_are_traced():
+    recorder = TraceRecorder()
+    # Inside a traced run the tracer doesn't start a second trace
+    tool_call = OpenAIToolCall(client=FakeAsyncClient(call_then_answer, latency=0.01), tracer=recorder)
+
+    async def agent(state: Dict):
+        async for _ in tool_call.stream_tools([lookup], [{"role": "user", "content": "look up a"}]):
+            pass
+        return {"done": True}
+
+    graph = Graph(State({"done": False}))
+    graph.add_node("agent", agent)
+    graph.add_edge(START, "agent")
+    graph.add_edge("agent", END)
+    graph.compile(tracer=recorder)
+    await graph.invoke()
+
+    trace = recorder.to_chrome_trace()
+    assert len(recorder.runs) == 1
+    assert len(spans(trace, "model")) == 2
+    assert [event["name"] for event in spans(trace, "tool")] == ["lookup"]
+    [node] = spans(trace, "node")
+    for event in spans(trace, "model"):
+        assert node["ts"] <= event["ts"] <= node["ts"] + node["dur"]
+
+@pytest.mark.asyncio
+async def test_tool_calls_outside_a_graph_are_traced_with_a_tracer():
+    recorder = TraceRecorder()
+    tool_call = OpenAIToolCall(client=FakeAsyncClient(call_then_answer), tracer=recorder)
+
+    async for _ in tool_call.stream_tools([lookup], [{"role": "user", "content": "look up a"}]):
+        pass
+
+    trace = recorder.to_chrome_trace()
+    assert len(recorder.runs) == 1
+    assert len(spans(trace, "model")) == 2
+    assert [event["name"] for event in spans(trace, "tool")] == ["lookup"]
+
+def test_sample_rate_is_validated():
+    with pytest.raises(ValueError):
+        TraceRecorder(sample_rate=1.5)
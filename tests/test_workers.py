@@ -0,0 +1,134 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import pytest
+from react_agent.graph import Graph, State, START, END
+from react_agent.node import NodeStatus
+from react_agent.workers import ProcessBackend
+from tests import worker_nodes
+
+@pytest.fixture
+def backend():
+    with ProcessBackend(workers=2, heartbeat_interval=0.1, heartbeat_timeout=1.0) as backend:
+        yield backend
+
+def build_fan_out_graph(**compile_options) -> Graph:
+    """START -> split -> [a, b] -> END"""
+    graph = Graph(State({"split": 0, "a": 0, "b": 0}))
+    graph.add_node("split", worker_nodes.pid_node("split"))
+    graph.add_node("a", worker_nodes.pid_node("a"))
+    graph.add_node("b", worker_nodes.pid_node("b"))
+    graph.add_edge(START, "split")
+    graph.add_edge("split", "a")
+    graph.add_edge("split", "b")
+    graph.add_edge("a", END)
+    graph.add_edge("b", END)
+    graph.compile(inline_threshold=None, **compile_options)
+    return graph
+
+def build_single_node_graph(func, state: dict, **compile_options) -> Graph:
+    graph = Graph(State(state))
+    graph.add_node("node", func)
+    graph.add_edge(START, "node")
+    graph.add_edge("node", END)
+    graph.compile(inline_threshold=None, **compile_options)
+    return graph
+
+@pytest.mark.asyncio
+async def test_nodes_run_in_worker_processes(backend):
+    graph = build_fan_out_graph(executor=backend)
+    await graph.invoke()
+
+    # a and b write in the same superstep, so their values are merged into lists
+    state = graph.state.state
+    worker_pids = {worker.process.pid for worker in backend.workers.values()}
+    assert {state["split"], *state["a"], *state["b"]} <= worker_pids
+    assert os.getpid() not in worker_pids
+
+@pytest.mark.asyncio
+async def test_nodes_run_locally_without_executor():
+    graph = build_fan_out_graph()
+    await graph.invoke()
+    assert graph.state.state["a"] == [os.getpid()]
+
+@pytest.mark.asyncio
+async def test_crashed_worker_task_is_dispatched_again(backend, tmp_path):
+    marker = str(tmp_path / "crashed")
+    graph = build_single_node_graph(worker_nodes.crash_once, {"marker": marker, "result": ""}, executor=backend)
+    await graph.invoke()
+
+    assert graph.state.state["result"] == "survived"
+    assert backend.restarts >= 1
+    assert backend.redispatched == 1
+    assert len(backend.workers) == 2
+
+@pytest.mark.asyncio
+async def test_task_that_keeps_killing_workers_fails_the_node():
+    with ProcessBackend(workers=1, heartbeat_interval=0.1, max_attempts=2) as backend:
+        graph = build_single_node_graph(worker_nodes.always_crash, {"result": ""}, executor=backend)
+        # A failed node stays active, stop after its first step
+        graph.run_state.set_max_retries(2)
+        await graph.invoke()
+
+    node = graph.get_node_by_id("node")
+    assert node.status == NodeStatus.FAILED
+    assert "giving up" in str(node.result.error)
+
+@pytest.mark.asyncio
+async def test_node_errors_come_back_as_failed_results(backend):
+    graph = build_single_node_graph(worker_nodes.fail, {"result": ""}, executor=backend)
+    graph.run_state.set_max_retries(2)
+    await graph.invoke()
+
+    node = graph.get_node_by_id("node")
+    assert node.status == NodeStatus.FAILED
+    assert "RuntimeError: boom" in str(node.result.error)
+
+@pytest.mark.asyncio
+async def test_input_keys_limit_the_shipped_state():
+    with ProcessBackend(workers=1, input_keys={"node": ["x"]}) as backend:
+        graph = build_single_node_graph(worker_nodes.sees_keys, {"x": 1, "big": "y" * 1000, "seen": []}, executor=backend)
+        await graph.invoke()
+    assert graph.state.state["seen"] == ["x"]
+
+@pytest.mark.asyncio
+async def test_unpicklable_nodes_stay_local(backend):
+    def local(state: dict):
+        return {"local": os.getpid()}
+
+    graph = Graph(State({"x": 3, "squared": 0, "local": 0}))
+    graph.add_node("square", worker_nodes.square)
+    graph.add_node("local", local)
+    graph.add_edge(START, "square")
+    graph.add_edge("square", "local")
+    graph.add_edge("local", END)
+    graph.compile(executor=backend, inline_threshold=None)
+
+    assert graph.remote_nodes == {"square"}
+    # Remote nodes are dispatched on their own, never fused into a local chain
+    assert graph.fused_next == {}
+
+    await graph.invoke()
+    assert graph.state.state["squared"] == 9
+    assert graph.state.state["local"] == os.getpid()
+
+@pytest.mark.asyncio
+async def test_new_runs_share_the_backend(backend):
+    graph = build_single_node_graph(worker_nodes.square, {"x": 0, "squared": 0}, executor=backend)
+    for x in range(3):
+        run = graph.new_run(State({"x": x}))
+        await run.invoke()
+        assert run.state.state["squared"] == x * x
+    assert len(backend.workers) == 2
+
+@pytest.mark.asyncio
+async def test_map_tasks_run_in_worker_processes(backend):
+    graph = Graph(State({"docs": list(range(6)), "pids": []}))
+    graph.add_map_node("map", worker_nodes.chunk_pid, over="docs", chunk_size=2)
+    graph.add_edge(START, "map")
+    graph.add_edge("map", END)
+    graph.compile(executor=backend)
+    await graph.invoke()
+
+    worker_pids = {worker.process.pid for worker in backend.workers.values()}
+    assert len(graph.state.state["pids"]) == 6
+    assert set(graph.state.state["pids"]) <= worker_pids
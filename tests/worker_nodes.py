@@ -0,0 +1,40 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import time
+
+# Node callables for test_workers, defined at module level so worker processes can unpickle them
+
+def pid_node(key: str):
+    return PidNode(key)
+
+class PidNode:
+    """Writes the pid of the process it ran in to `key`"""
+    def __init__(self, key: str):
+        self.key = key
+
+    def __call__(self, state: dict):
+        time.sleep(0.05)
+        return {self.key: os.getpid()}
+
+def square(state: dict):
+    return {"squared": state["x"] * state["x"]}
+
+def crash_once(state: dict):
+    """Kills its worker the first time it runs, the marker file remembers it did"""
+    marker = state["marker"]
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return {"result": "survived"}
+
+def always_crash(state: dict):
+    os._exit(1)
+
+def sees_keys(state: dict):
+    return {"seen": sorted(state.keys())}
+
+def fail(state: dict):
+    raise RuntimeError("boom")
+
+def chunk_pid(state: dict):
+    return {"pids": [os.getpid()] * len(state["docs"])}